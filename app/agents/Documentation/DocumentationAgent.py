@@ -3,13 +3,13 @@ import logging
 from langgraph.prebuilt import create_react_agent
 from langchain_core.tools import Tool
 from app.core.langchain_setup import get_llm
-from app.models.State import State
+from app.models.State import State, SubAgentState
+from app.core.ContextWindow import ContextWindow
 from app.services.CommonService import read_prompt_template
 
 from typing import List
 from langchain_core.tools import Tool
 from langgraph.prebuilt import create_react_agent
-from IPython.display import Image, display
 
 from langchain_core.messages import HumanMessage
 from app.services.CommonService import read_prompt_template
@@ -29,11 +29,6 @@ class DocumentationAgent:
         self.llm = get_llm()
         self.agent_template = read_prompt_template("agents/Documentation/DocumentationAgentPrompt.txt")
         self.agent = self._agent_builder()
-        # Display the current state graph for debugging
-        agentChart = Image(self.agent.get_graph().draw_mermaid_png())
-        with open("app/agents/Documentation/documentationAgent_chart.png", "wb") as f:
-            f.write(agentChart.data)  # Save the chart as a PNG file, overriding if it exists
-        display(agentChart)
     
     def _initialize_tools(self) -> List[Tool]:
         """Initialize all available tools for the agent."""
@@ -44,28 +39,23 @@ class DocumentationAgent:
     def _agent_builder(self):
         """Create the agent agent_builder using LangGraph."""
         
-        return create_react_agent(self.llm, tools=self._initialize_tools(), prompt=self.agent_template)
+        return create_react_agent(
+            self.llm,
+            tools=self._initialize_tools(),
+            prompt=ContextWindow.for_node("documentAgent").prompt(self.agent_template),
+            state_schema=SubAgentState,
+        )
         
     def process_request(self, state: State) -> Command[Literal["coreagent"]]:
         """Process a request from core agent and return the response."""
+        return self._to_command(self.agent.invoke(state))
 
-        def print_stream(stream):
-            for s in stream:
-                message = s["messages"][-1]
-                if isinstance(message, tuple):
-                    print(message)
-                else:
-                    message.pretty_print()
+    async def aprocess_request(self, state: State) -> Command[Literal["coreagent"]]:
+        """Async variant of process_request, awaiting the agent instead of blocking the event loop."""
+        return self._to_command(await self.agent.ainvoke(state))
 
-        # humanMessage = HumanMessage(content=user_message)
-        # print_stream(self.agent.stream(humanMessage, stream_mode="values"))
-        raise NotImplementedError("DocumentationAgent is not implemented yet.")
-
-
-        result = self.agent.invoke(state)
-        print_stream(result)
-
-        # return Command(goto="coreagent", update={"messages": [result]})
+    def _to_command(self, result: State) -> Command[Literal["coreagent"]]:
+        """Hand the agent's final message back to the core agent."""
         return Command(
             update={
                 "messages": [
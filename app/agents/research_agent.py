@@ -1,39 +1,47 @@
-from langchain.agents import AgentExecutor
-from langchain.agents.format_scratchpad import format_to_openai_function_messages
-from langchain.agents.output_parsers import OpenAIFunctionsAgentOutputParser
 # from langchain_core.messages import AIMessage, HumanMessage
 # from langchain_core.tools import Tool
 # from langchain.tools import DuckDuckGoSearchRun
-from langchain_openai import AzureChatOpenAI
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 import os
 from dotenv import load_dotenv
+from app.core.Instrumentation import get_callbacks
+from app.core.langchain_setup import get_llm
+from app.services.AdmissionController import AdmissionController
+from app.services.RunnableCache import RunnableCache
 
 # Load environment variables
 load_dotenv()
 
-def create_research_agent():
-    """Create a research agent that can search the web for information."""
-    
+RESEARCH_TEMPERATURE = 0.7
+
+def _research_tools():
+    """Tools available to the research agent."""
     # Initialize search tool
     # search_tool = DuckDuckGoSearchRun()
     
-    tools = [
+    return [
         # Tool(
         #     name="web_search",
         #     func=search_tool.run,
         #     description="Searches the web for information. Use this for questions about current events, data, or any information you don't know about."
         # )
     ]
+
+def create_research_agent(tools=None, deployment_name: str = None, temperature: float = RESEARCH_TEMPERATURE):
+    """Create a research agent that can search the web for information."""
+    # langchain imports are deferred so the API can start without loading the agents stack
+    from langchain.agents import AgentExecutor
+    from langchain.agents.format_scratchpad import format_to_openai_function_messages
+    from langchain.agents.output_parsers import OpenAIFunctionsAgentOutputParser
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain_core.tools import render_text_description
+    from langchain_core.utils.function_calling import convert_to_openai_function
     
-    # Create Azure OpenAI LLM
-    llm = AzureChatOpenAI(
-        deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-        temperature=0.7
-    )
+    tools = _research_tools() if tools is None else tools
+    
+    # Shared Azure OpenAI LLM
+    llm = get_llm(temperature=temperature, deployment_name=deployment_name)
+    if tools:
+        llm = llm.bind(functions=[convert_to_openai_function(tool) for tool in tools])
     
     # Create the prompt with a placeholder for the agent's scratchpad
     prompt = ChatPromptTemplate.from_messages([
@@ -47,7 +55,7 @@ def create_research_agent():
         """),
         ("human", "{input}"),
         MessagesPlaceholder(variable_name="agent_scratchpad"),
-    ])
+    ]).partial(tools=render_text_description(tools) or "No tools are currently available.")
     
     # Create the agent
     agent = (
@@ -56,12 +64,13 @@ def create_research_agent():
             "agent_scratchpad": lambda x: format_to_openai_function_messages(x["intermediate_steps"])
         }
         | prompt
-        | llm.bind(functions=[tool.metadata for tool in tools])
+        | llm
         | OpenAIFunctionsAgentOutputParser()
     )
     
     # Create the agent executor
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+    # verbose prints every step to stdout on the request path, the logs and /metrics cover it
+    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=os.getenv("RESEARCH_AGENT_VERBOSE", "false").lower() == "true")
     
     return agent_executor
 
@@ -75,6 +84,31 @@ def query_research_agent(query: str):
     Returns:
         The agent's response
     """
-    agent = create_research_agent()
-    response = agent.invoke({"input": query})
-    return response["output"]
\ No newline at end of file
+    agent = get_research_agent()
+    # Research runs behind interactive agent queries when Azure OpenAI is saturated
+    with AdmissionController.priority("batch"):
+        response = agent.invoke({"input": query}, config={"callbacks": get_callbacks()})
+    return response["output"]
+
+async def aquery_research_agent(query: str):
+    """
+    Run a query through the research agent without blocking the event loop.
+    
+    Args:
+        query: The user's question or request
+        
+    Returns:
+        The agent's response
+    """
+    agent = get_research_agent()
+    with AdmissionController.priority("batch"):
+        response = await agent.ainvoke({"input": query}, config={"callbacks": get_callbacks()})
+    return response["output"]
+
+def get_research_agent(deployment_name: str = None, temperature: float = RESEARCH_TEMPERATURE):
+    """Get the research agent executor, building it once per tool set and model config."""
+    tools = _research_tools()
+    return RunnableCache.get_or_build(
+        ("research_agent", tuple(tool.name for tool in tools), deployment_name, temperature),
+        lambda: create_research_agent(tools, deployment_name, temperature),
+    )
\ No newline at end of file
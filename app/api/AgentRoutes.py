@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.core.CoreAgent import OrchestratorAgent
+import uuid
+from typing import TYPE_CHECKING, Optional
+from fastapi import APIRouter, HTTPException, Depends, Request
+from app.services.AdmissionController import AdmissionRejected
+from app.services.SingleFlight import SingleFlight
+from app.services.LoggerService import LoggerService
+from app.services.StreamingService import StreamingService
 import logging
 
+if TYPE_CHECKING:
+    from app.core.CoreAgent import OrchestratorAgent
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -12,17 +20,58 @@ router = APIRouter(
 
 def get_agent():
     """Get the orchestrator agent instance."""
+    # Imported lazily so that importing the routes does not load the agent stack
+    from app.core.CoreAgent import OrchestratorAgent
+
     agent = OrchestratorAgent.get_instance()
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     return agent
 
 @router.post("/process_query")
-async def process_query(query: str, agent: OrchestratorAgent = Depends(get_agent)):
-    """Process a user query using the orchestrator agent."""
+async def process_query(query: str, thread_id: Optional[str] = None, agent: "OrchestratorAgent" = Depends(get_agent)):
+    """
+    Process a user query using the orchestrator agent.
+
+    Pass the thread_id from a previous response to continue that conversation;
+    without one a new conversation is started. Identical concurrent queries on
+    the same thread (or all starting a new one) share a single graph run.
+    """
+    own_thread_id = thread_id or str(uuid.uuid4())
+    LoggerService.bind(thread_id=own_thread_id)
+
+    async def run():
+        return await agent.aprocess_request(query, own_thread_id), own_thread_id
+
     try:
-        response = agent.process_request(query)
-        return {"response": response}
+        response, run_thread_id = await SingleFlight.group("agent").run(SingleFlight.key(query, thread_id), run)
+        if run_thread_id != own_thread_id:
+            # Answered by another request's new conversation, continue on a copy of it
+            run_thread_id = await agent.afork_thread(run_thread_id)
+        return {"response": response, "thread_id": run_thread_id}
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _agent_events(agent: "OrchestratorAgent", query: str, thread_id: Optional[str]):
+    """Graph events for the query, shared with identical concurrent streams."""
+    own_thread_id = thread_id or str(uuid.uuid4())
+    LoggerService.bind(thread_id=own_thread_id)
+    events = SingleFlight.group("agent").stream(
+        SingleFlight.key(query, thread_id), lambda: agent.astream_request(query, own_thread_id)
+    )
+    try:
+        async for event in events:
+            if event["event"] == "end" and event["data"].get("thread_id") != own_thread_id:
+                event = {"event": "end", "data": {**event["data"], "thread_id": await agent.afork_thread(event["data"]["thread_id"])}}
+            yield event
+    finally:
+        await events.aclose()
+
+@router.post("/process_query/stream")
+async def process_query_stream(query: str, request: Request, thread_id: Optional[str] = None,
+                               agent: "OrchestratorAgent" = Depends(get_agent)):
+    """Process a user query and stream graph steps and tokens as Server-Sent Events."""
+    return StreamingService.sse_response(request, _agent_events(agent, query, thread_id))
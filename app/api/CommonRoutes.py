@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends
+from app.services.LoggerService import LoggerService
+from app.services.RunnableCache import RunnableCache
 
 router = APIRouter(tags=["system"])
 
@@ -12,4 +14,24 @@ async def health_check():
     """Check if the service is healthy."""
     # Import here to avoid circular imports
     from app.main import agent
-    return {"status": "healthy", "agent_initialized": agent is not None}
\ No newline at end of file
+    from app.services.AdmissionController import AdmissionController
+    from app.services.BlobCache import BlobCache
+    from app.services.LlmDeploymentPool import LlmDeploymentPool
+    from app.services.LlmResponseCache import LlmResponseCache
+    from app.services.SingleFlight import SingleFlight
+
+    llm_cache = LlmResponseCache._instance
+    llm_pool = LlmDeploymentPool.get_instance()
+    blob_cache = BlobCache.get_instance()
+    return {
+        "status": "healthy",
+        "agent_initialized": agent is not None,
+        "runnable_cache": RunnableCache.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "blob_cache": blob_cache.stats() if blob_cache else None,
+        "single_flight": SingleFlight.stats(),
+        "llm_admission": AdmissionController.stats(),
+        "llm_pool": llm_pool.stats() if llm_pool else None,
+        "logging": LoggerService.stats(),
+        "checkpoints": agent.checkpointer.stats if agent is not None and agent.checkpointer is not None else None,
+    }
\ No newline at end of file
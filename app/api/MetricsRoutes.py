@@ -0,0 +1,96 @@
+import sys
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.AdmissionController import AdmissionController
+from app.services.LlmDeploymentPool import LlmDeploymentPool
+from app.services.LoggerService import LoggerService
+from app.services.MetricsService import MetricsService, counter_family, gauge_family
+from app.services.RunnableCache import RunnableCache
+from app.services.SingleFlight import SingleFlight
+
+router = APIRouter(tags=["system"])
+
+def _loaded_instance(module_name: str, class_name: str):
+    """The process-wide instance of a service, without importing it (and langchain) when it was never used."""
+    module = sys.modules.get(module_name)
+    instance = getattr(getattr(module, class_name, None), "_instance", None)
+    return instance or None
+
+def _cache_metrics():
+    """Lookups per cache and result; hit kinds end in '_hit'."""
+    lookups = {}
+    llm_cache = _loaded_instance("app.services.LlmResponseCache", "LlmResponseCache")
+    if llm_cache is not None:
+        for result in ("exact_hits", "semantic_hits", "misses"):
+            lookups[(("cache", "llm"), ("result", result[:-1]))] = llm_cache.counters[result]
+    blob_cache = _loaded_instance("app.services.BlobCache", "BlobCache")
+    if blob_cache is not None:
+        for counter, result in (("memory_hits", "memory_hit"), ("disk_hits", "disk_hit"), ("not_modified", "revalidated_hit"), ("misses", "miss")):
+            lookups[(("cache", "blob"), ("result", result))] = blob_cache.counters[counter]
+    checkpointer = _loaded_instance("app.services.DataStoreCheckpointer", "DataStoreCheckpointer")
+    if checkpointer is not None:
+        lookups[(("cache", "checkpoint"), ("result", "hit"))] = checkpointer.stats["cache_hits"]
+        lookups[(("cache", "checkpoint"), ("result", "miss"))] = checkpointer.stats["loads"]
+    runnables = RunnableCache.stats()
+    lookups[(("cache", "runnable"), ("result", "hit"))] = runnables["hits"]
+    lookups[(("cache", "runnable"), ("result", "miss"))] = runnables["entries"]
+    return [counter_family("doccy_cache_lookups", "Cache lookups by cache and result", lookups)]
+
+def _admission_metrics():
+    stats = AdmissionController.stats()
+    gauges = {"queue_depth": "LLM calls waiting for admission", "in_flight": "LLM calls admitted and in flight",
+              "cooldown_seconds": "Remaining 429 cool-down"}
+    counters = {"admitted": "LLM calls admitted", "shed": "LLM calls rejected or displaced from the queue",
+                "throttled": "429 responses from the service", "tokens_admitted": "Estimated tokens admitted"}
+    families = [gauge_family(f"doccy_llm_admission_{name}", documentation,
+                             {(("deployment", deployment),): snapshot[name] for deployment, snapshot in stats.items()})
+                for name, documentation in gauges.items()]
+    families += [counter_family(f"doccy_llm_admission_{name}", documentation,
+                                {(("deployment", deployment),): snapshot[name] for deployment, snapshot in stats.items()})
+                 for name, documentation in counters.items()]
+    return families
+
+def _pool_metrics():
+    pool = LlmDeploymentPool._instance
+    if pool is None:
+        return []
+    members = pool.stats()["members"]
+
+    def per_member(key, scale=1.0):
+        return {(("member", name),): None if member[key] is None else member[key] * scale for name, member in members.items()}
+
+    return [
+        gauge_family("doccy_llm_pool_latency_ewma_seconds", "Latency EWMA of pool members", per_member("latency_ewma_ms", 0.001)),
+        gauge_family("doccy_llm_pool_latency_p95_seconds", "Recent p95 latency of pool members", per_member("latency_p95_ms", 0.001)),
+        gauge_family("doccy_llm_pool_error_ewma", "Error-rate EWMA of pool members", per_member("error_ewma")),
+        gauge_family("doccy_llm_pool_available", "1 when the member's circuit lets calls through", per_member("available")),
+        counter_family("doccy_llm_pool_calls", "Calls sent to pool members", per_member("calls")),
+        counter_family("doccy_llm_pool_failures", "Failed calls of pool members", per_member("failures")),
+        counter_family("doccy_llm_pool_events", "Pool failovers and hedges",
+                       {(("event", event),): pool.counters[event] for event in ("failovers", "hedges", "hedges_won")}),
+    ]
+
+def _single_flight_metrics():
+    stats = SingleFlight.stats()
+    return [counter_family("doccy_single_flight_requests", "Requests per coalescing group, executed or coalesced", {
+        (("group", group), ("result", result)): counters[result]
+        for group, counters in stats.items()
+        for result in ("executions", "coalesced", "stream_executions", "stream_coalesced")
+    })]
+
+def _logging_metrics():
+    stats = LoggerService.stats()
+    if not stats["async"]:
+        return []
+    return [
+        gauge_family("doccy_log_queue_depth", "Log records waiting for the background writer", {(): stats["queued"]}),
+        counter_family("doccy_log_records_dropped", "Log records dropped because the queue was full", {(): stats["dropped"]}),
+    ]
+
+for _collector in (_cache_metrics, _admission_metrics, _pool_metrics, _single_flight_metrics, _logging_metrics):
+    MetricsService.register_collector(_collector)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Latency, token, cost, data store and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(MetricsService.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,10 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
+from app.core.Instrumentation import get_callbacks
 from app.core.langchain_setup import create_simple_chain
-from app.agents.research_agent import query_research_agent
+from app.agents.research_agent import aquery_research_agent
+from app.services.AdmissionController import AdmissionRejected
+from app.services.SingleFlight import SingleFlight
+from app.services.StreamingService import StreamingService
 
 router = APIRouter(prefix="/langchain", tags=["langchain"])
 
+# Prompt used by the generate endpoints
+GENERATE_PROMPT_TEMPLATE = """
+        Answer the following question in a helpful way:
+        
+        Question: {query}
+        
+        Answer:
+        """
+
 class QueryRequest(BaseModel):
     query: str
 
@@ -12,31 +25,44 @@ class QueryRequest(BaseModel):
 async def generate_text(request: QueryRequest):
     """Generate text using LangChain based on the provided query."""
     try:
-        # Create a simple prompt template
-        prompt_template = """
-        Answer the following question in a helpful way:
-        
-        Question: {query}
-        
-        Answer:
-        """
-        
         # Create the chain
-        chain = create_simple_chain(prompt_template)
+        chain = create_simple_chain(GENERATE_PROMPT_TEMPLATE)
         
-        # Run the chain
-        result = chain.invoke({"query": request.query})
+        # Run the chain, sharing the run with identical concurrent queries
+        result = await SingleFlight.group("generate").run(
+            SingleFlight.key(request.query), lambda: chain.ainvoke({"query": request.query}, config={"callbacks": get_callbacks()})
+        )
         
         # Access the content property of the AIMessage object
         return {"generated_text": result.content}
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating text: {str(e)}")
 
+async def _generate_events(query: str):
+    """Yield the generated answer token by token."""
+    chain = create_simple_chain(GENERATE_PROMPT_TEMPLATE)
+    async for chunk in chain.astream({"query": query}, config={"callbacks": get_callbacks()}):
+        if chunk.content:
+            yield {"event": "token", "data": {"content": chunk.content}}
+    yield {"event": "end", "data": {}}
+
+@router.post("/generate/stream")
+async def generate_text_stream(request: QueryRequest, http_request: Request):
+    """Generate text for the provided query and stream the tokens as Server-Sent Events."""
+    events = SingleFlight.group("generate").stream(SingleFlight.key(request.query), lambda: _generate_events(request.query))
+    return StreamingService.sse_response(http_request, events)
+
 @router.post("/research")
 async def research(request: QueryRequest):
     """Research a topic using the research agent with web search capabilities."""
     try:
-        result = query_research_agent(request.query)
+        result = await SingleFlight.group("research").run(
+            SingleFlight.key(request.query), lambda: aquery_research_agent(request.query)
+        )
         return {"research_result": result}
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error during research: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error during research: {str(e)}")
@@ -0,0 +1,66 @@
+"""
+Opt-in rendering of the agent graphs for debugging.
+
+Rendering is kept out of the agent constructors because PNG output goes through
+a remote mermaid renderer. Run it explicitly when a chart is needed:
+
+    python -m app.core.AgentCharts                    # PNG charts (needs network)
+    python -m app.core.AgentCharts --format mermaid   # mermaid source, works offline
+"""
+import argparse
+from pathlib import Path
+
+from app.core.CoreAgent import OrchestratorAgent
+
+# Chart file names, relative to the output directory
+CHART_PATHS = {
+    "coreagent": "core/coreagent_chart",
+    "documentAgent": "agents/Documentation/documentationAgent_chart",
+    "feedbackAgent": "agents/Feedback/feedbackAgent_chart",
+    "retrievalAgent": "agents/Retrieval/retrievalAgent_chart",
+}
+
+
+def render_charts(output_dir: Path, fmt: str = "png") -> list[Path]:
+    """
+    Render the orchestrator graph and every sub-agent graph.
+
+    Args:
+        output_dir: Directory the chart paths are resolved against
+        fmt: 'png' for rendered images or 'mermaid' for mermaid source
+
+    Returns:
+        Paths of the written chart files
+    """
+    orchestrator = OrchestratorAgent()
+    graphs = {"coreagent": orchestrator.graph}
+    for name in OrchestratorAgent.SUB_AGENTS:
+        graphs[name] = orchestrator.get_sub_agent(name).agent
+
+    written = []
+    for name, graph in graphs.items():
+        drawable = graph.get_graph()
+        if fmt == "png":
+            path = output_dir / f"{CHART_PATHS[name]}.png"
+            content = drawable.draw_mermaid_png()
+        else:
+            path = output_dir / f"{CHART_PATHS[name]}.mmd"
+            content = drawable.draw_mermaid().encode("utf-8")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the agent graphs")
+    parser.add_argument("--output-dir", default=str(Path(__file__).resolve().parent.parent), help="Directory to write charts to (default: the app package)")
+    parser.add_argument("--format", choices=["png", "mermaid"], default="png", help="Output format")
+    args = parser.parse_args()
+
+    for path in render_charts(Path(args.output_dir), args.format):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Bounded conversation context for the orchestrator graph.
+
+Every LLM call made on behalf of a graph node sees the node's system prompt, the
+rolling summary of older turns kept in State["summary"], and the most recent
+messages that fit the node's token budget. Tool outputs from earlier tool-call
+rounds are cut down to a short excerpt. Once the conversation outgrows the
+summarization threshold, the core agent folds the messages that no longer fit
+the window into the summary and removes them from the state.
+
+Policies are configured per node from the environment, with node-specific
+variables taking precedence over the global ones:
+
+    CONTEXT_MAX_TOKENS=4000              CONTEXT_COREAGENT_MAX_TOKENS=1500
+    CONTEXT_TOOL_OUTPUT_CHARS=2000       CONTEXT_RETRIEVALAGENT_TOOL_OUTPUT_CHARS=4000
+    CONTEXT_SUMMARIZE_TOKENS=8000        (0 disables summarization)
+
+Token counts use langchain's character-based approximation, which needs no
+tokenizer download and costs microseconds per message.
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import convert_to_messages, count_tokens_approximately, get_buffer_string, trim_messages
+
+from app.services.CommonService import read_prompt_template
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Approximate prompt tokens of a message list."""
+    return count_tokens_approximately(messages)
+
+
+class ContextPolicy:
+    """Token budget and trimming rules for the LLM calls of one graph node."""
+
+    def __init__(self, max_tokens: int = 4000, tool_output_chars: int = 2000, summarize_tokens: int = 8000):
+        self.max_tokens = max_tokens
+        self.tool_output_chars = tool_output_chars
+        self.summarize_tokens = summarize_tokens
+
+    @classmethod
+    def from_env(cls, node: str) -> "ContextPolicy":
+        """Read CONTEXT_<NODE>_* settings, falling back to the global CONTEXT_* ones."""
+
+        def setting(name: str, default: str) -> int:
+            return int(os.getenv(f"CONTEXT_{node.upper()}_{name}", os.getenv(f"CONTEXT_{name}", default)))
+
+        return cls(
+            max_tokens=setting("MAX_TOKENS", "4000"),
+            tool_output_chars=setting("TOOL_OUTPUT_CHARS", "2000"),
+            summarize_tokens=setting("SUMMARIZE_TOKENS", "8000"),
+        )
+
+
+class ContextWindow:
+    """Builds the bounded prompt for a graph node and folds old turns into the rolling summary."""
+    _windows: Dict[str, "ContextWindow"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, node: str, policy: Optional[ContextPolicy] = None):
+        self.node = node
+        self.policy = policy or ContextPolicy.from_env(node)
+        self.stats = {"calls": 0, "tokens_in": 0, "tokens_sent": 0, "tool_outputs_shortened": 0, "summaries": 0}
+
+    @classmethod
+    def for_node(cls, node: str) -> "ContextWindow":
+        """Get the shared window of a graph node, configured from the environment."""
+        window = cls._windows.get(node)
+        if window is None:
+            with cls._lock:
+                window = cls._windows.setdefault(node, cls(node))
+        return window
+
+    def _shorten_tool_outputs(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Cut tool outputs down to an excerpt, except those of the latest tool-call round."""
+        limit = self.policy.tool_output_chars
+        latest_call = max((i for i, m in enumerate(messages) if isinstance(m, AIMessage) and m.tool_calls), default=-1)
+        shortened = []
+        for i, message in enumerate(messages):
+            if i < latest_call and isinstance(message, ToolMessage) and isinstance(message.content, str) and len(message.content) > limit:
+                omitted = len(message.content) - limit
+                message = message.model_copy(update={"content": f"{message.content[:limit]}\n[... {omitted} characters of tool output omitted]"})
+                self.stats["tool_outputs_shortened"] += 1
+            shortened.append(message)
+        return shortened
+
+    def _recent(self, messages: List[BaseMessage], budget: int) -> List[BaseMessage]:
+        """The newest messages that fit the budget, starting on a user turn."""
+        recent = trim_messages(
+            messages, max_tokens=max(budget, 0), token_counter=count_tokens, strategy="last", start_on="human", allow_partial=False
+        )
+        if not recent and messages:
+            # The latest turn alone is over budget: send it anyway rather than nothing
+            last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=len(messages) - 1)
+            recent = messages[last_human:]
+        return recent
+
+    def messages(self, state: Dict[str, Any], system_prompt: Optional[str] = None) -> List[BaseMessage]:
+        """
+        Build the prompt messages for an LLM call of this node.
+
+        Args:
+            state: Graph state with 'messages' and optionally 'summary'
+            system_prompt: The node's system prompt
+
+        Returns:
+            System prompt, rolling summary and the recent messages within the node's token budget
+        """
+        history = convert_to_messages(state["messages"])
+        head: List[BaseMessage] = []
+        if system_prompt:
+            head.append(SystemMessage(content=system_prompt))
+        if state.get("summary"):
+            head.append(SystemMessage(content=f"{SUMMARY_PREFIX}{state['summary']}"))
+        recent = self._recent(self._shorten_tool_outputs(history), self.policy.max_tokens - count_tokens(head))
+        prompt = head + recent
+
+        self.stats["calls"] += 1
+        self.stats["tokens_in"] += count_tokens(head) + count_tokens(history)
+        self.stats["tokens_sent"] += count_tokens(prompt)
+        return prompt
+
+    def prompt(self, system_prompt: str) -> Callable[[Dict[str, Any]], List[BaseMessage]]:
+        """Prompt callable for create_react_agent that applies this window on every model call."""
+        return lambda state: self.messages(state, system_prompt)
+
+    def _summary_request(self, state: Dict[str, Any]) -> Optional[tuple]:
+        """Messages to fold into the summary, and the summarization prompt, when the state is over threshold."""
+        threshold = self.policy.summarize_tokens
+        history = convert_to_messages(state["messages"])
+        if threshold <= 0 or count_tokens(history) <= threshold:
+            return None
+        recent = self._recent(history, self.policy.max_tokens)
+        old = [message for message in history[:len(history) - len(recent)] if message.id]
+        if not old:
+            return None
+        template = read_prompt_template("core/ContextSummaryPrompt.txt")
+        prompt = template.format(
+            summary=state.get("summary") or "(none)",
+            messages=get_buffer_string(self._shorten_tool_outputs(old)),
+        )
+        return old, prompt
+
+    def _summary_update(self, old: List[BaseMessage], summary: str) -> Dict[str, Any]:
+        self.stats["summaries"] += 1
+        logger.info(f"Folded {len(old)} messages into the conversation summary for {self.node}")
+        return {"summary": summary, "messages": [RemoveMessage(id=message.id) for message in old]}
+
+    def summarize(self, state: Dict[str, Any], llm) -> Dict[str, Any]:
+        """
+        Fold messages that no longer fit the window into the rolling summary.
+
+        Args:
+            state: Graph state
+            llm: Chat model used to write the summary
+
+        Returns:
+            State update with the new summary and removals of the folded messages,
+            or an empty dict while the conversation is under the threshold
+        """
+        request = self._summary_request(state)
+        if request is None:
+            return {}
+        old, prompt = request
+        return self._summary_update(old, llm.invoke(prompt).content)
+
+    async def asummarize(self, state: Dict[str, Any], llm) -> Dict[str, Any]:
+        """Async variant of summarize."""
+        request = self._summary_request(state)
+        if request is None:
+            return {}
+        old, prompt = request
+        return self._summary_update(old, (await llm.ainvoke(prompt)).content)
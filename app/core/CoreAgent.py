@@ -1,21 +1,26 @@
-from typing import List
+import os
+import threading
+import time
+import uuid
+from importlib import import_module
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from typing_extensions import TypedDict
 
-from langchain_core.tools import Tool
-from langgraph.prebuilt import create_react_agent
-from IPython.display import Image, display
 from langgraph.graph import StateGraph, END
 
 from langchain_core.messages import HumanMessage
-from app.agents.Documentation.DocumentationAgent import DocumentationAgent
-from app.agents.Feedback.FeedbackAgent import FeedbackAgent
-from app.agents.Retrieval.RetrievalAgent import RetrievalAgent
+from langchain_core.runnables import RunnableLambda
 from app.models.State import State
 from app.services.CommonService import read_prompt_template
 from app.core.langchain_setup import get_llm
+from app.core.IntentRouter import IntentRouter, RoutingDecisionLog
+from app.core.ContextWindow import ContextWindow
+from app.core.Instrumentation import get_callbacks
+from app.services.DataStoreCheckpointer import DataStoreCheckpointer
+from app.services.LoggerService import LoggerService
 from dotenv import load_dotenv
 from typing import Literal
-from langgraph.types import Command
+from langgraph.types import Command, Send
 
 # Load environment variables
 load_dotenv()
@@ -23,14 +28,23 @@ load_dotenv()
 get_members = Literal["documentAgent", "feedbackAgent", "retrievalAgent"]
 
 class Router(TypedDict):
-    """Worker to route to next. If no workers needed, route to FINISH."""
+    """Workers to route to next, several when they can work independently. If no workers needed, route to FINISH."""
 
-    next: get_members
+    next: List[Literal[get_members, "FINISH"]]
 
 class OrchestratorAgent:
     """Agent responsible for handling incoming requests and routing them to appropriate tools."""
     
     _instance = None  # Singleton instance
+
+    NODES = ("coreagent", "documentAgent", "feedbackAgent", "retrievalAgent")
+
+    # Sub-agents are imported and built the first time they are routed to
+    SUB_AGENTS = {
+        "documentAgent": ("app.agents.Documentation.DocumentationAgent", "DocumentationAgent"),
+        "feedbackAgent": ("app.agents.Feedback.FeedbackAgent", "FeedbackAgent"),
+        "retrievalAgent": ("app.agents.Retrieval.RetrievalAgent", "RetrievalAgent"),
+    }
     
     @classmethod
     def get_instance(cls):
@@ -38,30 +52,139 @@ class OrchestratorAgent:
         if cls._instance is None:
             cls._instance = cls()
         return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        """Drop the singleton and its sub-agents, e.g. once the LLM clients they hold were closed."""
+        cls._instance = None
     
     def __init__(self):
         """Initialize the orchestrator agent."""
         self.llm = get_llm()
+        # Routing sits on the critical path of every turn, so its calls are hedged across the deployment pool
+        self.router_llm = get_llm(hedge=os.getenv("LLM_POOL_HEDGE_ROUTER", "true").lower() == "true")
         self.corePromptTemplate = read_prompt_template("core/CoreAgentPromptTemplate.txt")
-        self.documentation_agent = DocumentationAgent()
-        self.feedback_agent = FeedbackAgent()
-        self.retrieval_agent = RetrievalAgent()
+        self.intent_router = IntentRouter.from_env()
+        self.routing_log = RoutingDecisionLog.from_env()
+        self.context = ContextWindow.for_node("coreagent")
+        self.checkpointer = DataStoreCheckpointer.get_instance()
+        self._sub_agents: Dict[str, Any] = {}
+        self._sub_agents_lock = threading.Lock()
         self.graph = self._agent_builder()
-        
-        # Display the current state graph for debugging
-        agentChart = Image(self.graph.get_graph().draw_mermaid_png())
-        with open("app/core/coreagent_chart.png", "wb") as f:
-            f.write(agentChart.data)  # Save the chart as a PNG file, overriding if it exists
-        display(agentChart)
+
+    def get_sub_agent(self, name: str):
+        """Get the sub-agent for a graph node, building it on first use."""
+        agent = self._sub_agents.get(name)
+        if agent is None:
+            with self._sub_agents_lock:
+                agent = self._sub_agents.get(name)
+                if agent is None:
+                    module_name, class_name = self.SUB_AGENTS[name]
+                    agent = getattr(import_module(module_name), class_name)()
+                    self._sub_agents[name] = agent
+        return agent
+
+    @property
+    def documentation_agent(self):
+        return self.get_sub_agent("documentAgent")
+
+    @property
+    def feedback_agent(self):
+        return self.get_sub_agent("feedbackAgent")
+
+    @property
+    def retrieval_agent(self):
+        return self.get_sub_agent("retrievalAgent")
+
+    def _sub_agent_node(self, name: str) -> RunnableLambda:
+        """Graph node that defers to the (lazily built) sub-agent."""
+
+        def process_request(state: State):
+            return self.get_sub_agent(name).process_request(state)
+
+        async def aprocess_request(state: State):
+            return await self.get_sub_agent(name).aprocess_request(state)
+
+        return RunnableLambda(process_request, afunc=aprocess_request, name=name)
+
+    def _router_messages(self, state: State) -> list:
+        """Build the routing prompt: the core system prompt, the rolling summary and the recent conversation."""
+        return self.context.messages(state, self.corePromptTemplate)
+
+    @staticmethod
+    def _summarized(state: State, update: dict) -> State:
+        """The state as the rest of this hop should see it once the summary update is applied."""
+        if not update:
+            return state
+        removed = {message.id for message in update["messages"]}
+        return {**state, "summary": update["summary"], "messages": [m for m in state["messages"] if m.id not in removed]}
+
+    @classmethod
+    def _workers(cls, decision) -> List[str]:
+        """Distinct workers named by a routing decision, in the router's order; FINISH alone yields none."""
+        if isinstance(decision, str):
+            decision = [decision]
+        return list(dict.fromkeys(name for name in decision if name in cls.SUB_AGENTS))
+
+    def _route(self, state: State, response: Router, update: dict = None) -> Command[Literal[get_members, "__end__"]]:
+        """
+        Turn the router decision into a graph command, carrying any context summary update.
+
+        Several workers are sent the current state in the same step and run in
+        parallel. Their message updates are applied in the router's order, whichever
+        branch finishes first, and coreagent runs again once every branch is done.
+        """
+        workers = self._workers(response["next"])
+        if not workers:
+            goto = next_ = END
+        elif len(workers) == 1:
+            goto = next_ = workers[0]
+        else:
+            goto, next_ = [Send(name, state) for name in workers], workers
+
+        return Command(goto=goto, update={**(update or {}), "next": next_})
+
+    def _local_route(self, state: State, update: dict = None):
+        """Route without an LLM call when the local classifier is confident, otherwise None."""
+        if self.intent_router is None:
+            return None
+        goto = self.intent_router.route(state["messages"])
+        if goto is None:
+            return None
+        return self._route(state, {"next": goto}, update)
+
+    def _record_decision(self, state: State, response: Router, started: float) -> None:
+        """Log the LLM routing decision as training data for the local classifier."""
+        workers = self._workers(response["next"])
+        # The local classifier predicts a single route, so fan-out decisions are not logged
+        if self.routing_log is not None and len(workers) <= 1:
+            label = workers[0] if workers else "FINISH"
+            self.routing_log.record(state["messages"], label, (time.perf_counter() - started) * 1000)
 
     def coreagent(self, state: State) -> Command[Literal[get_members, "__end__"]]:
-        messages = [{"role": "system", "content": self.corePromptTemplate},] + state["messages"]
-        response = self.llm.with_structured_output(Router).invoke(messages)
-        goto = response["next"]
-        if goto == "FINISH":
-            goto = END
+        update = self.context.summarize(state, self.llm)
+        state = self._summarized(state, update)
+        command = self._local_route(state, update)
+        if command is not None:
+            return command
+
+        started = time.perf_counter()
+        response = self.router_llm.with_structured_output(Router).invoke(self._router_messages(state))
+        self._record_decision(state, response, started)
+        return self._route(state, response, update)
+
+    async def acoreagent(self, state: State) -> Command[Literal[get_members, "__end__"]]:
+        """Async variant of coreagent, used when the graph is driven with ainvoke/astream."""
+        update = await self.context.asummarize(state, self.llm)
+        state = self._summarized(state, update)
+        command = self._local_route(state, update)
+        if command is not None:
+            return command
 
-        return Command(goto=goto, update={"next": goto})
+        started = time.perf_counter()
+        response = await self.router_llm.with_structured_output(Router).ainvoke(self._router_messages(state))
+        self._record_decision(state, response, started)
+        return self._route(state, response, update)
     
     # def _initialize_tools(self) -> List[Tool]:
     #     """Initialize all available tools for the agent."""
@@ -99,17 +222,112 @@ class OrchestratorAgent:
         """Create the agent agent_builder using LangGraph."""
         builder = StateGraph(State)
         builder.set_entry_point("coreagent")
-        builder.add_node("coreagent", self.coreagent)
-        builder.add_node("documentAgent", self.documentation_agent.process_request)
-        builder.add_node("feedbackAgent", self.feedback_agent.process_request)
-        builder.add_node("retrievalAgent", self.retrieval_agent.process_request)
-        return builder.compile()
-    
-    def process_request(self, message: str):
+        # Each node carries both a sync and an async implementation so the same graph
+        # can be driven with invoke() from scripts and ainvoke()/astream() from the API.
+        builder.add_node(
+            "coreagent",
+            RunnableLambda(self.coreagent, afunc=self.acoreagent, name="coreagent"),
+            destinations=("documentAgent", "feedbackAgent", "retrievalAgent", END),
+        )
+        for name in self.SUB_AGENTS:
+            builder.add_node(name, self._sub_agent_node(name), destinations=("coreagent",))
+        # With a checkpointer, each thread_id resumes its conversation from the stored state
+        return builder.compile(checkpointer=self.checkpointer)
+
+    @staticmethod
+    def _final_response(result: dict) -> str:
+        """Extract the answer from the final graph state: the trailing worker replies, in merge order."""
+        messages = result.get("messages", [])
+        if not messages:
+            return ""
+        replies = []
+        for message in reversed(messages):
+            if not getattr(message, "name", None):
+                break
+            replies.append(message.content)
+        if not replies:
+            return messages[-1].content
+        return "\n\n".join(reversed(replies))
+
+    def _session(self, message: str, thread_id: Optional[str]) -> Tuple[dict, dict, str]:
+        """
+        Graph input and config for one turn of a conversation.
+
+        Only the new user message is sent; earlier turns are restored from the
+        checkpointer under the thread_id. A new thread is started when none is given.
+        """
+        thread_id = thread_id or str(uuid.uuid4())
+        # The request's correlation id travels with the run for callbacks and tracing
+        config = {"callbacks": get_callbacks(), "metadata": {**LoggerService.context(), "thread_id": thread_id}}
+        if self.checkpointer is not None:
+            config["configurable"] = {"thread_id": thread_id}
+        return {"messages": [("user", message)]}, config, thread_id
+
+    async def afork_thread(self, thread_id: str) -> str:
+        """
+        Start a new conversation thread from the latest state of another one.
+
+        Used when a request that starts a new conversation was answered by the run of
+        an identical concurrent request, so that each client continues on its own thread.
+        """
+        fork_id = str(uuid.uuid4())
+        if self.checkpointer is not None:
+            source = await self.graph.aget_state({"configurable": {"thread_id": thread_id}})
+            await self.graph.aupdate_state({"configurable": {"thread_id": fork_id}}, source.values, as_node="coreagent")
+        return fork_id
+
+    def process_request(self, message: str, thread_id: Optional[str] = None) -> str:
         """Process a user request and return the response."""
-        
-        for s in self.graph.stream(
-            {"messages": [("user", message)]}, subgraphs=True
-        ):
-            print(s)
-            print("----")
\ No newline at end of file
+        graph_input, config, _ = self._session(message, thread_id)
+        result = self.graph.invoke(graph_input, config)
+        return self._final_response(result)
+
+    async def aprocess_request(self, message: str, thread_id: Optional[str] = None) -> str:
+        """Process a user request without blocking the event loop and return the response."""
+        graph_input, config, _ = self._session(message, thread_id)
+        result = await self.graph.ainvoke(graph_input, config)
+        return self._final_response(result)
+
+    async def astream_request(self, message: str, thread_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user request and yield events as the graph runs.
+
+        Yields {"event": ..., "data": ...} dicts for node starts, routing decisions,
+        tool calls and LLM tokens, followed by a final 'end' event carrying the response
+        and the thread_id to continue the conversation with.
+        Closing the generator cancels the graph run and any in-flight LLM call.
+        """
+        graph_input, config, thread_id = self._session(message, thread_id)
+        final_state: dict = {}
+        async for event in self.graph.astream_events(graph_input, config, version="v2"):
+            kind = event["event"]
+            name = event["name"]
+            metadata = event.get("metadata", {})
+            # Sub-agent graphs report their own inner node names, so attribute events
+            # to the top-level node from the checkpoint namespace instead.
+            namespace = metadata.get("langgraph_checkpoint_ns", "")
+            node = namespace.split(":")[0] if namespace else metadata.get("langgraph_node")
+
+            # Graph nodes are the direct children of the root graph run
+            is_node = name in self.NODES and len(event.get("parent_ids", [])) == 1
+
+            if kind == "on_chain_start" and is_node:
+                yield {"event": "node", "data": {"node": name}}
+            elif kind == "on_chain_end" and is_node and name == "coreagent":
+                goto = getattr(event["data"].get("output"), "goto", None)
+                if isinstance(goto, (list, tuple)):
+                    goto = [send.node if isinstance(send, Send) else send for send in goto]
+                yield {"event": "route", "data": {"next": goto}}
+            elif kind == "on_chat_model_stream" and node != "coreagent":
+                # Router tokens are structured output, only worker tokens are user facing
+                content = event["data"]["chunk"].content
+                if content:
+                    yield {"event": "token", "data": {"node": node, "content": content}}
+            elif kind == "on_tool_start":
+                yield {"event": "tool_start", "data": {"node": node, "tool": name, "input": event["data"].get("input")}}
+            elif kind == "on_tool_end":
+                yield {"event": "tool_end", "data": {"node": node, "tool": name, "output": str(event["data"].get("output"))}}
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                final_state = event["data"].get("output") or {}
+
+        yield {"event": "end", "data": {"response": self._final_response(final_state), "thread_id": thread_id}}
\ No newline at end of file
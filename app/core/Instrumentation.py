@@ -0,0 +1,165 @@
+"""
+LangChain/LangGraph callback handler that records where the time of a request goes.
+
+Attached to the graph and chain configs, it records into MetricsService:
+
+  * the wall time of every root run (a whole graph or chain invocation),
+  * the wall time of every top-level graph node (coreagent and the sub-agents),
+  * the wall time of every tool call, attributed to its node,
+  * LLM total time, time to first token when streaming, prompt and completion
+    tokens and their estimated cost, per model and node.
+
+The handler runs inline and only keeps the start time of runs in flight, so it is
+cheap enough to leave on in production.
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from app.services.MetricsService import MetricsService
+
+# Rough per-1K token prices (USD) for the cost estimate, gpt-4o list prices by default
+PROMPT_COST_PER_1K = float(os.getenv("LLM_COST_PER_1K_PROMPT_TOKENS", "0.0025"))
+COMPLETION_COST_PER_1K = float(os.getenv("LLM_COST_PER_1K_COMPLETION_TOKENS", "0.01"))
+
+RUN_SECONDS = MetricsService.histogram("doccy_run_duration_seconds", "Wall time of graph and chain invocations", ("run", "status"))
+NODE_SECONDS = MetricsService.histogram("doccy_node_duration_seconds", "Wall time of top-level graph nodes", ("node", "status"))
+TOOL_SECONDS = MetricsService.histogram("doccy_tool_duration_seconds", "Wall time of tool calls", ("tool", "node", "status"))
+LLM_SECONDS = MetricsService.histogram("doccy_llm_duration_seconds", "Total time of LLM calls", ("model", "node", "status"))
+LLM_FIRST_TOKEN_SECONDS = MetricsService.histogram("doccy_llm_time_to_first_token_seconds", "Time to the first streamed token of LLM calls", ("model", "node"))
+LLM_TOKENS = MetricsService.counter("doccy_llm_tokens", "Tokens used by LLM calls", ("model", "node", "type"))
+LLM_COST = MetricsService.counter("doccy_llm_cost_usd", "Estimated cost of LLM calls in USD", ("model", "node"))
+
+
+def _node(metadata: Optional[Dict[str, Any]]) -> str:
+    """Top-level graph node a run belongs to, from its checkpoint namespace."""
+    if not metadata:
+        return ""
+    namespace = metadata.get("langgraph_checkpoint_ns", "")
+    return namespace.split(":")[0] if namespace else metadata.get("langgraph_node", "")
+
+
+def _usage(response: Any) -> tuple:
+    """Prompt and completion tokens of an LLMResult."""
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not prompt and not completion:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt = token_usage.get("prompt_tokens", 0)
+        completion = token_usage.get("completion_tokens", 0)
+    return prompt, completion
+
+
+@lru_cache(maxsize=None)
+def _handler_class() -> type:
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class MetricsCallbackHandler(BaseCallbackHandler):
+        """Records run, node, tool and LLM timings and token usage into MetricsService."""
+        # Called in the thread or event loop of the run instead of an executor
+        run_inline = True
+
+        def __init__(self):
+            self._runs: Dict[UUID, list] = {}
+            self._lock = threading.Lock()
+
+        def _start(self, run_id: UUID, *entry: Any) -> None:
+            with self._lock:
+                self._runs[run_id] = [time.perf_counter(), *entry]
+
+        def _pop(self, run_id: UUID) -> Optional[list]:
+            with self._lock:
+                return self._runs.pop(run_id, None)
+
+        # Graph, node and chain runs
+
+        def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+            name = kwargs.get("name") or (serialized or {}).get("name", "")
+            if parent_run_id is None:
+                self._start(run_id, RUN_SECONDS, {"run": name})
+            elif metadata and name == metadata.get("langgraph_node") and "|" not in metadata.get("langgraph_checkpoint_ns", "|"):
+                # A node of the top-level graph, sub-agents' inner nodes have nested namespaces
+                self._start(run_id, NODE_SECONDS, {"node": name})
+
+        def _end_chain(self, run_id: UUID, status: str) -> None:
+            entry = self._pop(run_id)
+            if entry is not None:
+                started, histogram, labels = entry
+                histogram.observe(time.perf_counter() - started, status=status, **labels)
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            self._end_chain(run_id, "ok")
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            self._end_chain(run_id, "error")
+
+        # Tools
+
+        def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+            self._start(run_id, kwargs.get("name") or (serialized or {}).get("name", ""), _node(metadata))
+
+        def _end_tool(self, run_id: UUID, status: str) -> None:
+            entry = self._pop(run_id)
+            if entry is not None:
+                started, tool, node = entry
+                TOOL_SECONDS.observe(time.perf_counter() - started, tool=tool, node=node, status=status)
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            self._end_tool(run_id, "ok")
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            self._end_tool(run_id, "error")
+
+        # LLM calls
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+            model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("kwargs", {}).get("deployment_name", "")
+            # Entry: started, model, node, first token seen
+            self._start(run_id, model, _node(metadata), False)
+
+        def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+            self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata, **kwargs)
+
+        def on_llm_new_token(self, token, *, run_id, **kwargs):
+            entry = self._runs.get(run_id)
+            if entry is not None and not entry[3]:
+                entry[3] = True
+                LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - entry[0], model=entry[1], node=entry[2])
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            entry = self._pop(run_id)
+            if entry is None:
+                return
+            started, model, node, _ = entry
+            LLM_SECONDS.observe(time.perf_counter() - started, model=model, node=node, status="ok")
+            prompt, completion = _usage(response)
+            if prompt or completion:
+                LLM_TOKENS.inc(prompt, model=model, node=node, type="prompt")
+                LLM_TOKENS.inc(completion, model=model, node=node, type="completion")
+                LLM_COST.inc(prompt / 1000 * PROMPT_COST_PER_1K + completion / 1000 * COMPLETION_COST_PER_1K, model=model, node=node)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            entry = self._pop(run_id)
+            if entry is not None:
+                started, model, node, _ = entry
+                LLM_SECONDS.observe(time.perf_counter() - started, model=model, node=node, status="error")
+
+    return MetricsCallbackHandler
+
+
+@lru_cache(maxsize=None)
+def _handler() -> Any:
+    return _handler_class()()
+
+
+def get_callbacks() -> List[Any]:
+    """Callbacks to pass in the config of graph and chain invocations; empty when METRICS_ENABLED is false."""
+    return [_handler()] if MetricsService.enabled else []
@@ -0,0 +1,233 @@
+"""
+Local intent classifier that lets the core agent skip the LLM routing call.
+
+It combines keyword rules with a small hashed bag-of-words nearest-centroid
+model trained on routing decisions logged from the LLM router. Only confident
+first-hop decisions are taken locally, everything else falls back to the LLM.
+Until a model has been trained, every turn is routed by the LLM.
+
+Train a model from the decision log:
+
+    python -m app.core.IntentRouter --log .cache/routing_decisions.jsonl --model .cache/intent_router.npz
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+LABELS = ("documentAgent", "feedbackAgent", "retrievalAgent")
+
+# Keyword rules per worker, as (pattern, weight)
+KEYWORD_RULES: Dict[str, Sequence[Tuple[str, float]]] = {
+    "documentAgent": (
+        (r"\b(add|create|write|draft|upload)\b.*\b(doc|docs|document|documentation|page|section|manual)\b", 2.0),
+        (r"\b(update|edit|modify|revise|rewrite|change)\b.*\b(doc|docs|document|documentation|page|section|manual)\b", 2.0),
+        (r"\b(documentation|document)\b", 1.0),
+    ),
+    "feedbackAgent": (
+        (r"\bfeedback\b", 2.0),
+        (r"\b(rate|rating|review|complain|complaint|suggestion|suggest)\b", 1.5),
+        (r"\b(helpful|unhelpful|confusing|outdated|wrong|incorrect)\b", 1.0),
+    ),
+    "retrievalAgent": (
+        (r"\b(find|search|look up|lookup|retrieve|fetch|show me|list)\b", 2.0),
+        (r"^\s*(what|how|where|which|who|when|why|is|are|can|does|do)\b", 1.0),
+        (r"\?\s*$", 0.5),
+    ),
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _features(text: str, dimensions: int) -> np.ndarray:
+    """Hashed unigram and bigram counts, L2 normalized."""
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for term in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        vector[zlib.crc32(term.encode("utf-8")) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class IntentRouter:
+    """Keyword rules plus a nearest-centroid model over hashed text features."""
+
+    def __init__(self, centroids: Optional[np.ndarray] = None, dimensions: int = 4096, threshold: float = 0.8, sharpness: float = 10.0):
+        self.centroids = centroids
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.sharpness = sharpness
+        self._rules = {
+            label: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+            for label, rules in KEYWORD_RULES.items()
+        }
+
+    @classmethod
+    def from_env(cls) -> Optional["IntentRouter"]:
+        """
+        Build the router from ROUTER_* environment variables.
+
+        The keyword rules alone are too coarse to route on, so the router is only
+        built once a model has been trained at ROUTER_MODEL_PATH.
+
+        Returns:
+            The router, or None when ROUTER_LOCAL_ENABLED is false or no trained model exists
+        """
+        if os.getenv("ROUTER_LOCAL_ENABLED", "true").lower() != "true":
+            return None
+        model_path = os.getenv("ROUTER_MODEL_PATH", ".cache/intent_router.npz")
+        if not os.path.exists(model_path):
+            logger.info(f"No intent router model at {model_path}, routing every turn with the LLM")
+            return None
+        return cls.load(model_path, threshold=float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.8")))
+
+    def rule_scores(self, text: str) -> Optional[np.ndarray]:
+        """Label probabilities from the keyword rules, None when no rule matched."""
+        weights = np.array(
+            [sum(weight for pattern, weight in self._rules[label] if pattern.search(text)) for label in LABELS],
+            dtype=np.float32,
+        )
+        total = weights.sum()
+        if not total:
+            return None
+        # Share of the matched weight, discounted when the evidence is thin
+        return (weights / total) * (1.0 - 0.5 ** weights.max())
+
+    def model_scores(self, text: str) -> Optional[np.ndarray]:
+        """Label probabilities from the trained model, None when no model is loaded."""
+        if self.centroids is None:
+            return None
+        similarities = self.centroids @ _features(text, self.dimensions)
+        exp = np.exp(self.sharpness * (similarities - similarities.max()))
+        return exp / exp.sum()
+
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Classify a user request.
+
+        Args:
+            text: The user's message
+
+        Returns:
+            Tuple of the best label (None if nothing matched) and its confidence
+        """
+        scores = [score for score in (self.rule_scores(text), self.model_scores(text)) if score is not None]
+        if not scores:
+            return None, 0.0
+        combined = np.mean(scores, axis=0)
+        best = int(np.argmax(combined))
+        return LABELS[best], float(combined[best])
+
+    def route(self, messages: Sequence) -> Optional[str]:
+        """
+        Decide the next worker locally when it is safe to do so.
+
+        Only the first hop is handled: the last message must be the user's. Worker
+        replies need the LLM to decide whether the request is complete.
+
+        Args:
+            messages: The conversation from the graph state
+
+        Returns:
+            The worker name, or None to fall back to the LLM router
+        """
+        if not messages:
+            return None
+        last = messages[-1]
+        if getattr(last, "type", None) != "human" or getattr(last, "name", None) or not isinstance(last.content, str):
+            return None
+        label, confidence = self.classify(last.content)
+        if label is not None and confidence >= self.threshold:
+            return label
+        return None
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]], dimensions: int = 4096, **kwargs) -> "IntentRouter":
+        """
+        Train the nearest-centroid model.
+
+        Args:
+            examples: (text, label) pairs, labels outside LABELS are ignored
+            dimensions: Size of the hashed feature space
+
+        Returns:
+            Router with the trained centroids
+        """
+        sums = np.zeros((len(LABELS), dimensions), dtype=np.float32)
+        for text, label in examples:
+            if label in LABELS:
+                sums[LABELS.index(label)] += _features(text, dimensions)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = np.divide(sums, norms, out=np.zeros_like(sums), where=norms > 0)
+        return cls(centroids=centroids, dimensions=dimensions, **kwargs)
+
+    def save(self, path: str) -> None:
+        """Persist the trained centroids."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, centroids=self.centroids, dimensions=self.dimensions)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "IntentRouter":
+        """Load centroids saved with save()."""
+        data = np.load(path)
+        return cls(centroids=data["centroids"], dimensions=int(data["dimensions"]), **kwargs)
+
+
+class RoutingDecisionLog:
+    """Append-only JSONL log of LLM routing decisions, used as training data."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["RoutingDecisionLog"]:
+        """Build the log from ROUTER_DECISION_LOG, None when unset."""
+        path = os.getenv("ROUTER_DECISION_LOG")
+        return cls(path) if path else None
+
+    def record(self, messages: Sequence, decision: str, latency_ms: float) -> None:
+        """Log a first-hop LLM routing decision."""
+        if not messages or getattr(messages[-1], "type", None) != "human" or getattr(messages[-1], "name", None):
+            return
+        line = json.dumps({"text": messages[-1].content, "label": decision, "latency_ms": round(latency_ms, 2)})
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    @staticmethod
+    def read(path: str) -> List[dict]:
+        """Read all logged decisions."""
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local intent router from logged routing decisions")
+    parser.add_argument("--log", default=os.getenv("ROUTER_DECISION_LOG", ".cache/routing_decisions.jsonl"), help="JSONL decision log")
+    parser.add_argument("--model", default=os.getenv("ROUTER_MODEL_PATH", ".cache/intent_router.npz"), help="Output model path")
+    parser.add_argument("--dimensions", type=int, default=4096, help="Hashed feature dimensions")
+    args = parser.parse_args()
+
+    records = RoutingDecisionLog.read(args.log)
+    router = IntentRouter.train(((r["text"], r["label"]) for r in records), dimensions=args.dimensions)
+    router.save(args.model)
+    print(f"Trained on {len(records)} decisions, model written to {args.model}")
+
+
+if __name__ == "__main__":
+    main()
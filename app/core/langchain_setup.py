@@ -1,25 +1,28 @@
-from langchain_openai import AzureChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-import os
 from dotenv import load_dotenv
+from app.services.LlmClientRegistry import LlmClientRegistry
+from app.services.RunnableCache import RunnableCache
 
 # Load environment variables from .env file
 load_dotenv()
 
-def get_llm():
-    """Initialize and return the Azure OpenAI Chat LLM."""
-    return AzureChatOpenAI(
-        deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-        temperature=0.3
+# langchain/openai imports are deferred to first use to keep them off the startup path
+
+def get_llm(temperature: float = 0.3, deployment_name: str = None, hedge: bool = False):
+    """Return the shared Azure OpenAI Chat LLM for the deployment and temperature, hedged across the pool if asked."""
+    return LlmClientRegistry.get_llm(deployment_name=deployment_name, temperature=temperature, hedge=hedge)
+
+def create_simple_chain(prompt_template, temperature: float = 0.3, deployment_name: str = None):
+    """Get the simple LangChain for the given prompt template, building it once per template and model config."""
+    return RunnableCache.get_or_build(
+        ("simple_chain", prompt_template, deployment_name, temperature),
+        lambda: _build_simple_chain(prompt_template, temperature, deployment_name),
     )
 
-def create_simple_chain(prompt_template):
+def _build_simple_chain(prompt_template, temperature: float, deployment_name: str):
     """Create a simple LangChain with the given prompt template using modern syntax."""
-    llm = get_llm()
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = get_llm(temperature=temperature, deployment_name=deployment_name)
     # Convert to ChatPromptTemplate for chat models
     prompt = ChatPromptTemplate.from_template(prompt_template)
     
@@ -29,4 +32,4 @@ def create_simple_chain(prompt_template):
     # If you need to transform the input before passing to the prompt
     # chain = RunnablePassthrough() | prompt | llm
     
-    return chain
\ No newline at end of file
+    return chain
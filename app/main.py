@@ -1,10 +1,13 @@
-from fastapi import FastAPI
+import math
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
-from app.core.CoreAgent import OrchestratorAgent
-from app.services.LoggerService import LoggerService
+from app.services.LoggerService import CorrelationIdMiddleware, LoggerService
 from app.services.RouterService import RouterService
-from app.services.DataStoreManager import DataStoreManager
+from app.services.DataStoreManager import AsyncDataStoreManager, DataStoreManager
+from app.services.LlmClientRegistry import LlmClientRegistry
+from app.services.AdmissionController import AdmissionRejected
 
 # Configure logging
 LoggerService.configure_logger()
@@ -20,7 +23,11 @@ async def lifespan(app: FastAPI):
     global agent
     logger.info("Initializing OrchestratorAgent...")
     try:
+        # Imported here so that importing the app does not pull in langgraph/langchain
+        from app.core.CoreAgent import OrchestratorAgent
+
         DataStoreManager.initialize()  # Initialize the DataStoreManager with the connection string from environment variables
+        AsyncDataStoreManager.initialize()  # Shares one aiohttp session for non-blocking blob I/O
         agent = OrchestratorAgent.get_instance()
         logger.info("OrchestratorAgent initialized successfully")
     except Exception as e:
@@ -29,12 +36,29 @@ async def lifespan(app: FastAPI):
     
     yield  # This is where the app runs
     
-    # Shutdown logic (if needed)
+    # Shutdown logic
     logger.info("Shutting down application...")
+    from app.core.CoreAgent import OrchestratorAgent
+
+    # The agent holds model clients bound to the HTTP clients closed below; a restarted app builds a new one
+    OrchestratorAgent.reset_instance()
+    agent = None
+    await LlmClientRegistry.aclose()
+    await AsyncDataStoreManager.aclose()
+    LoggerService.shutdown()
 
 # Pass the lifespan to FastAPI
 app = FastAPI(title="Doccy Backend API", lifespan=lifespan)
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed load with a 503 when the LLM admission queue is full."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -42,7 +66,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# Tag every request and its log records with a correlation id
+app.add_middleware(CorrelationIdMiddleware)
+
 # Set up API routes using the service
 RouterService.SetupRoutes(app)
\ No newline at end of file
@@ -3,11 +3,21 @@ from pydantic import BaseModel, Field
 
 class DataStoreInput(BaseModel):
     """Input for data store operations."""
-    operation: str = Field(..., description="Operation to perform: 'store', 'retrieve', 'list', or 'delete'")
+    operation: str = Field(..., description="Operation to perform: 'store', 'retrieve', 'list', 'delete', 'exists', 'store_many', 'retrieve_many', 'delete_many', or 'build_manifest'")
     container_name: str = Field(..., description="Name of the data store container to use")
-    data_id: Optional[str] = Field(None, description="Unique identifier for the data (required for store, retrieve, delete)")
+    data_id: Optional[str] = Field(None, description="Unique identifier for the data (required for store, retrieve, delete, exists)")
     data: Optional[Dict[str, Any]] = Field(None, description="Data to store (required for store operation)")
-    prefix: Optional[str] = Field(None, description="Prefix filter for list operation")
+    prefix: Optional[str] = Field(None, description="Prefix filter for list operation, or the prefix a build_manifest operation covers")
+    page_size: Optional[int] = Field(None, description="Maximum number of data_ids returned by one list operation")
+    continuation_token: Optional[str] = Field(None, description="Token from the previous list result to fetch the next page")
+    data_ids: Optional[List[str]] = Field(None, description="Identifiers of the records (required for retrieve_many, delete_many)")
+    items: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="Records to store keyed by data_id (required for store_many)")
+
+class VectorSearchInput(BaseModel):
+    """Input for vector similarity search over stored chunks."""
+    query: str = Field(..., description="Natural language text to find similar chunks for")
+    container_name: Optional[str] = Field(None, description="Data store container holding the chunks (defaults to the configured chunk container)")
+    top_k: int = Field(5, description="Number of chunks to return")
 
 class DataResponse(BaseModel):
     """Response model for data store operations."""
@@ -1,3 +1,11 @@
+from typing import List, Union
+
 from langgraph.graph import MessagesState
+from langgraph.prebuilt.chat_agent_executor import AgentState
 class State(MessagesState):
-    next: str
\ No newline at end of file
+    next: Union[str, List[str]]  # Worker routed to, or the workers of a parallel fan-out
+    summary: str  # Rolling summary of the turns folded out of messages
+
+class SubAgentState(AgentState):
+    """State of the sub-agent ReAct graphs, carrying the orchestrator's rolling summary."""
+    summary: str
@@ -0,0 +1,465 @@
+"""
+Admission control for Azure OpenAI calls.
+
+Every chat and embedding call made through LlmClientRegistry passes the
+controller of its deployment before it is sent. A call is admitted when
+
+  * fewer than LLM_ADMISSION_MAX_CONCURRENCY calls are in flight,
+  * the token bucket holds one request of the requests-per-minute budget and
+    the estimated tokens (prompt plus expected completion) of the
+    tokens-per-minute budget, and
+  * no 429 cool-down is active.
+
+Calls that cannot be admitted wait in a priority queue: interactive work
+(agent queries, generation) ahead of default work ahead of batch work
+(research, ingestion), first come first served within a level. When the queue
+holds LLM_ADMISSION_MAX_QUEUE waiters, a newcomer displaces the lowest priority
+waiter behind it or is rejected immediately with AdmissionRejected, which the
+API turns into a 503 with a Retry-After header. A 429 from the service pauses
+admission for the whole deployment until its Retry-After has passed and the
+call is retried. Timeouts, connection errors, 408, 409 and 5xx responses, which
+the openai client would otherwise retry itself, are retried after an exponential
+backoff of that call only. Both share LLM_ADMISSION_MAX_RETRIES.
+
+Budgets are configured per deployment, falling back to the global settings:
+
+    LLM_ADMISSION_RPM=0            LLM_ADMISSION_GPT_4O_RPM=300      (0 = unlimited)
+    LLM_ADMISSION_TPM=0            LLM_ADMISSION_GPT_4O_TPM=50000
+
+Members of an LlmDeploymentPool have their own controller, named after the member.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+from app.services.LoggerService import LoggerService
+from app.services.MetricsService import MetricsService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+T = TypeVar("T")
+
+PRIORITIES = {"interactive": 0, "default": 1, "batch": 2}
+
+WAIT_SECONDS = MetricsService.histogram("doccy_llm_admission_wait_seconds", "Time LLM calls waited for admission",
+                                       ("deployment", "priority"))
+PRIORITY_NAMES = {level: name for name, level in PRIORITIES.items()}
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITIES["interactive"])
+
+
+class AdmissionRejected(Exception):
+    """An LLM call was shed because the admission queue is full or the wait exceeded its limit."""
+    status_code = 503
+
+    def __init__(self, deployment: str, retry_after: float, reason: str = "queue full"):
+        super().__init__(f"LLM admission rejected for {deployment}: {reason}, retry after {retry_after:.0f}s")
+        self.deployment = deployment
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Requests-per-minute and tokens-per-minute budgets, refilled continuously."""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        self.updated = now
+        if self.rpm:
+            self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60.0)
+
+    def delay(self, tokens: int, now: float) -> float:
+        """Seconds until one request of the given size fits both budgets."""
+        self._refill(now)
+        delay = 0.0
+        if self.rpm and self.requests < 1:
+            delay = (1 - self.requests) * 60.0 / self.rpm
+        if self.tpm:
+            # A request larger than the whole budget waits for a full bucket rather than forever
+            needed = min(tokens, self.tpm)
+            if self.tokens < needed:
+                delay = max(delay, (needed - self.tokens) * 60.0 / self.tpm)
+        return delay
+
+    def take(self, tokens: int) -> None:
+        if self.rpm:
+            self.requests -= 1
+        if self.tpm:
+            self.tokens -= min(tokens, self.tpm)
+
+    def adjust(self, tokens: int) -> None:
+        """Correct the token budget once the actual usage of a call is known."""
+        if self.tpm:
+            self.tokens = min(self.tpm, self.tokens - tokens)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "notify", "rejected", "enqueued")
+
+    def __init__(self, priority: int, seq: int, tokens: int, notify: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.notify = notify
+        self.rejected: Optional[AdmissionRejected] = None
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionController:
+    """Token-bucket and concurrency admission with a bounded priority queue for one deployment."""
+    _controllers: Dict[str, "AdmissionController"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, deployment: str, rpm: float = 0, tpm: float = 0, max_concurrency: int = 20,
+                 max_queue: int = 100, max_wait_seconds: float = 30.0, max_retries: int = 3):
+        self.deployment = deployment
+        self.bucket = TokenBucket(rpm, tpm)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._state_lock = threading.Lock()
+        self._waits_ms: deque = deque(maxlen=1000)
+        self.counters = {"admitted": 0, "queued": 0, "shed": 0, "throttled": 0, "retries": 0, "tokens_admitted": 0}
+
+    @classmethod
+    def for_deployment(cls, deployment: str) -> Optional["AdmissionController"]:
+        """Get the process-wide controller of a deployment, or None when LLM_ADMISSION_ENABLED is false."""
+        if os.getenv("LLM_ADMISSION_ENABLED", "true").lower() != "true":
+            return None
+        controller = cls._controllers.get(deployment)
+        if controller is None:
+            with cls._lock:
+                controller = cls._controllers.get(deployment)
+                if controller is None:
+                    controller = cls._controllers[deployment] = cls.from_env(deployment)
+        return controller
+
+    @classmethod
+    def from_env(cls, deployment: str) -> "AdmissionController":
+        """Read LLM_ADMISSION_<DEPLOYMENT>_* settings, falling back to the global LLM_ADMISSION_* ones."""
+        scope = re.sub(r"[^A-Z0-9]+", "_", deployment.upper())
+
+        def setting(name: str, default: str) -> float:
+            return float(os.getenv(f"LLM_ADMISSION_{scope}_{name}", os.getenv(f"LLM_ADMISSION_{name}", default)))
+
+        return cls(
+            deployment,
+            rpm=setting("RPM", "0"),
+            tpm=setting("TPM", "0"),
+            max_concurrency=int(setting("MAX_CONCURRENCY", os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))),
+            max_queue=int(setting("MAX_QUEUE", "100")),
+            max_wait_seconds=setting("MAX_WAIT_SECONDS", "30"),
+            max_retries=int(setting("MAX_RETRIES", "3")),
+        )
+
+    @staticmethod
+    @contextmanager
+    def priority(level: str) -> Iterator[None]:
+        """Run the LLM calls made inside the block at the given priority ('interactive', 'default' or 'batch')."""
+        token = _priority.set(PRIORITIES[level])
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Queue depth, in-flight calls, counters and recent admission wait times per deployment."""
+        return {deployment: controller.snapshot() for deployment, controller in cls._controllers.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._state_lock:
+            waits = sorted(self._waits_ms)
+            return {
+                "queue_depth": len(self._queue),
+                "in_flight": self.in_flight,
+                "cooldown_seconds": round(max(0.0, self.cooldown_until - time.monotonic()), 3),
+                **self.counters,
+                "wait_ms": {
+                    "count": len(waits),
+                    "mean": round(statistics.fmean(waits), 3) if waits else 0.0,
+                    "p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                    "p95": round(waits[int(len(waits) * 0.95)], 3) if waits else 0.0,
+                    "max": round(waits[-1], 3) if waits else 0.0,
+                },
+            }
+
+    # Queue
+
+    def _retry_after_hint(self) -> float:
+        """Rough time until the queue ahead of a new waiter drains."""
+        rate = self.bucket.rpm / 60.0 if self.bucket.rpm else max(self.max_concurrency, 1)
+        return max(1.0, self.cooldown_until - time.monotonic(), len(self._queue) / rate)
+
+    def _enqueue(self, tokens: int, notify: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(_priority.get(), next(self._seq), tokens, notify)
+        with self._state_lock:
+            if len(self._queue) >= self.max_queue:
+                lowest = max(self._queue)
+                if not waiter < lowest:
+                    self.counters["shed"] += 1
+                    raise AdmissionRejected(self.deployment, self._retry_after_hint())
+                # Displace the lowest priority waiter in favour of more urgent work
+                self._queue.remove(lowest)
+                heapq.heapify(self._queue)
+                lowest.rejected = AdmissionRejected(self.deployment, self._retry_after_hint(), "displaced by higher priority work")
+                self.counters["shed"] += 1
+                lowest.notify()
+            heapq.heappush(self._queue, waiter)
+            self.counters["queued"] += 1
+        return waiter
+
+    def _try_admit(self, waiter: _Waiter) -> Optional[float]:
+        """Admit the waiter if it is at the head and resources allow; otherwise how long to wait (None: until notified)."""
+        with self._state_lock:
+            if waiter.rejected is not None:
+                raise waiter.rejected
+            now = time.monotonic()
+            if self.max_wait_seconds and now - waiter.enqueued > self.max_wait_seconds:
+                self._remove(waiter)
+                self.counters["shed"] += 1
+                raise AdmissionRejected(self.deployment, self._retry_after_hint(), "waited too long")
+            if self._queue[0] is not waiter or self.in_flight >= self.max_concurrency:
+                return None
+            if now < self.cooldown_until:
+                return self.cooldown_until - now
+            delay = self.bucket.delay(waiter.tokens, now)
+            if delay > 0:
+                return delay
+            heapq.heappop(self._queue)
+            self.bucket.take(waiter.tokens)
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            self.counters["tokens_admitted"] += waiter.tokens
+            self._waits_ms.append((now - waiter.enqueued) * 1000)
+            WAIT_SECONDS.observe(now - waiter.enqueued, deployment=self.deployment, priority=PRIORITY_NAMES[waiter.priority])
+            if self._queue:
+                self._queue[0].notify()
+            return 0.0
+
+    def _remove(self, waiter: _Waiter) -> None:
+        if waiter in self._queue:
+            was_head = self._queue[0] is waiter
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+            if was_head and self._queue:
+                self._queue[0].notify()
+
+    def _wait_timeout(self, delay: Optional[float]) -> float:
+        # Waiters re-check at least once a second so the max wait and cool-downs are enforced
+        return min(delay, 1.0) if delay is not None else 1.0
+
+    def acquire(self, tokens: int) -> None:
+        """Block until a call with the estimated tokens is admitted."""
+        event = threading.Event()
+        waiter = self._enqueue(tokens, event.set)
+        try:
+            while True:
+                delay = self._try_admit(waiter)
+                if delay == 0:
+                    return
+                event.wait(self._wait_timeout(delay))
+                event.clear()
+        except BaseException:
+            with self._state_lock:
+                self._remove(waiter)
+            raise
+
+    async def aacquire(self, tokens: int) -> None:
+        """Wait without blocking the event loop until a call with the estimated tokens is admitted."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._enqueue(tokens, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                delay = self._try_admit(waiter)
+                if delay == 0:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), self._wait_timeout(delay))
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            with self._state_lock:
+                self._remove(waiter)
+            raise
+
+    def release(self, estimated_tokens: int = 0, used_tokens: Optional[int] = None) -> None:
+        """Return a concurrency slot, correcting the token budget with the actual usage when known."""
+        with self._state_lock:
+            self.in_flight -= 1
+            if used_tokens is not None:
+                self.bucket.adjust(used_tokens - estimated_tokens)
+            if self._queue:
+                self._queue[0].notify()
+
+    # 429 handling
+
+    @staticmethod
+    def _retry_after(error: BaseException) -> Optional[float]:
+        """Seconds the service asked to wait for a 429 error, or None when the error is not a 429."""
+        if getattr(error, "status_code", None) != 429:
+            return None
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000.0
+            value = headers.get("retry-after")
+            if value:
+                try:
+                    return float(value)
+                except ValueError:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+        return 0.0
+
+    @staticmethod
+    def _transient(error: BaseException) -> bool:
+        """Whether an error is one the openai client retries besides 429: timeouts, connection errors, 408, 409 and 5xx."""
+        status = getattr(error, "status_code", None)
+        if status is not None:
+            return status in (408, 409) or status >= 500
+        try:
+            import openai
+        except ImportError:
+            return False
+        # Also covers APITimeoutError
+        return isinstance(error, openai.APIConnectionError)
+
+    def _backoff(self, error: BaseException, attempt: int) -> Optional[float]:
+        """
+        Decide whether a failed call is retried.
+
+        A 429 pauses admission for the whole deployment, so the retry waits in
+        acquire; a transient error only delays the retry of this call.
+
+        Returns:
+            Seconds to sleep before retrying, or None to give up
+        """
+        if attempt >= self.max_retries:
+            return None
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            if not retry_after:
+                # No hint from the service: exponential backoff with jitter
+                retry_after = min(30.0, 2 ** attempt) * (0.5 + random.random())
+            with self._state_lock:
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + retry_after)
+                self.counters["throttled"] += 1
+                self.counters["retries"] += 1
+            logger.warning(f"Rate limited on {self.deployment}, pausing admission for {retry_after:.1f}s")
+            return 0.0
+        if not self._transient(error):
+            return None
+        # The openai client's schedule: 0.5s doubling up to 8s, with jitter
+        delay = min(8.0, 0.5 * 2 ** attempt) * (0.75 + 0.25 * random.random())
+        with self._state_lock:
+            self.counters["retries"] += 1
+        logger.warning(f"Transient error on {self.deployment}, retrying in {delay:.1f}s: {type(error).__name__}")
+        return delay
+
+    # Call wrappers
+
+    def call(self, fn: Callable[[], T], tokens: int, usage: Callable[[T], Optional[int]] = lambda result: None) -> T:
+        """Run fn once admitted, retrying after 429s and transient errors."""
+        for attempt in itertools.count():
+            self.acquire(tokens)
+            used = None
+            try:
+                result = fn()
+                used = usage(result)
+                return result
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.release(tokens, used)
+            time.sleep(delay)
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int, usage: Callable[[T], Optional[int]] = lambda result: None) -> T:
+        """Async variant of call."""
+        for attempt in itertools.count():
+            await self.aacquire(tokens)
+            used = None
+            try:
+                result = await fn()
+                used = usage(result)
+                return result
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.release(tokens, used)
+            await asyncio.sleep(delay)
+
+    def stream(self, fn: Callable[[], Iterator[T]], tokens: int) -> Iterator[T]:
+        """Stream fn once admitted, holding the slot until the stream ends; retried after a 429 or transient error before the first chunk."""
+        for attempt in itertools.count():
+            self.acquire(tokens)
+            started = False
+            try:
+                for chunk in fn():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                delay = None if started else self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.release(tokens)
+            time.sleep(delay)
+
+    async def astream(self, fn: Callable[[], AsyncIterator[T]], tokens: int) -> AsyncIterator[T]:
+        """Async variant of stream."""
+        for attempt in itertools.count():
+            await self.aacquire(tokens)
+            started = False
+            try:
+                async for chunk in fn():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                delay = None if started else self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.release(tokens)
+            await asyncio.sleep(delay)
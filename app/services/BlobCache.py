@@ -0,0 +1,330 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+# Fetch callback result: (content, etag), or None when the blob was not modified
+FetchResult = Optional[Tuple[bytes, str]]
+
+# Called with the key of each entry a tier evicted, outside the tier's lock
+EvictCallback = Callable[[str], None]
+
+
+class MemoryBlobStore:
+    """LRU of blob contents in process memory, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int, on_evict: Optional[EvictCallback] = None):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, etag: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        victims: List[str] = []
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (etag, data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                victim, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+                victims.append(victim)
+        if self.on_evict is not None:
+            for victim in victims:
+                self.on_evict(victim)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskBlobStore:
+    """LRU of blob contents in local files, bounded by total bytes and indexed in SQLite."""
+
+    def __init__(self, path: str, max_bytes: int, on_evict: Optional[EvictCallback] = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path / "index.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, etag TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blobs_accessed ON blobs (accessed_at)")
+        self._conn.commit()
+
+    def _file(self, key: str) -> Path:
+        return self.path / key[:2] / key
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            row = self._conn.execute("SELECT etag FROM blobs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                data = self._file(key).read_bytes()
+            except OSError:
+                self._conn.execute("DELETE FROM blobs WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE blobs SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0], data
+
+    def set(self, key: str, etag: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        victims: List[str] = []
+        with self._lock:
+            path = self._file(key)
+            path.parent.mkdir(exist_ok=True)
+            temp = path.with_suffix(".part")
+            temp.write_bytes(data)
+            os.replace(temp, path)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blobs (key, etag, size, accessed_at) VALUES (?, ?, ?, ?)", (key, etag, len(data), time.time())
+            )
+            overflow = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0] - self.max_bytes
+            if overflow > 0:
+                freed = 0
+                for victim, size in self._conn.execute("SELECT key, size FROM blobs ORDER BY accessed_at").fetchall():
+                    if freed >= overflow:
+                        break
+                    self._remove(victim)
+                    freed += size
+                    self.evictions += 1
+                    victims.append(victim)
+            self._conn.commit()
+        if self.on_evict is not None:
+            for victim in victims:
+                self.on_evict(victim)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+            self._conn.commit()
+
+    def _remove(self, key: str) -> None:
+        self._conn.execute("DELETE FROM blobs WHERE key = ?", (key,))
+        try:
+            self._file(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM blobs WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+
+class BlobCache:
+    """
+    Read-through cache for whole-blob downloads with ETag revalidation.
+
+    Blobs are kept in a memory tier and a disk tier, each LRU within its own byte
+    budget. A cached blob is revalidated with a conditional If-None-Match request
+    once it is older than BLOB_CACHE_FRESH_SECONDS (0: every read), and a 304
+    answer is served from the cache. Writes and deletes through the storage
+    services invalidate the entry. Validation times are dropped once neither tier
+    holds the blob any more.
+    """
+    _instance = None
+
+    def __init__(self, memory: Optional[MemoryBlobStore], disk: Optional[DiskBlobStore], fresh_seconds: float = 0.0):
+        self.memory = memory
+        self.disk = disk
+        self.fresh_seconds = fresh_seconds
+        self._validated_at: Dict[str, float] = {}
+        for tier in (memory, disk):
+            if tier is not None:
+                tier.on_evict = self._evicted
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "not_modified": 0, "misses": 0, "bytes_saved": 0, "invalidations": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["BlobCache"]:
+        """
+        Build the cache from BLOB_CACHE_* environment variables.
+
+        Returns:
+            The configured cache, or None when BLOB_CACHE_ENABLED is false
+        """
+        if os.getenv("BLOB_CACHE_ENABLED", "false").lower() != "true":
+            return None
+        memory_bytes = int(os.getenv("BLOB_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+        disk_bytes = int(os.getenv("BLOB_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+        return cls(
+            MemoryBlobStore(memory_bytes) if memory_bytes > 0 else None,
+            DiskBlobStore(os.getenv("BLOB_CACHE_DIR", ".cache/blobs"), disk_bytes) if disk_bytes > 0 else None,
+            float(os.getenv("BLOB_CACHE_FRESH_SECONDS", "0")),
+        )
+
+    @classmethod
+    def get_instance(cls) -> Optional["BlobCache"]:
+        """Get the process-wide cache configured from the environment (None if disabled)."""
+        if cls._instance is None:
+            cls._instance = cls.from_env() or False
+        return cls._instance or None
+
+    @staticmethod
+    def _key(container_name: str, blob_name: str) -> str:
+        return hashlib.sha256(f"{container_name}/{blob_name}".encode("utf-8")).hexdigest()
+
+    def _evicted(self, key: str) -> None:
+        """Forget when a blob was validated once the last tier holding it evicted it."""
+        if (self.memory is None or key not in self.memory) and (self.disk is None or key not in self.disk):
+            self._validated_at.pop(key, None)
+
+    def _lookup(self, key: str) -> Tuple[Optional[Tuple[str, bytes]], Optional[str]]:
+        """Find a cached entry and the tier it came from; disk hits are promoted to memory."""
+        entry = self.memory.get(key) if self.memory is not None else None
+        if entry is not None:
+            return entry, "memory_hits"
+        entry = self.disk.get(key) if self.disk is not None else None
+        if entry is not None:
+            if self.memory is not None:
+                self.memory.set(key, *entry)
+            return entry, "disk_hits"
+        return None, None
+
+    def _store(self, key: str, etag: str, data: bytes) -> None:
+        if self.memory is not None:
+            self.memory.set(key, etag, data)
+        if self.disk is not None:
+            self.disk.set(key, etag, data)
+        self._validated_at[key] = time.monotonic()
+
+    def lookup(self, container_name: str, blob_name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Look up a blob before going to storage.
+
+        Returns:
+            Tuple of the content if it can be served without revalidation, and the
+            cached ETag to revalidate with otherwise (None when not cached)
+        """
+        key = self._key(container_name, blob_name)
+        entry, tier = self._lookup(key)
+        if entry is None:
+            return None, None
+        etag, data = entry
+        if self.fresh_seconds and time.monotonic() - self._validated_at.get(key, float("-inf")) < self.fresh_seconds:
+            self.counters[tier] += 1
+            self.counters["bytes_saved"] += len(data)
+            return data, etag
+        return None, etag
+
+    def complete(self, container_name: str, blob_name: str, result: FetchResult) -> bytes:
+        """
+        Record the outcome of the (conditional) download that followed lookup().
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the blob
+            result: (content, etag) from storage, or None when it answered 304 Not Modified
+
+        Returns:
+            The blob content
+        """
+        key = self._key(container_name, blob_name)
+        if result is None:
+            entry, _ = self._lookup(key)
+            if entry is None:
+                raise LookupError(f"Blob '{blob_name}' was revalidated but is no longer cached")
+            self.counters["not_modified"] += 1
+            self.counters["bytes_saved"] += len(entry[1])
+            self._validated_at[key] = time.monotonic()
+            return entry[1]
+        data, etag = result
+        self.counters["misses"] += 1
+        self._store(key, etag, data)
+        return data
+
+    def read_through(self, container_name: str, blob_name: str, fetch: Callable[[Optional[str]], FetchResult]) -> bytes:
+        """
+        Serve a blob from the cache, revalidating or downloading it as needed.
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the blob
+            fetch: Downloads the blob, conditionally on the given ETag when it is not None
+
+        Returns:
+            The blob content
+        """
+        data, etag = self.lookup(container_name, blob_name)
+        if data is not None:
+            return data
+        result = fetch(etag)
+        try:
+            return self.complete(container_name, blob_name, result)
+        except LookupError:
+            # Evicted between revalidation and read, fetch unconditionally
+            return self.complete(container_name, blob_name, fetch(None))
+
+    def invalidate(self, container_name: str, blob_name: str) -> None:
+        """Drop a blob from both tiers."""
+        key = self._key(container_name, blob_name)
+        if self.memory is not None:
+            self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+        self._validated_at.pop(key, None)
+        self.counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss metrics.
+
+        Returns:
+            Counters, hit rate, entry counts, memory usage and evictions
+        """
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["not_modified"]
+        reads = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / reads, 4) if reads else 0.0,
+            "memory_entries": len(self.memory) if self.memory is not None else 0,
+            "memory_bytes": self.memory.size if self.memory is not None else 0,
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+            "evictions": (self.memory.evictions if self.memory is not None else 0) + (self.disk.evictions if self.disk is not None else 0),
+        }
@@ -0,0 +1,453 @@
+import bisect
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from dotenv import load_dotenv
+
+from app.services.DataStoreManager import DataStoreManager
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+# Continuation tokens handed out for manifest pages, distinct from service markers
+_TOKEN_PREFIX = "manifest:"
+
+# Journal records are appended as single blocks, which the service caps at 4 MiB
+_BLOCK_BYTES = 4 * 1024 * 1024 - 1024
+
+# Past this many changes, applying a journal tail re-sorts instead of inserting name by name
+_RESORT_CHANGES = 1024
+
+
+class _Manifest:
+    """A manifest as read by this process: its snapshot plus the journal records replayed on top."""
+
+    def __init__(self, etag: Optional[str], journal: int, offset: int, names: List[str], journal_bytes: int = 0):
+        self.etag = etag
+        self.journal = journal
+        self.offset = offset
+        self.names = names
+        self.journal_bytes = journal_bytes
+
+
+class BlobManifest:
+    """
+    Sorted list of the blob names under a prefix, kept per container/prefix.
+
+    A manifest turns listing and existence checks under its prefix into a small
+    read. It is a snapshot blob with the sorted names plus numbered append-blob
+    journals of the names written and deleted since. AzureStorageService records
+    every blob it creates or deletes with record(), which appends one block to the
+    current journal of each covering manifest; writes that bypass it are only
+    picked up by rebuilding the manifest.
+
+    Readers replay the journal tail on top of their parsed copy. Once the journals
+    outgrow BLOB_MANIFEST_JOURNAL_MAX_BYTES they are sealed, so writers move on to
+    the next one, and folded into a new snapshot. A manifest that misses a change
+    is retired until it is rebuilt, so it never answers from a stale list.
+    """
+    _manifests: Dict[Tuple[str, str], _Manifest] = {}
+    _prefixes: Dict[str, Tuple[float, List[str]]] = {}
+    _journal_hints: Dict[Tuple[str, str], int] = {}
+
+    @staticmethod
+    def root() -> str:
+        return os.getenv("BLOB_MANIFEST_PREFIX", "_manifests/")
+
+    @staticmethod
+    def refresh_seconds() -> float:
+        """How long the set of manifests of a container is trusted before it is listed again."""
+        return float(os.getenv("BLOB_MANIFEST_REFRESH_SECONDS", "60"))
+
+    @staticmethod
+    def journal_max_bytes() -> int:
+        return int(os.getenv("BLOB_MANIFEST_JOURNAL_MAX_BYTES", str(1024 * 1024)))
+
+    @classmethod
+    def _base(cls, prefix: str) -> str:
+        return f"{cls.root()}prefix={quote(prefix, safe='')}"
+
+    @classmethod
+    def blob_name(cls, prefix: str) -> str:
+        return f"{cls._base(prefix)}.json"
+
+    @classmethod
+    def _journal_name(cls, prefix: str, number: int) -> str:
+        return f"{cls._base(prefix)}.{number:06d}.log"
+
+    @staticmethod
+    def _blob_client(container_name: str, blob_name: str):
+        return DataStoreManager.get_instance().get_container_client(container_name).get_blob_client(blob_name)
+
+    @classmethod
+    def prefixes(cls, container_name: str) -> List[str]:
+        """Prefixes that have a manifest (built or being built) in the container, longest first."""
+        cached = cls._prefixes.get(container_name)
+        if cached is not None and time.monotonic() - cached[0] < cls.refresh_seconds():
+            return cached[1]
+        from app.services.azurestorageservice import AzureStorageService
+
+        root = f"{cls.root()}prefix="
+        found = set()
+        for blob in AzureStorageService.list_blobs(container_name, name_starts_with=root):
+            match = re.fullmatch(r"(.*?)(?:\.\d+\.log|\.json)", blob.name[len(root):])
+            if match:
+                found.add(unquote(match.group(1)))
+        prefixes = sorted(found, key=len, reverse=True)
+        cls._prefixes[container_name] = (time.monotonic(), prefixes)
+        return prefixes
+
+    @classmethod
+    def covering(cls, container_name: str, name: str) -> Optional[str]:
+        """The longest manifest prefix that the given name or listing prefix falls under, if any."""
+        return next((prefix for prefix in cls.prefixes(container_name) if name.startswith(prefix)), None)
+
+    @classmethod
+    def _listing(cls, container_name: str, prefix: str) -> Tuple[Optional[str], Dict[int, int]]:
+        """
+        List the blobs of a manifest with a single request.
+
+        Returns:
+            Tuple of the snapshot ETag (None if there is no snapshot) and the size per journal number
+        """
+        from app.services.azurestorageservice import AzureStorageService
+
+        base = f"{cls._base(prefix)}."
+        etag, journals = None, {}
+        for blob in AzureStorageService.list_blobs(container_name, name_starts_with=base):
+            rest = blob.name[len(base):]
+            if rest == "json":
+                etag = blob.etag
+            elif re.fullmatch(r"\d+\.log", rest):
+                journals[int(rest[:-len(".log")])] = blob.size
+        return etag, journals
+
+    @classmethod
+    def _read_snapshot(cls, container_name: str, prefix: str) -> Optional[_Manifest]:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            downloader = cls._blob_client(container_name, cls.blob_name(prefix)).download_blob()
+        except ResourceNotFoundError:
+            return None
+        body = json.loads(downloader.readall())
+        return _Manifest(downloader.properties.etag, body.get("journal", 0), body.get("offset", 0), body["names"])
+
+    @classmethod
+    def _write(cls, container_name: str, prefix: str, manifest: _Manifest, etag: Optional[str] = None) -> None:
+        """Write a snapshot; with an etag, only if it is unchanged since it was read."""
+        from azure.core import MatchConditions
+
+        body = json.dumps({
+            "prefix": prefix, "count": len(manifest.names), "journal": manifest.journal, "offset": manifest.offset,
+            "names": manifest.names,
+        }).encode("utf-8")
+        blob_client = cls._blob_client(container_name, cls.blob_name(prefix))
+        if etag is None:
+            result = blob_client.upload_blob(body, overwrite=True)
+        else:
+            result = blob_client.upload_blob(body, overwrite=True, match_condition=MatchConditions.IfNotModified, etag=etag)
+        manifest.etag = result["etag"]
+        cls._manifests[(container_name, prefix)] = manifest
+
+    @staticmethod
+    def _encode(added: List[str], removed: List[str]) -> Iterator[bytes]:
+        """Journal records, one JSON line each, batched so that every block fits a single append."""
+        for key, names in (("added", added), ("removed", removed)):
+            batch, size = [], 0
+            for name in names:
+                encoded = len(json.dumps(name)) + 2
+                if batch and size + encoded > _BLOCK_BYTES:
+                    yield (json.dumps({key: batch}) + "\n").encode("utf-8")
+                    batch, size = [], 0
+                batch.append(name)
+                size += encoded
+            if batch:
+                yield (json.dumps({key: batch}) + "\n").encode("utf-8")
+
+    @staticmethod
+    def _replay(names: List[str], data: bytes) -> Tuple[List[str], int]:
+        """
+        Apply journal records to a sorted name list.
+
+        Returns:
+            The updated list (a copy) and the bytes consumed, up to the end of the last complete record
+        """
+        consumed = data.rfind(b"\n") + 1
+        records = [json.loads(line) for line in data[:consumed].splitlines() if line]
+        if sum(len(record.get("added", ())) + len(record.get("removed", ())) for record in records) > _RESORT_CHANGES:
+            current = set(names)
+            for record in records:
+                current.update(record.get("added", ()))
+                current.difference_update(record.get("removed", ()))
+            return sorted(current), consumed
+        names = list(names)
+        for record in records:
+            for name in record.get("added", ()):
+                index = bisect.bisect_left(names, name)
+                if index == len(names) or names[index] != name:
+                    names.insert(index, name)
+            for name in record.get("removed", ()):
+                index = bisect.bisect_left(names, name)
+                if index < len(names) and names[index] == name:
+                    del names[index]
+        return names, consumed
+
+    @classmethod
+    def _catch_up(cls, container_name: str, prefix: str, manifest: _Manifest, journals: Dict[int, int]) -> _Manifest:
+        """
+        Replay the journal records written since the given state into a new state.
+
+        Raises:
+            ResourceNotFoundError: If a journal it needs was folded into a newer snapshot and deleted
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        if manifest.journal not in journals and any(number > manifest.journal for number in journals):
+            raise ResourceNotFoundError(f"Journal {manifest.journal} of manifest '{prefix}' was compacted")
+        names, number, offset, journal_bytes = manifest.names, manifest.journal, manifest.offset, manifest.journal_bytes
+        for current in sorted(n for n in journals if n >= manifest.journal):
+            if current != number:
+                number, offset = current, 0
+            if journals[current] <= offset:
+                continue
+            data = AzureStorageService.download_range(container_name, cls._journal_name(prefix, current), offset,
+                                                      journals[current] - offset)
+            names, consumed = cls._replay(names, data)
+            offset += consumed
+            journal_bytes += consumed
+        return _Manifest(manifest.etag, number, offset, names, journal_bytes)
+
+    @classmethod
+    def _fetch(cls, container_name: str, prefix: str) -> Optional[_Manifest]:
+        """
+        Read a manifest, reusing the parsed snapshot while its ETag matches and replaying the journal tail.
+
+        Returns:
+            The current manifest, or None when it has no snapshot (not built yet, or retired)
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+
+        key = (container_name, prefix)
+        for _ in range(3):
+            etag, journals = cls._listing(container_name, prefix)
+            if etag is None:
+                cls._manifests.pop(key, None)
+                return None
+            cached = cls._manifests.get(key)
+            if cached is None or cached.etag != etag:
+                cached = cls._read_snapshot(container_name, prefix)
+                if cached is None:
+                    continue
+            try:
+                manifest = cls._catch_up(container_name, prefix, cached, journals)
+            except ResourceNotFoundError:
+                # Folded into a newer snapshot between listing and reading
+                cls._manifests.pop(key, None)
+                continue
+            current = cls._manifests.get(key)
+            if current is None or current.etag != manifest.etag or (current.journal, current.offset) <= (manifest.journal, manifest.offset):
+                cls._manifests[key] = manifest
+            if manifest.journal_bytes > cls.journal_max_bytes():
+                cls._compact(container_name, prefix, manifest, journals)
+            return manifest
+        raise RuntimeError(f"Manifest '{container_name}/{prefix}' kept changing while it was read")
+
+    @classmethod
+    def _compact(cls, container_name: str, prefix: str, manifest: _Manifest, journals: Dict[int, int]) -> None:
+        """Fold the journals into a new snapshot; failures leave the journals to be replayed as before."""
+        from app.services.azurestorageservice import AzureStorageService
+
+        try:
+            number = max(journals)
+            # Writers move on to the next journal once the current one is sealed
+            AzureStorageService.create_append_blob(container_name, cls._journal_name(prefix, number + 1))
+            AzureStorageService.seal_append_blob(container_name, cls._journal_name(prefix, number))
+            _, journals = cls._listing(container_name, prefix)
+            folded = cls._catch_up(container_name, prefix, manifest, {n: size for n, size in journals.items() if n <= number})
+            cls._write(container_name, prefix, _Manifest(None, number + 1, 0, folded.names), manifest.etag)
+            for old in journals:
+                if old <= number:
+                    cls._delete(container_name, cls._journal_name(prefix, old))
+            logger.info(f"Folded the journals of manifest '{container_name}/{prefix}' into a new snapshot ({len(folded.names)} names)")
+        except Exception as e:
+            # Most often another process compacted first (412)
+            logger.info(f"Did not compact manifest '{container_name}/{prefix}': {str(e)}")
+
+    @staticmethod
+    def _delete(container_name: str, blob_name: str) -> None:
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        try:
+            AzureStorageService.delete_blob(container_name, blob_name)
+        except ResourceNotFoundError:
+            pass
+
+    @classmethod
+    def build(cls, container_name: str, prefix: str = "") -> int:
+        """
+        Create or replace the manifest of a prefix from a full listing.
+
+        The new journal is created before listing, so blobs written while the
+        listing runs are recorded in it. For a new manifest, the listing waits
+        until every process has refreshed its set of manifests
+        (BLOB_MANIFEST_REFRESH_SECONDS) and records its writes.
+
+        Args:
+            container_name: Name of the container
+            prefix: Blob name prefix the manifest covers
+
+        Returns:
+            Number of names in the manifest
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        etag, journals = cls._listing(container_name, prefix)
+        number = max(journals, default=-1) + 1
+        AzureStorageService.create_append_blob(container_name, cls._journal_name(prefix, number))
+        cls._prefixes.pop(container_name, None)
+        for old in journals:
+            try:
+                AzureStorageService.seal_append_blob(container_name, cls._journal_name(prefix, old))
+            except ResourceNotFoundError:
+                pass
+        if etag is None and not journals:
+            time.sleep(cls.refresh_seconds())
+
+        names, token = [], None
+        while True:
+            page, token = AzureStorageService.list_page(container_name, prefix, 5000, token)
+            names.extend(name for name in page if not name.startswith(cls.root()))
+            if token is None:
+                break
+        names.sort()
+        cls._write(container_name, prefix, _Manifest(None, number, 0, names))
+        for old in journals:
+            cls._delete(container_name, cls._journal_name(prefix, old))
+        logger.info(f"Built manifest for '{container_name}/{prefix}' with {len(names)} names")
+        return len(names)
+
+    @classmethod
+    def _append(cls, container_name: str, prefix: str, record: bytes) -> None:
+        """Append a record to the current journal of a manifest, following it when it was sealed."""
+        from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        key = (container_name, prefix)
+        number = cls._journal_hints.get(key)
+        for _ in range(5):
+            if number is None:
+                _, journals = cls._listing(container_name, prefix)
+                if not journals:
+                    AzureStorageService.create_append_blob(container_name, cls._journal_name(prefix, 0))
+                number = max(journals, default=0)
+            try:
+                AzureStorageService.append_block(container_name, cls._journal_name(prefix, number), record)
+                cls._journal_hints[key] = number
+                return
+            except ResourceNotFoundError:
+                pass
+            except HttpResponseError as e:
+                # Sealed: being folded into a snapshot, the next journal exists already
+                if e.status_code != 409:
+                    raise
+            number = None
+        raise RuntimeError(f"Could not append to the journal of manifest '{container_name}/{prefix}'")
+
+    @classmethod
+    def record(cls, container_name: str, added: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+        """
+        Record created and deleted blob names in every manifest covering them.
+
+        Called by AzureStorageService after each write and delete. A manifest whose
+        journal cannot be appended to is retired (its snapshot deleted), so that
+        readers fall back to listing until it is rebuilt.
+
+        Args:
+            container_name: Name of the container
+            added: Blob names that were written
+            removed: Blob names that were deleted
+        """
+        root = cls.root()
+        added = [name for name in added if not name.startswith(root)]
+        removed = [name for name in removed if not name.startswith(root)]
+        if not added and not removed:
+            return
+        try:
+            prefixes = cls.prefixes(container_name)
+        except Exception as e:
+            logger.warning(f"Could not list the manifests of '{container_name}': {str(e)}")
+            return
+        for prefix in prefixes:
+            add = sorted(name for name in added if name.startswith(prefix))
+            drop = sorted(name for name in removed if name.startswith(prefix))
+            if not add and not drop:
+                continue
+            try:
+                for record in cls._encode(add, drop):
+                    cls._append(container_name, prefix, record)
+            except Exception as e:
+                logger.error(f"Failed to record changes in manifest '{container_name}/{prefix}', retiring it until it is rebuilt: {str(e)}")
+                cls._manifests.pop((container_name, prefix), None)
+                try:
+                    cls._delete(container_name, cls.blob_name(prefix))
+                except Exception as retire_error:
+                    logger.error(f"Failed to retire manifest '{container_name}/{prefix}': {str(retire_error)}")
+
+    @classmethod
+    def list_page(cls, container_name: str, prefix: str, page_size: int,
+                  continuation_token: Optional[str] = None) -> Optional[Tuple[List[str], Optional[str]]]:
+        """
+        List one page of names under a prefix from the covering manifest.
+
+        Returns:
+            Tuple of names and next-page token, or None when no built manifest covers
+            the prefix or the token came from a service listing
+        """
+        if continuation_token is not None and not continuation_token.startswith(_TOKEN_PREFIX):
+            return None
+        manifest_prefix = cls.covering(container_name, prefix)
+        if manifest_prefix is None:
+            return None
+        manifest = cls._fetch(container_name, manifest_prefix)
+        if manifest is None:
+            return None
+        names = manifest.names
+        if continuation_token:
+            start = bisect.bisect_right(names, continuation_token[len(_TOKEN_PREFIX):])
+        else:
+            start = bisect.bisect_left(names, prefix)
+        page = []
+        for name in names[start:start + page_size]:
+            if not name.startswith(prefix):
+                break
+            page.append(name)
+        more = len(page) == page_size and start + page_size < len(names) and names[start + page_size].startswith(prefix)
+        return page, f"{_TOKEN_PREFIX}{page[-1]}" if more else None
+
+    @classmethod
+    def contains(cls, container_name: str, blob_name: str) -> Optional[bool]:
+        """
+        Check a name against the covering manifest.
+
+        Returns:
+            Whether the manifest lists the name, or None when no built manifest covers it
+        """
+        manifest_prefix = cls.covering(container_name, blob_name)
+        if manifest_prefix is None:
+            return None
+        manifest = cls._fetch(container_name, manifest_prefix)
+        if manifest is None:
+            return None
+        index = bisect.bisect_left(manifest.names, blob_name)
+        return index < len(manifest.names) and manifest.names[index] == blob_name
@@ -0,0 +1,589 @@
+"""
+Columnar binary segment format for Chunk records.
+
+A segment stores many chunks in one blob instead of one JSON document per
+chunk. Layout (all integers little-endian):
+
+    b"CSEG" | uint32 header length | JSON header | padding | column sections
+
+The header lists every column section as {"offset", "length", "dtype"} from the
+start of the segment. Sections are 64-byte aligned so they can be viewed in
+place with numpy:
+
+    vectors                     float32 [count, dimensions]
+    has_vector                  uint8 [count]
+    <field>.offsets / .data     uint64 [count + 1] offsets into UTF-8 bytes
+    <field>.valid               uint8 [count], optional fields only
+    Categories.list_offsets     uint32 [count + 1] into the Categories.values strings
+
+Convert the JSON chunk blobs of a container:
+
+    python -m app.services.ChunkSegment --container chunks
+"""
+import argparse
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.models.DataStoreModel import Chunk
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+MAGIC = b"CSEG"
+VERSION = 1
+_ALIGNMENT = 64
+# First ranged read when only the header is needed, headers are a few KB
+_HEADER_READ_SIZE = 64 * 1024
+
+# Chunk string fields stored as offset-indexed text columns, and which of them may be None
+STRING_FIELDS = ("RId", "ChunkId", "Next_ChunkId", "Previous_ChunkId", "Parent_ChunkId", "Context", "Tag")
+OPTIONAL_FIELDS = ("Next_ChunkId", "Previous_ChunkId", "Parent_ChunkId")
+
+# Sections needed to index a segment: ids and embeddings, no text
+VECTOR_COLUMNS = ("vectors", "has_vector", "ChunkId.offsets", "ChunkId.data")
+
+
+def parse_header(data: Union[bytes, memoryview]) -> Tuple[dict, int]:
+    """
+    Parse the segment header from the start of a segment.
+
+    Returns:
+        The header and the number of bytes it occupies
+
+    Raises:
+        ValueError: If data is not a segment or too short to hold the header
+    """
+    data = memoryview(data)
+    if bytes(data[:4]) != MAGIC:
+        raise ValueError("Not a chunk segment")
+    (header_length,) = struct.unpack_from("<I", data, 4)
+    if len(data) < 8 + header_length:
+        raise ValueError(f"Segment header needs {8 + header_length} bytes")
+    return json.loads(bytes(data[8:8 + header_length]).decode("utf-8")), 8 + header_length
+
+
+def _string_column(values: Sequence[Optional[str]]) -> Dict[str, np.ndarray]:
+    """Encode strings as uint64 offsets plus one UTF-8 byte buffer."""
+    encoded = [(value or "").encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {"offsets": offsets, "data": np.frombuffer(b"".join(encoded), dtype=np.uint8)}
+
+
+class ChunkSegment:
+    """
+    Read-only view over an encoded segment.
+
+    Columns are numpy views on the underlying buffer (bytes, memoryview or mmap),
+    so opening a segment copies nothing; strings are decoded only when accessed.
+    """
+
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview, mmap.mmap], _mmap: Optional[mmap.mmap] = None):
+        self._buffer = memoryview(buffer)
+        self._mmap = _mmap
+        self._sections: Optional[Dict[str, memoryview]] = None
+        header, _ = parse_header(self._buffer)
+        self._set_header(header)
+
+    def _set_header(self, header: dict) -> None:
+        if header["version"] > VERSION:
+            raise ValueError(f"Unsupported chunk segment version {header['version']}")
+        self.header = header
+        self.count: int = header["count"]
+        self.dimensions: int = header["dimensions"]
+        self._row_by_id: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_sections(cls, header: dict, sections: Dict[str, Union[bytes, memoryview]]) -> "ChunkSegment":
+        """
+        Build a segment from a subset of its column sections, e.g. fetched with ranged reads.
+
+        Accessing a column that was not loaded raises KeyError.
+        """
+        segment = cls.__new__(cls)
+        segment._buffer = None
+        segment._mmap = None
+        segment._sections = {name: memoryview(data) for name, data in sections.items()}
+        segment._set_header(header)
+        return segment
+
+    @classmethod
+    def open(cls, path: str) -> "ChunkSegment":
+        """Memory-map a segment file."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, _mmap=mapped)
+
+    def close(self) -> None:
+        """Release the memory map, if any. Arrays taken from the segment must not be used afterwards."""
+        try:
+            if self._buffer is not None:
+                self._buffer.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            # Column views are still referenced, the mapping is released with them
+            pass
+
+    def __enter__(self) -> "ChunkSegment":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def column(self, name: str) -> np.ndarray:
+        """Zero-copy view of a column section."""
+        section = self.header["columns"][name]
+        if self._sections is not None:
+            if name not in self._sections:
+                raise KeyError(f"Column '{name}' was not loaded")
+            return np.frombuffer(self._sections[name], dtype=section["dtype"], count=section["length"])
+        return np.frombuffer(self._buffer, dtype=section["dtype"], count=section["length"], offset=section["offset"])
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Embedding matrix of shape (count, dimensions); rows without embeddings are zero."""
+        return self.column("vectors").reshape(self.count, self.dimensions)
+
+    @property
+    def has_vector(self) -> np.ndarray:
+        return self.column("has_vector").astype(bool)
+
+    def _string(self, field: str, row: int) -> str:
+        offsets = self.column(f"{field}.offsets")
+        return self.column(f"{field}.data")[int(offsets[row]):int(offsets[row + 1])].tobytes().decode("utf-8")
+
+    def value(self, field: str, row: int) -> Optional[str]:
+        """Decode one string field of one row."""
+        if field in OPTIONAL_FIELDS and not self.column(f"{field}.valid")[row]:
+            return None
+        return self._string(field, row)
+
+    def strings(self, field: str) -> List[Optional[str]]:
+        """Decode a whole string column."""
+        offsets = self.column(f"{field}.offsets").tolist()
+        data = self.column(f"{field}.data").tobytes()
+        values = [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(self.count)]
+        if field in OPTIONAL_FIELDS:
+            valid = self.column(f"{field}.valid")
+            values = [value if valid[i] else None for i, value in enumerate(values)]
+        return values
+
+    def ids(self) -> List[str]:
+        return self.strings("ChunkId")
+
+    def categories(self, row: int) -> List[str]:
+        list_offsets = self.column("Categories.list_offsets")
+        return [self._string("Categories.values", i) for i in range(int(list_offsets[row]), int(list_offsets[row + 1]))]
+
+    def row(self, chunk_id: str) -> Optional[int]:
+        """Row number of a chunk id, None if it is not in this segment."""
+        if self._row_by_id is None:
+            self._row_by_id = {chunk_id: row for row, chunk_id in enumerate(self.ids())}
+        return self._row_by_id.get(chunk_id)
+
+    def chunk(self, row: int, with_vector: bool = True) -> Chunk:
+        """Materialize one row as a Chunk."""
+        fields = {field: self.value(field, row) for field in STRING_FIELDS}
+        vector = self.vectors[row].tolist() if with_vector and self.column("has_vector")[row] else None
+        return Chunk(**fields, Categories=self.categories(row), Vector_Embeddings=vector)
+
+    def __iter__(self) -> Iterator[Chunk]:
+        for row in range(self.count):
+            yield self.chunk(row)
+
+    @staticmethod
+    def encode(chunks: Sequence[Chunk], dimensions: Optional[int] = None) -> bytes:
+        """
+        Encode chunks into a segment.
+
+        Args:
+            chunks: Chunks to store, in row order
+            dimensions: Embedding size, inferred from the first chunk with embeddings
+
+        Returns:
+            The encoded segment
+        """
+        if dimensions is None:
+            dimensions = next((len(c.Vector_Embeddings) for c in chunks if c.Vector_Embeddings), 0)
+        vectors = np.zeros((len(chunks), dimensions), dtype=np.float32)
+        has_vector = np.zeros(len(chunks), dtype=np.uint8)
+        for row, chunk in enumerate(chunks):
+            if chunk.Vector_Embeddings:
+                if len(chunk.Vector_Embeddings) != dimensions:
+                    raise ValueError(f"Chunk {chunk.ChunkId} has {len(chunk.Vector_Embeddings)} dimensions, expected {dimensions}")
+                vectors[row] = chunk.Vector_Embeddings
+                has_vector[row] = 1
+
+        columns: Dict[str, np.ndarray] = {"vectors": vectors.reshape(-1), "has_vector": has_vector}
+        for field in STRING_FIELDS:
+            values = [getattr(chunk, field) for chunk in chunks]
+            for part, array in _string_column(values).items():
+                columns[f"{field}.{part}"] = array
+            if field in OPTIONAL_FIELDS:
+                columns[f"{field}.valid"] = np.array([value is not None for value in values], dtype=np.uint8)
+        list_offsets = np.zeros(len(chunks) + 1, dtype=np.uint32)
+        np.cumsum([len(chunk.Categories) for chunk in chunks], out=list_offsets[1:])
+        columns["Categories.list_offsets"] = list_offsets
+        for part, array in _string_column([category for chunk in chunks for category in chunk.Categories]).items():
+            columns[f"Categories.values.{part}"] = array
+
+        def layout(data_start: int) -> dict:
+            sections, offset = {}, data_start
+            for name, array in columns.items():
+                offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+                sections[name] = {"offset": offset, "length": int(array.size), "dtype": array.dtype.str}
+                offset += array.nbytes
+            return sections
+
+        # Section offsets depend on the header length, which depends on the offsets; settle the fixed point
+        data_start = 0
+        while True:
+            header = json.dumps({"version": VERSION, "count": len(chunks), "dimensions": dimensions,
+                                 "columns": layout(data_start)}).encode("utf-8")
+            needed = -(-(8 + len(header)) // _ALIGNMENT) * _ALIGNMENT
+            if needed == data_start:
+                break
+            data_start = needed
+
+        out = io.BytesIO()
+        out.write(MAGIC)
+        out.write(struct.pack("<I", len(header)))
+        out.write(header)
+        for name, section in json.loads(header)["columns"].items():
+            out.write(b"\0" * (section["offset"] - out.tell()))
+            out.write(columns[name].tobytes())
+        return out.getvalue()
+
+
+class ChunkSegmentStore:
+    """Reads and writes chunk segments in a data store container."""
+    # Segment blob holding each chunk id, per container, and the chunk ids of each known segment blob
+    _locations: Dict[str, Dict[str, str]] = {}
+    _segment_ids: Dict[str, Dict[str, List[str]]] = {}
+    _locations_lock = threading.Lock()
+    # One download at a time per cached segment file
+    _download_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def prefix() -> str:
+        return os.getenv("CHUNK_SEGMENT_PREFIX", "_segments/")
+
+    @classmethod
+    def segment_blobs(cls, container_name: str, name_prefix: str = "") -> List[str]:
+        """Names of the segment blobs in a container, optionally only those whose name starts with name_prefix, in write order."""
+        from app.services.azurestorageservice import AzureStorageService
+
+        return sorted(blob.name for blob in AzureStorageService.list_blobs(container_name, name_starts_with=cls.prefix() + name_prefix)
+                      if blob.name.endswith(".cseg"))
+
+    @classmethod
+    def delete_stale(cls, container_name: str, name_prefix: str, pattern: str, written: Sequence[str]) -> List[str]:
+        """
+        Delete segments left over from an earlier, longer write of the same set.
+
+        Args:
+            container_name: Data store container
+            name_prefix: Start of the segment names of the set, e.g. '<rid>-' for the batches of a document
+            pattern: Regular expression the rest of the name (without extension) must match, e.g. r'\d{5}'
+            written: Blob names written by the current write, which are kept
+
+        Returns:
+            Ids of the chunks held by the deleted segments
+        """
+        from app.services.azurestorageservice import AzureStorageService
+
+        written = set(written)
+        start, suffix = len(cls.prefix() + name_prefix), re.compile(pattern)
+        stale = [blob_name for blob_name in cls.segment_blobs(container_name, name_prefix)
+                 if blob_name not in written and suffix.fullmatch(blob_name[start:-len(".cseg")])]
+        if not stale:
+            return []
+        chunk_ids = []
+        for blob_name in stale:
+            chunk_ids.extend(cls.load_columns(container_name, blob_name, ("ChunkId.offsets", "ChunkId.data")).ids())
+        for blob_name, error in AzureStorageService.delete_many(container_name, stale).items():
+            if error is not None:
+                logger.warning(f"Failed to delete stale segment '{blob_name}': {str(error)}")
+            else:
+                cls._remember(container_name, blob_name, None)
+        logger.info(f"Deleted {len(stale)} stale segments from '{container_name}'")
+        return chunk_ids
+
+    @classmethod
+    def write(cls, container_name: str, name: str, chunks: Sequence[Chunk], dimensions: Optional[int] = None) -> str:
+        """
+        Store chunks as one segment blob.
+
+        Returns:
+            The blob name
+        """
+        from app.services.azurestorageservice import AzureStorageService
+
+        blob_name = f"{cls.prefix()}{name}.cseg"
+        AzureStorageService.upload_data(container_name, blob_name, io.BytesIO(ChunkSegment.encode(chunks, dimensions)))
+        cls._remember(container_name, blob_name, [chunk.ChunkId for chunk in chunks])
+        return blob_name
+
+    @classmethod
+    def _remember(cls, container_name: str, blob_name: str, chunk_ids: Optional[Sequence[str]]) -> None:
+        """Record the chunk ids a segment blob holds now, None when it was deleted."""
+        with cls._locations_lock:
+            locations = cls._locations.setdefault(container_name, {})
+            segments = cls._segment_ids.setdefault(container_name, {})
+            for chunk_id in segments.pop(blob_name, ()):
+                if locations.get(chunk_id) == blob_name:
+                    del locations[chunk_id]
+            if chunk_ids is not None:
+                segments[blob_name] = list(chunk_ids)
+                locations.update(dict.fromkeys(chunk_ids, blob_name))
+
+    @classmethod
+    def _scan(cls, container_name: str) -> None:
+        """Read the chunk ids of segment blobs not seen yet and forget those that are gone."""
+        listed = cls.segment_blobs(container_name)
+        with cls._locations_lock:
+            known = set(cls._segment_ids.get(container_name, {}))
+        for blob_name in known.difference(listed):
+            cls._remember(container_name, blob_name, None)
+        for blob_name in listed:
+            if blob_name not in known:
+                cls._remember(container_name, blob_name, cls.load_columns(container_name, blob_name, ("ChunkId.offsets", "ChunkId.data")).ids())
+
+    @classmethod
+    def locate(cls, container_name: str, chunk_ids: Sequence[str]) -> Dict[str, str]:
+        """
+        Find the segment blobs holding chunks.
+
+        Segments written by this process are known already; on an unknown id the
+        container's segment list is read again and new segments are scanned.
+
+        Returns:
+            Segment blob name per chunk id, ids not stored in any segment are left out
+        """
+        with cls._locations_lock:
+            locations = cls._locations.get(container_name, {})
+            complete = all(chunk_id in locations for chunk_id in chunk_ids)
+        if not complete:
+            cls._scan(container_name)
+        with cls._locations_lock:
+            locations = cls._locations.get(container_name, {})
+            return {chunk_id: locations[chunk_id] for chunk_id in chunk_ids if chunk_id in locations}
+
+    @classmethod
+    def read_chunks(cls, container_name: str, chunk_ids: Sequence[str]) -> Dict[str, Chunk]:
+        """
+        Read chunks stored in segments, without their embeddings.
+
+        The segments holding them are downloaded to CHUNK_SEGMENT_CACHE_DIR and
+        memory-mapped; further reads of an unchanged segment only check its ETag.
+
+        Args:
+            container_name: Data store container
+            chunk_ids: Ids to read
+
+        Returns:
+            Chunk per id, ids not stored in any segment are left out
+        """
+        by_segment: Dict[str, List[str]] = {}
+        for chunk_id, blob_name in cls.locate(container_name, chunk_ids).items():
+            by_segment.setdefault(blob_name, []).append(chunk_id)
+        found: Dict[str, Chunk] = {}
+        for blob_name, ids in by_segment.items():
+            with ChunkSegment.open(cls.cached_segment(container_name, blob_name)) as segment:
+                rows = {chunk_id: segment.row(chunk_id) for chunk_id in ids}
+                found.update({chunk_id: segment.chunk(row, with_vector=False) for chunk_id, row in rows.items() if row is not None})
+                if any(row is None for row in rows.values()):
+                    # Rewritten by another process since it was scanned
+                    cls._remember(container_name, blob_name, segment.ids())
+        return found
+
+    @staticmethod
+    def cache_dir() -> str:
+        return os.getenv("CHUNK_SEGMENT_CACHE_DIR", ".cache/segments")
+
+    @classmethod
+    def cached_segment(cls, container_name: str, blob_name: str) -> str:
+        """
+        Get a whole segment as a file in CHUNK_SEGMENT_CACHE_DIR and return the local path.
+
+        The ETag of each downloaded segment is kept in a sidecar file; a cached file
+        is reused as long as the blob still has that ETag, at the cost of one
+        properties request.
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        path = os.path.join(cls.cache_dir(), container_name, blob_name)
+        etag_path = f"{path}.etag"
+        with cls._locations_lock:
+            lock = cls._download_locks.setdefault(path, threading.Lock())
+        with lock:
+            # Read before downloading: if the blob changes meanwhile, the next call sees a different ETag
+            etag = AzureStorageService.get_etag(container_name, blob_name)
+            if etag is None:
+                raise ResourceNotFoundError(f"Segment '{blob_name}' does not exist")
+            try:
+                with open(etag_path, encoding="utf-8") as f:
+                    if f.read() == etag and os.path.exists(path):
+                        return path
+            except FileNotFoundError:
+                pass
+            AzureStorageService.download_to_file(container_name, blob_name, path)
+            temp_path = f"{etag_path}.{os.getpid()}.part"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(etag)
+            os.replace(temp_path, etag_path)
+        return path
+
+    @staticmethod
+    def read_header(container_name: str, blob_name: str) -> dict:
+        """Read only the header of a segment blob."""
+        from app.services.azurestorageservice import AzureStorageService
+
+        head = AzureStorageService.download_range(container_name, blob_name, 0, _HEADER_READ_SIZE)
+        try:
+            header, _ = parse_header(head)
+        except ValueError:
+            (header_length,) = struct.unpack_from("<I", head, 4)
+            header, _ = parse_header(AzureStorageService.download_range(container_name, blob_name, 0, 8 + header_length))
+        return header
+
+    @classmethod
+    def load_columns(cls, container_name: str, blob_name: str, columns: Sequence[str]) -> ChunkSegment:
+        """
+        Read selected columns of a segment blob with ranged reads.
+
+        Adjacent sections are fetched with a single request.
+
+        Args:
+            container_name: Data store container
+            blob_name: Segment blob
+            columns: Column section names, e.g. VECTOR_COLUMNS
+
+        Returns:
+            Partial segment holding only the requested columns
+        """
+        from app.services.azurestorageservice import AzureStorageService
+
+        header = cls.read_header(container_name, blob_name)
+        wanted = sorted(((header["columns"][name]["offset"], name) for name in columns))
+        nbytes = {name: header["columns"][name]["length"] * np.dtype(header["columns"][name]["dtype"]).itemsize
+                  for name in columns}
+
+        # Merge sections separated only by alignment padding into one range
+        spans: List[Tuple[int, int, List[str]]] = []
+        for offset, name in wanted:
+            end = offset + nbytes[name]
+            if spans and offset - spans[-1][1] < _ALIGNMENT:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], end), spans[-1][2] + [name])
+            else:
+                spans.append((offset, end, [name]))
+
+        sections: Dict[str, memoryview] = {}
+        for start, end, names in spans:
+            data = memoryview(AzureStorageService.download_range(container_name, blob_name, start, end - start)) if end > start else memoryview(b"")
+            for name in names:
+                offset = header["columns"][name]["offset"] - start
+                sections[name] = data[offset:offset + nbytes[name]]
+        return ChunkSegment.from_sections(header, sections)
+
+    @classmethod
+    def load(cls, container_name: str, columns: Optional[Sequence[str]] = None) -> Iterator[ChunkSegment]:
+        """
+        Load every segment of a container.
+
+        Full segments are downloaded to CHUNK_SEGMENT_CACHE_DIR with parallel range
+        requests and memory-mapped. With columns, only those sections are read.
+
+        Args:
+            container_name: Data store container
+            columns: Optional column section names to read instead of whole segments
+        """
+        for blob_name in cls.segment_blobs(container_name):
+            if columns is not None:
+                yield cls.load_columns(container_name, blob_name, columns)
+                continue
+            yield ChunkSegment.open(cls.cached_segment(container_name, blob_name))
+
+    @classmethod
+    def convert_json_blobs(cls, container_name: str, prefix: Optional[str] = None, segment_size: int = 50000) -> List[str]:
+        """
+        Convert the per-chunk JSON blobs of a container into segments.
+
+        The JSON blobs are left in place so existing readers keep working. Segments
+        are named 000000, 000001, ... for the whole container and
+        '<quoted prefix>-000000', ... for a prefix, so a prefix conversion never
+        replaces the segments of a full one.
+
+        Args:
+            container_name: Data store container holding the chunks
+            prefix: Optional blob name prefix to convert
+            segment_size: Chunks per segment
+
+        Returns:
+            Names of the written segment blobs
+        """
+        from app.services.azurestorageservice import AzureStorageService
+
+        def stored_chunks() -> Iterable[Chunk]:
+            for blob in AzureStorageService.list_blobs(container_name, name_starts_with=prefix):
+                if not blob.name.endswith(".json"):
+                    continue
+                try:
+                    yield Chunk(**json.loads(AzureStorageService.download_data(container_name, blob.name)))
+                except Exception:
+                    # Not every record in the container is a chunk
+                    continue
+
+        from app.services.VectorIndex import VectorIndexRegistry
+
+        name_prefix = f"{quote(prefix, safe='')}-" if prefix else ""
+        written, batch, chunk_ids = [], [], set()
+        for chunk in stored_chunks():
+            batch.append(chunk)
+            chunk_ids.add(chunk.ChunkId)
+            if len(batch) >= segment_size:
+                written.append(cls.write(container_name, f"{name_prefix}{len(written):06d}", batch))
+                batch = []
+        if batch:
+            written.append(cls.write(container_name, f"{name_prefix}{len(written):06d}", batch))
+        # Segments beyond the last one written belong to an earlier, larger conversion of the same prefix
+        stale_ids = cls.delete_stale(container_name, name_prefix, r"\d{6}", written)
+        VectorIndexRegistry.update(container_name, removed=[chunk_id for chunk_id in stale_ids if chunk_id not in chunk_ids])
+        logger.info(f"Converted JSON chunks in '{container_name}' into {len(written)} segments")
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert per-chunk JSON blobs into columnar chunk segments")
+    parser.add_argument("--container", default=os.getenv("VECTOR_INDEX_CONTAINER", "chunks"), help="Data store container")
+    parser.add_argument("--prefix", default=None, help="Only convert blobs with this prefix")
+    parser.add_argument("--segment-size", type=int, default=50000, help="Chunks per segment")
+    args = parser.parse_args()
+
+    from app.services.DataStoreManager import DataStoreManager
+
+    DataStoreManager.initialize()
+    written = ChunkSegmentStore.convert_json_blobs(args.container, args.prefix, args.segment_size)
+    print(f"Wrote {len(written)} segments to '{args.container}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,771 @@
+"""
+LangGraph checkpointer persisting conversation threads to the data store.
+
+Each thread is kept as one append-only log of framed records. A graph step adds
+a small 'put' record holding the checkpoint bookkeeping and only the channels
+that changed in that step; for list channels such as 'messages' that grew by
+appending, only the new tail is written; a subgraph's copy of its parent's
+messages is written as a reference to them. Task results are added as 'writes'
+records. After at least CHECKPOINT_SNAPSHOT_EVERY steps, once the appended
+records outgrow the previous snapshot, the log is replaced by a snapshot of the
+latest checkpoints, so a thread is always restored with a single read of a log
+at most about twice the size of its state.
+
+Recently used threads are kept decoded in an in-memory LRU. Before a cached
+thread is used its stored log is revalidated with one properties request
+(CHECKPOINT_REVALIDATE, on by default) and reloaded when another process wrote
+to it. Appends and snapshots are conditional on the version that was read; when
+another process wrote first, the log is reloaded and the step recorded on top
+of it. Set CHECKPOINT_REVALIDATE=false only when a single process serves all threads.
+
+Backends are selected with CHECKPOINT_BACKEND:
+
+    datastore   one append blob per thread in CHECKPOINT_CONTAINER (default), which is
+                created on the first write when it does not exist
+    file        one file per thread under CHECKPOINT_DIR, for tests and local runs
+    none        no checkpointer, every request starts a fresh conversation
+"""
+import asyncio
+import operator
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+# Record frame: serializer type length, payload length
+_FRAME = struct.Struct("<II")
+
+# Service limit on the data of one append block
+_APPEND_BLOCK_SIZE = 4 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+class CheckpointConflict(Exception):
+    """The stored thread log changed since it was read; reload it and apply the change again."""
+
+
+class FileCheckpointBackend:
+    """Thread logs stored as local files."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.log")
+
+    def read(self, key: str) -> Optional[bytes]:
+        return self.read_versioned(key)[0]
+
+    def read_versioned(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """The stored log and its version, (None, None) when there is none."""
+        try:
+            with open(self._file(key), "rb") as f:
+                return f.read(), self._version(os.fstat(f.fileno()))
+        except FileNotFoundError:
+            return None, None
+
+    @staticmethod
+    def _version(stat: os.stat_result) -> str:
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def version(self, key: str) -> Optional[str]:
+        try:
+            return self._version(os.stat(self._file(key)))
+        except FileNotFoundError:
+            return None
+
+    def _check(self, key: str, version: Optional[str]) -> None:
+        # Not atomic across processes, this backend is meant for tests and local runs
+        if self.version(key) != version:
+            raise CheckpointConflict(key)
+
+    def append(self, key: str, data: bytes, version: Optional[str]) -> str:
+        """Append to the log if it still has version (None: does not exist); returns the new version."""
+        self._check(key, version)
+        with open(self._file(key), "ab") as f:
+            f.write(data)
+            f.flush()
+            return self._version(os.fstat(f.fileno()))
+
+    def replace(self, key: str, data: bytes, version: Optional[str]) -> str:
+        """Replace the log if it still has version (None: does not exist); returns the new version."""
+        self._check(key, version)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._file(key))
+        return self.version(key)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._file(key))
+        except FileNotFoundError:
+            pass
+
+
+class DataStoreCheckpointBackend:
+    """Thread logs stored as append blobs in a data store container, created on first write when missing."""
+
+    def __init__(self, container_name: str, prefix: str = "threads/"):
+        self.container_name = container_name
+        self.prefix = prefix
+        self._container_checked = False
+
+    def _blob(self, key: str) -> str:
+        return f"{self.prefix}{key}.log"
+
+    def _write(self, write: Callable[[], T]) -> T:
+        """
+        Run a conditional write, creating the container and retrying once when it does not exist yet.
+
+        Raises:
+            CheckpointConflict: If the log was changed or deleted by someone else
+        """
+        from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError
+        from app.services.DataStoreManager import DataStoreManager
+
+        try:
+            try:
+                result = write()
+            except ResourceNotFoundError as e:
+                if self._container_checked or e.error_code != "ContainerNotFound":
+                    raise
+                logger.info(f"Creating checkpoint container '{self.container_name}'")
+                try:
+                    DataStoreManager.get_instance().get_container_client(self.container_name).create_container()
+                except ResourceExistsError:
+                    # Created by another worker in the meantime
+                    pass
+                result = write()
+        except ResourceNotFoundError as e:
+            if e.error_code == "ContainerNotFound":
+                raise
+            raise CheckpointConflict(str(e)) from e
+        except HttpResponseError as e:
+            if e.status_code not in (409, 412):
+                raise
+            raise CheckpointConflict(str(e)) from e
+        self._container_checked = True
+        return result
+
+    def read(self, key: str) -> Optional[bytes]:
+        return self.read_versioned(key)[0]
+
+    def read_versioned(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """The stored log and its ETag, (None, None) when there is none."""
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        try:
+            return AzureStorageService.download_with_etag(self.container_name, self._blob(key))
+        except ResourceNotFoundError:
+            # Also raised while the container does not exist yet
+            return None, None
+
+    def version(self, key: str) -> Optional[str]:
+        from app.services.azurestorageservice import AzureStorageService
+
+        return AzureStorageService.get_etag(self.container_name, self._blob(key))
+
+    def append(self, key: str, data: bytes, version: Optional[str]) -> str:
+        """Append to the log if it still has ETag version (None: does not exist); returns the new ETag."""
+        from app.services.azurestorageservice import AzureStorageService
+
+        if version is None:
+            return self.replace(key, data, None)
+
+        def write() -> str:
+            etag = version
+            for offset in range(0, len(data), _APPEND_BLOCK_SIZE):
+                _, etag = AzureStorageService.append_block(
+                    self.container_name, self._blob(key), data[offset:offset + _APPEND_BLOCK_SIZE], etag=etag
+                )
+            return etag
+
+        return self._write(write)
+
+    def replace(self, key: str, data: bytes, version: Optional[str]) -> str:
+        """Replace the log if it still has ETag version (None: does not exist); returns the new ETag."""
+        from app.services.azurestorageservice import AzureStorageService
+
+        return self._write(lambda: AzureStorageService.upload_append_blob(self.container_name, self._blob(key), data, version))
+
+    def delete(self, key: str) -> None:
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        try:
+            AzureStorageService.delete_blob(self.container_name, self._blob(key))
+        except ResourceNotFoundError:
+            pass
+
+
+class _ThreadLog:
+    """Decoded state of one thread, mirroring the layout of langgraph's InMemorySaver."""
+
+    def __init__(self):
+        # ns -> checkpoint_id -> (serialized checkpoint without values, serialized metadata, parent id)
+        self.checkpoints: Dict[str, Dict[str, Tuple[Tuple[str, bytes], Tuple[str, bytes], Optional[str]]]] = {}
+        # (ns, channel, version) -> serialized value
+        self.blobs: Dict[Tuple[str, str, Any], Tuple[str, bytes]] = {}
+        # (ns, checkpoint_id) -> (task_id, idx) -> (task_id, channel, serialized value, task_path)
+        self.writes: Dict[Tuple[str, str], Dict[Tuple[str, int], Tuple[str, str, Tuple[str, bytes], str]]] = {}
+        # (ns, channel) -> (version, items) of the newest list value, the base for append deltas
+        self.tails: Dict[Tuple[str, str], Tuple[Any, tuple]] = {}
+        self.puts_since_snapshot = 0
+        self.touched: set = set()
+        # Size of the last snapshot and of the records appended after it
+        self.snapshot_bytes = 0
+        self.appended_bytes = 0
+        # Backend version of the stored log this state was read from or last written as
+        self.version: Optional[str] = None
+        self.lock = threading.Lock()
+
+
+class DataStoreCheckpointer(BaseCheckpointSaver):
+    """Checkpointer writing incremental per-thread logs through a storage backend."""
+    _instance = None
+    _configured = False
+
+    def __init__(self, backend, cache_threads: int = 256, snapshot_every: int = 20, revalidate: bool = True):
+        super().__init__()
+        self.backend = backend
+        self.cache_threads = cache_threads
+        self.snapshot_every = snapshot_every
+        self.revalidate = revalidate
+        self._threads: "OrderedDict[str, _ThreadLog]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "cache_hits": 0, "stale": 0, "conflicts": 0, "appends": 0, "append_bytes": 0,
+                      "snapshots": 0, "snapshot_bytes": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["DataStoreCheckpointer"]:
+        """Build the checkpointer from CHECKPOINT_* settings, or None when disabled."""
+        kind = os.getenv("CHECKPOINT_BACKEND", "datastore").lower()
+        if kind == "none":
+            return None
+        if kind == "file":
+            backend = FileCheckpointBackend(os.getenv("CHECKPOINT_DIR", ".cache/checkpoints"))
+        else:
+            backend = DataStoreCheckpointBackend(
+                os.getenv("CHECKPOINT_CONTAINER", "checkpoints"), os.getenv("CHECKPOINT_PREFIX", "threads/")
+            )
+        return cls(
+            backend,
+            cache_threads=int(os.getenv("CHECKPOINT_CACHE_THREADS", "256")),
+            snapshot_every=int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "20")),
+            revalidate=os.getenv("CHECKPOINT_REVALIDATE", "true").lower() == "true",
+        )
+
+    @classmethod
+    def get_instance(cls) -> Optional["DataStoreCheckpointer"]:
+        """Get the process-wide checkpointer, or None when checkpointing is disabled."""
+        if not cls._configured:
+            cls._instance = cls.from_env()
+            cls._configured = True
+        return cls._instance
+
+    # Log encoding
+
+    def _encode(self, records: Sequence[Dict[str, Any]]) -> bytes:
+        frames = []
+        for record in records:
+            type_, data = self.serde.dumps_typed(record)
+            type_ = type_.encode()
+            frames.append(_FRAME.pack(len(type_), len(data)) + type_ + data)
+        return b"".join(frames)
+
+    def _decode(self, data: bytes) -> Iterator[Dict[str, Any]]:
+        offset = 0
+        while offset + _FRAME.size <= len(data):
+            type_len, data_len = _FRAME.unpack_from(data, offset)
+            start = offset + _FRAME.size
+            end = start + type_len + data_len
+            if end > len(data):
+                break
+            type_ = data[start:start + type_len].decode()
+            yield self.serde.loads_typed((type_, data[start + type_len:end]))
+            offset = end
+        if offset < len(data):
+            logger.warning(f"Ignoring {len(data) - offset} bytes of a truncated checkpoint record")
+
+    # Thread cache
+
+    def _thread(self, thread_id: str) -> _ThreadLog:
+        """
+        Get the decoded log of a thread, loading it with one read on a cache miss.
+
+        A cached log is used only while the stored log still has the version it
+        was read from or written as, otherwise it is loaded again.
+        """
+        key = quote(thread_id, safe="")
+        with self._lock:
+            cached = self._threads.get(thread_id)
+            if cached is not None:
+                self._threads.move_to_end(thread_id)
+        if cached is not None:
+            if not self.revalidate or self.backend.version(key) == cached.version:
+                with self._lock:
+                    self.stats["cache_hits"] += 1
+                return cached
+            with self._lock:
+                self.stats["stale"] += 1
+
+        log = _ThreadLog()
+        data, log.version = self.backend.read_versioned(key)
+        if data:
+            for record in self._decode(data):
+                self._apply(log, record)
+            log.appended_bytes = len(data)
+
+        with self._lock:
+            self.stats["loads"] += 1
+            existing = self._threads.get(thread_id)
+            if existing is not None and existing is not cached:
+                # Loaded by another request in the meantime
+                return existing
+            self._threads[thread_id] = log
+            while len(self._threads) > self.cache_threads:
+                self._threads.popitem(last=False)
+        return log
+
+    def _update(self, thread_id: str, change: Callable[[_ThreadLog], None]) -> None:
+        """
+        Apply a change to a thread under its lock, reloading the thread and applying
+        the change again when another process wrote to its log first.
+        """
+        for _ in range(3):
+            log = self._thread(thread_id)
+            with log.lock:
+                try:
+                    change(log)
+                    return
+                except CheckpointConflict:
+                    pass
+            # The cached state is behind the stored log and may be half updated, drop it
+            with self._lock:
+                self.stats["conflicts"] += 1
+                if self._threads.get(thread_id) is log:
+                    del self._threads[thread_id]
+            logger.warning(f"Checkpoint log of thread '{thread_id}' was written by another process, reloading it")
+        raise RuntimeError(f"Checkpoint log of thread '{thread_id}' kept changing while it was written")
+
+    # Records
+
+    @staticmethod
+    def _items(value: Any) -> Optional[tuple]:
+        """The items of a list value that can be stored as an append delta."""
+        if isinstance(value, list):
+            return tuple(value)
+        return None
+
+    def _track(self, log: _ThreadLog, ns: str, channel: str, version: Any, value: Any) -> None:
+        """Remember the newest list value of a channel as the base for later deltas."""
+        items = self._items(value)
+        if items is not None:
+            log.tails[(ns, channel)] = (version, items)
+        else:
+            log.tails.pop((ns, channel), None)
+
+    @staticmethod
+    def _tail_bases(log: _ThreadLog, ns: str) -> Callable[[str], List[Tuple[str, Any, tuple]]]:
+        """
+        Lists a new value of a channel may share a prefix with: the channel's previous
+        value in the same namespace and, for subgraphs that start from their parent's
+        state, the latest value in the root namespace.
+        """
+
+        def bases(channel: str) -> List[Tuple[str, Any, tuple]]:
+            found = []
+            for base_ns in dict.fromkeys((ns, "")):
+                tail = log.tails.get((base_ns, channel))
+                if tail is not None and (base_ns, channel, tail[0]) in log.blobs:
+                    found.append((base_ns, tail[0], tail[1]))
+            return found
+
+        return bases
+
+    def _pack(self, value: Any, channel: str, bases: Callable[[str], List[Tuple[str, Any, tuple]]],
+              same: Callable[[Any, Any], bool] = operator.is_) -> Dict[str, Any]:
+        """
+        Encode a value for the log, writing a list that starts like a stored list as a delta.
+
+        The delta keeps the longest shared prefix of one of the base lists and appends
+        the rest. Live writes compare items by identity, so a message replaced in place
+        under the same id is never mistaken for the stored one. Dicts, such as a
+        subgraph's input or the writes recorded in checkpoint metadata, are packed per key.
+        """
+        items = self._items(value)
+        if items is not None:
+            best = None
+            for base_ns, version, base_items in bases(channel):
+                keep = 0
+                for new, old in zip(items, base_items):
+                    if not same(new, old):
+                        break
+                    keep += 1
+                if keep and (best is None or keep > best["keep"]):
+                    best = {"base": (base_ns, version), "keep": keep, "append": list(items[keep:])}
+            if best is not None:
+                return best
+        elif isinstance(value, dict):
+            fields = {key: self._pack(field, key, bases, same) for key, field in value.items()}
+            if any("value" not in field for field in fields.values()):
+                return {"fields": fields}
+        return {"value": value}
+
+    def _load_blob(self, log: _ThreadLog, key: Tuple[str, str, Any]) -> Any:
+        """Deserialize a stored channel value, serializing it first if it was replayed from the log."""
+        blob = log.blobs[key]
+        if blob[0] == "decoded":
+            blob = log.blobs[key] = self.serde.dumps_typed(blob[1])
+        return self.serde.loads_typed(blob)
+
+    def _unpack(self, log: _ThreadLog, channel: str, packed: Dict[str, Any]) -> Any:
+        if "base" in packed:
+            base_ns, version = packed["base"]
+            tail = log.tails.get((base_ns, channel))
+            base = tail[1] if tail is not None and tail[0] == version else self._load_blob(log, (base_ns, channel, version))
+            return list(base[:packed["keep"]]) + packed["append"]
+        if "fields" in packed:
+            return {key: self._unpack(log, key, field) for key, field in packed["fields"].items()}
+        return packed["value"]
+
+    def _store_blob(self, log: _ThreadLog, ns: str, channel: str, blob: Dict[str, Any]) -> None:
+        """Apply a blob record read back from the log."""
+        version = blob["version"]
+        if len(blob) == 1:
+            log.blobs[(ns, channel, version)] = ("empty", b"")
+            log.tails.pop((ns, channel), None)
+            return
+        value = self._unpack(log, channel, blob)
+        # Most replayed versions are never read again, so they are only serialized on first access
+        log.blobs[(ns, channel, version)] = ("decoded", value)
+        self._track(log, ns, channel, version, value)
+
+    def _store_writes(self, log: _ThreadLog, record: Dict[str, Any], values: Sequence[Any]) -> None:
+        outer = log.writes.setdefault((record["ns"], record["checkpoint_id"]), {})
+        for (idx, channel, _), value in zip(record["writes"], values):
+            outer[(record["task_id"], idx)] = (record["task_id"], channel, self.serde.dumps_typed(value), record["task_path"])
+
+    def _apply(self, log: _ThreadLog, record: Dict[str, Any]) -> None:
+        """Replay one log record into the decoded thread state."""
+        if record["op"] == "writes":
+            self._store_writes(log, record, [self._unpack(log, channel, packed) for _, channel, packed in record["writes"]])
+            return
+        ns = record["ns"]
+        for channel, blob in record["blobs"].items():
+            self._store_blob(log, ns, channel, blob)
+        checkpoint = record["checkpoint"]
+        log.checkpoints.setdefault(ns, {})[checkpoint["id"]] = (
+            self.serde.dumps_typed(checkpoint),
+            self.serde.dumps_typed(self._unpack(log, "", record["metadata"])),
+            record["parent"],
+        )
+        log.puts_since_snapshot += 1
+        log.touched.add(ns)
+
+    def _append(self, thread_id: str, log: _ThreadLog, records: Sequence[Dict[str, Any]]) -> None:
+        data = self._encode(records)
+        log.version = self.backend.append(quote(thread_id, safe=""), data, log.version)
+        log.appended_bytes += len(data)
+        self.stats["appends"] += 1
+        self.stats["append_bytes"] += len(data)
+
+    def _snapshot(self, thread_id: str, log: _ThreadLog) -> None:
+        """
+        Replace the thread log with the latest checkpoint of each live namespace and drop the rest.
+
+        The root namespace is written first and subgraph lists are stored as deltas
+        of the root lists they were started from.
+        """
+        records = []
+        keep_blobs = {}
+        keep_writes = {}
+        keep_checkpoints = {}
+        root_lists: Dict[str, Tuple[Any, tuple]] = {}
+
+        def bases(channel: str) -> List[Tuple[str, Any, tuple]]:
+            return [("", *root_lists[channel])] if channel in root_lists else []
+
+        for ns in sorted(({""} & log.checkpoints.keys()) | log.touched):
+            checkpoints = log.checkpoints.get(ns)
+            if not checkpoints:
+                continue
+            pack_bases = bases if ns else (lambda channel: [])
+            checkpoint_id = max(checkpoints)
+            checkpoint_b, metadata_b, parent = checkpoints[checkpoint_id]
+            checkpoint = self.serde.loads_typed(checkpoint_b)
+            blobs = {}
+            for channel, version in checkpoint["channel_versions"].items():
+                key = (ns, channel, version)
+                if key not in log.blobs:
+                    continue
+                if log.blobs[key][0] == "empty":
+                    keep_blobs[key] = log.blobs[key]
+                    blobs[channel] = {"version": version}
+                    continue
+                value = self._load_blob(log, key)
+                keep_blobs[key] = log.blobs[key]
+                blobs[channel] = {"version": version, **self._pack(value, channel, pack_bases, operator.eq)}
+                if not ns and self._items(value) is not None:
+                    root_lists[channel] = (version, self._items(value))
+            keep_checkpoints[ns] = {checkpoint_id: checkpoints[checkpoint_id]}
+            records.append({
+                "op": "put", "ns": ns, "checkpoint": checkpoint,
+                "metadata": self._pack(self.serde.loads_typed(metadata_b), "", pack_bases, operator.eq),
+                "parent": parent, "blobs": blobs,
+            })
+            writes = log.writes.get((ns, checkpoint_id), {})
+            keep_writes[(ns, checkpoint_id)] = writes
+            by_task: Dict[Tuple[str, str], List[tuple]] = {}
+            for (task_id, idx), (_, channel, value, task_path) in writes.items():
+                packed = self._pack(self.serde.loads_typed(value), channel, pack_bases, operator.eq)
+                by_task.setdefault((task_id, task_path), []).append((idx, channel, packed))
+            for (task_id, task_path), task_writes in by_task.items():
+                records.append({
+                    "op": "writes", "ns": ns, "checkpoint_id": checkpoint_id, "task_id": task_id,
+                    "task_path": task_path, "writes": task_writes,
+                })
+
+        data = self._encode(records)
+        log.version = self.backend.replace(quote(thread_id, safe=""), data, log.version)
+        log.checkpoints, log.blobs, log.writes = keep_checkpoints, keep_blobs, keep_writes
+        log.tails = {key: tail for key, tail in log.tails.items() if (key[0], key[1], tail[0]) in keep_blobs}
+        log.puts_since_snapshot = 0
+        log.touched = set()
+        log.snapshot_bytes = len(data)
+        log.appended_bytes = 0
+        self.stats["snapshots"] += 1
+        self.stats["snapshot_bytes"] += len(data)
+
+    # BaseCheckpointSaver
+
+    def _tuple(self, log: _ThreadLog, thread_id: str, ns: str, checkpoint_id: str) -> CheckpointTuple:
+        checkpoint_b, metadata_b, parent = log.checkpoints[ns][checkpoint_id]
+        checkpoint: Checkpoint = self.serde.loads_typed(checkpoint_b)
+        values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = log.blobs.get((ns, channel, version))
+            if blob is not None and blob[0] != "empty":
+                values[channel] = self._load_blob(log, (ns, channel, version))
+                if log.tails.get((ns, channel), (None,))[0] == version:
+                    # The graph resumes from these objects, so the next put can append to them
+                    self._track(log, ns, channel, version, values[channel])
+        writes = log.writes.get((ns, checkpoint_id), {}).values()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": values},
+            metadata=self.serde.loads_typed(metadata_b),
+            pending_writes=[(task_id, channel, self.serde.loads_typed(value)) for task_id, channel, value, _ in writes],
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent}}
+                if parent
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Get the requested checkpoint of a thread, or its latest one."""
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        log = self._thread(thread_id)
+        with log.lock:
+            checkpoints = log.checkpoints.get(ns)
+            if not checkpoints:
+                return None
+            checkpoint_id = get_checkpoint_id(config) or max(checkpoints)
+            if checkpoint_id not in checkpoints:
+                return None
+            return self._tuple(log, thread_id, ns, checkpoint_id)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """
+        List the checkpoints of a thread, newest first.
+
+        Without a config only the threads currently cached in memory are listed.
+        Checkpoints older than the last snapshot are no longer available.
+        """
+        if config:
+            thread_ids = [config["configurable"]["thread_id"]]
+        else:
+            with self._lock:
+                thread_ids = list(self._threads)
+        config_ns = config["configurable"].get("checkpoint_ns") if config else None
+        config_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+        for thread_id in thread_ids:
+            log = self._thread(thread_id)
+            with log.lock:
+                found = []
+                for ns, checkpoints in log.checkpoints.items():
+                    if config_ns is not None and ns != config_ns:
+                        continue
+                    for checkpoint_id in sorted(checkpoints, reverse=True):
+                        if config_id and checkpoint_id != config_id:
+                            continue
+                        if before_id and checkpoint_id >= before_id:
+                            continue
+                        if filter:
+                            metadata = self.serde.loads_typed(checkpoints[checkpoint_id][1])
+                            if not all(metadata.get(key) == value for key, value in filter.items()):
+                                continue
+                        found.append(self._tuple(log, thread_id, ns, checkpoint_id))
+            for item in found:
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Record a checkpoint, appending only the channels that changed."""
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")
+        metadata = get_checkpoint_metadata(config, metadata)
+        parent = config["configurable"].get("checkpoint_id")
+
+        def change(log: _ThreadLog) -> None:
+            bases = self._tail_bases(log, ns)
+            blobs = {}
+            for channel, version in new_versions.items():
+                if channel in values:
+                    blobs[channel] = {"version": version, **self._pack(values[channel], channel, bases)}
+                    # Serialized only if it is read back, like replayed values; lists are copied
+                    # since the graph keeps using them
+                    value = values[channel]
+                    log.blobs[(ns, channel, version)] = ("decoded", list(value) if isinstance(value, list) else value)
+                    self._track(log, ns, channel, version, values[channel])
+                else:
+                    blobs[channel] = {"version": version}
+                    log.blobs[(ns, channel, version)] = ("empty", b"")
+                    log.tails.pop((ns, channel), None)
+            record = {
+                "op": "put", "ns": ns, "checkpoint": c, "metadata": self._pack(metadata, "", bases), "parent": parent,
+                "blobs": blobs,
+            }
+            log.checkpoints.setdefault(ns, {})[c["id"]] = (self.serde.dumps_typed(c), self.serde.dumps_typed(metadata), parent)
+            log.puts_since_snapshot += 1
+            log.touched.add(ns)
+            # Snapshots wait until the appended records outgrow the previous snapshot, so a
+            # thread log stays within about twice the size of its state
+            if log.puts_since_snapshot >= self.snapshot_every and log.appended_bytes >= log.snapshot_bytes:
+                self._snapshot(thread_id, log)
+            else:
+                self._append(thread_id, log, [record])
+
+        self._update(thread_id, change)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": c["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Record the pending writes of a task against a checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        def change(log: _ThreadLog) -> None:
+            outer = log.writes.get((ns, checkpoint_id), {})
+            fresh = []
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                if idx >= 0 and (task_id, idx) in outer:
+                    continue
+                fresh.append((idx, channel, value))
+            if not fresh:
+                return
+            record = {
+                "op": "writes", "ns": ns, "checkpoint_id": checkpoint_id, "task_id": task_id, "task_path": task_path,
+                "writes": [(idx, channel, self._pack(value, channel, self._tail_bases(log, ns))) for idx, channel, value in fresh],
+            }
+            self._store_writes(log, record, [value for _, _, value in fresh])
+            self._append(thread_id, log, [record])
+
+        self._update(thread_id, change)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes of a thread."""
+        with self._lock:
+            self._threads.pop(thread_id, None)
+        self.backend.delete(quote(thread_id, safe=""))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -1,6 +1,57 @@
-from azure.storage.blob import BlobServiceClient, ContainerClient
 import os
-from typing import Dict, Optional
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from app.services.MetricsService import MetricsService
+
+if TYPE_CHECKING:
+    from azure.storage.blob import ContainerClient
+    from azure.storage.blob.aio import ContainerClient as AsyncContainerClient
+
+def download_options() -> Dict[str, int]:
+    """
+    Download request sizes for the blob clients.
+
+    The SDK fetches up to 32 MB in its first GET by default. Capping both sizes
+    at STORAGE_DOWNLOAD_CHUNK_SIZE bounds the memory of streamed reads, and larger
+    blobs are fetched as ranges that can run in parallel.
+    """
+    chunk_size = int(os.getenv("STORAGE_DOWNLOAD_CHUNK_SIZE", str(4 * 1024 * 1024)))
+    return {"max_single_get_size": chunk_size, "max_chunk_get_size": chunk_size}
+
+
+REQUEST_SECONDS = MetricsService.histogram("doccy_datastore_request_duration_seconds",
+                                           "Latency of data store HTTP requests, to the response headers", ("method", "status"))
+TRANSFERRED_BYTES = MetricsService.counter("doccy_datastore_bytes", "Bytes sent to and received from the data store", ("direction",))
+
+
+def _mark_request(request: Any) -> None:
+    request.context["metrics_started"] = time.perf_counter()
+
+
+def _record_response(response: Any) -> None:
+    started = response.context.get("metrics_started")
+    if started is None:
+        return
+    http_request, http_response = response.http_request, response.http_response
+    REQUEST_SECONDS.observe(time.perf_counter() - started, method=http_request.method, status=http_response.status_code)
+    sent = int(http_request.headers.get("Content-Length") or 0)
+    received = int(http_response.headers.get("Content-Length") or 0)
+    if sent:
+        TRANSFERRED_BYTES.inc(sent, direction="sent")
+    if received:
+        TRANSFERRED_BYTES.inc(received, direction="received")
+
+
+def request_hooks() -> Dict[str, Any]:
+    """
+    Client-level hooks that time every storage HTTP request, retries included,
+    and count the bytes sent and received; empty when METRICS_ENABLED is false.
+    """
+    if not MetricsService.enabled:
+        return {}
+    return {"raw_request_hook": _mark_request, "raw_response_hook": _record_response}
+
 
 class DataStoreManager:
     """
@@ -21,11 +72,37 @@ class DataStoreManager:
             self.connection_string = connection_string or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
             if not self.connection_string:
                 raise ValueError("Connection string is required")
-            self.container_clients: Dict[str, ContainerClient] = {}
-            self._blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
+            # Deferred so that importing the manager does not load the azure SDK
+            from azure.storage.blob import BlobServiceClient
+
+            self.container_clients: Dict[str, "ContainerClient"] = {}
+            self._blob_service_client = BlobServiceClient.from_connection_string(
+                self.connection_string, transport=self._create_transport(), **download_options(), **request_hooks()
+            )
             self._initialized = True
 
-    def get_container_client(self, container_name: str) -> ContainerClient:
+    @staticmethod
+    def _create_transport():
+        """
+        HTTP transport whose connection pool matches the bulk I/O concurrency.
+
+        The SDK default keeps 10 connections per host, so concurrent bulk calls
+        beyond that would open and discard a connection per request.
+        """
+        import requests
+        from azure.core.pipeline.transport import RequestsTransport
+        from urllib3.util.retry import Retry
+
+        pool_size = int(os.getenv("STORAGE_MAX_CONCURRENCY", "16"))
+        session = requests.Session()
+        # Retries are handled by the SDK pipeline, as in the default transport
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                                max_retries=Retry(total=False, redirect=False, raise_on_status=False))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return RequestsTransport(session=session, session_owner=False)
+
+    def get_container_client(self, container_name: str) -> "ContainerClient":
         """
         Get or create a container client for the specified container.
         
@@ -66,4 +143,79 @@ class DataStoreManager:
         """
         if cls._instance is None or not cls._instance._initialized:
             raise RuntimeError("DataStoreManager hasn't been initialized yet. Call DataStoreManager.initialize() first.")
-        return cls._instance
\ No newline at end of file
+        return cls._instance
+
+class AsyncDataStoreManager:
+    """
+    Async counterpart of DataStoreManager built on azure.storage.blob.aio.
+
+    All clients share one aiohttp session, so the process keeps a single
+    connection pool of STORAGE_MAX_CONCURRENCY connections. The session belongs
+    to the event loop it was created on; create the manager from that loop and
+    close it with aclose() before the loop ends.
+    """
+    _instance: Optional["AsyncDataStoreManager"] = None
+
+    def __init__(self, connection_string=None):
+        self.connection_string = connection_string or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+        if not self.connection_string:
+            raise ValueError("Connection string is required")
+        import aiohttp
+        from azure.core.pipeline.transport import AioHttpTransport
+        from azure.storage.blob.aio import BlobServiceClient
+
+        pool_size = int(os.getenv("STORAGE_MAX_CONCURRENCY", "16"))
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size, limit_per_host=pool_size))
+        self.container_clients: Dict[str, "AsyncContainerClient"] = {}
+        self._blob_service_client = BlobServiceClient.from_connection_string(
+            self.connection_string, transport=AioHttpTransport(session=self._session, session_owner=False), **download_options(),
+            **request_hooks()
+        )
+
+    def get_container_client(self, container_name: str) -> "AsyncContainerClient":
+        """
+        Get or create an async container client for the specified container.
+
+        Args:
+            container_name: Name of the container
+
+        Returns:
+            Async ContainerClient for the specified container
+        """
+        if container_name not in self.container_clients:
+            self.container_clients[container_name] = self._blob_service_client.get_container_client(container_name)
+        return self.container_clients[container_name]
+
+    @classmethod
+    def initialize(cls, connection_string=None) -> "AsyncDataStoreManager":
+        """
+        Create the process-wide instance. Must be called from a running event loop.
+
+        Args:
+            connection_string: Optional connection string, otherwise uses environment variable
+
+        Returns:
+            The initialized AsyncDataStoreManager instance
+        """
+        if cls._instance is None:
+            cls._instance = cls(connection_string)
+        return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> "AsyncDataStoreManager":
+        """
+        Get the process-wide instance, creating it from the environment on first use.
+
+        Returns:
+            The AsyncDataStoreManager instance
+        """
+        return cls.initialize()
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the clients and the shared aiohttp session."""
+        instance, cls._instance = cls._instance, None
+        if instance is None:
+            return
+        await instance._blob_service_client.close()
+        await instance._session.close()
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.models.DataStoreModel import Chunk
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+
+class EmbeddingCache:
+    """Persistent content-hash -> float32 vector cache in a local SQLite file."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for the hashes that are present."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update({content_hash: np.frombuffer(vector, dtype=np.float32) for content_hash, vector in rows})
+        return found
+
+    def set_many(self, vectors: Dict[str, Sequence[float]]) -> None:
+        """Store vectors by content hash."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)",
+                [(content_hash, np.asarray(vector, dtype=np.float32).tobytes()) for content_hash, vector in vectors.items()],
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class EmbeddingPipeline:
+    """
+    Generates Chunk embeddings in provider-sized batches.
+
+    Identical Context text is embedded once (keyed by content hash and
+    deployment), previously embedded text is served from the persistent cache,
+    and the remaining batches run concurrently under a bounded limit.
+    """
+
+    def __init__(self, embeddings=None, cache: Optional[EmbeddingCache] = None, batch_size: Optional[int] = None,
+                 max_batch_chars: Optional[int] = None, concurrency: Optional[int] = None, model_key: Optional[str] = None):
+        """
+        Args:
+            embeddings: LangChain Embeddings, defaults to the shared Azure OpenAI embeddings client
+            cache: Persistent cache, defaults to EMBEDDING_CACHE_PATH (pass False to disable)
+            batch_size: Inputs per request, capped by the provider's 2048 input limit
+            max_batch_chars: Approximate text size per request, keeps batches under the token limit
+            concurrency: Maximum requests in flight
+            model_key: Identifies the embedding model in cache keys
+        """
+        if embeddings is None:
+            from app.services.LlmClientRegistry import LlmClientRegistry
+
+            embeddings = LlmClientRegistry.get_embeddings()
+        self.embeddings = embeddings
+        if cache is None:
+            cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite"))
+        self.cache = cache if cache is not False else None
+        self.batch_size = min(batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "512")), 2048)
+        self.max_batch_chars = max_batch_chars or int(os.getenv("EMBEDDING_MAX_BATCH_CHARS", "400000"))
+        self.concurrency = concurrency or int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+        self.model_key = model_key or getattr(embeddings, "deployment", None) or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.stats = {"chunks": 0, "unique_texts": 0, "cache_hits": 0, "embedded": 0, "requests": 0, "seconds": 0.0}
+
+    def _hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_key}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _batches(self, items: List[tuple]) -> Iterable[List[tuple]]:
+        """Split (hash, text) pairs by input count and approximate size."""
+        batch, chars = [], 0
+        for item in items:
+            if batch and (len(batch) >= self.batch_size or chars + len(item[1]) > self.max_batch_chars):
+                yield batch
+                batch, chars = [], 0
+            batch.append(item)
+            chars += len(item[1])
+        if batch:
+            yield batch
+
+    async def aembed_texts(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Embed texts with deduplication, caching and concurrent batching.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per input text, in input order
+        """
+        started = time.perf_counter()
+        hashes = [self._hash(text) for text in texts]
+        unique = dict(zip(hashes, texts))
+        vectors: Dict[str, Sequence[float]] = {}
+        if self.cache is not None:
+            # The cache is SQLite, read it off the event loop like the writes below
+            vectors.update(await asyncio.to_thread(self.cache.get_many, list(unique)))
+        pending = [(content_hash, text) for content_hash, text in unique.items() if content_hash not in vectors]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def embed_batch(batch: List[tuple]) -> None:
+            async with semaphore:
+                result = await self.embeddings.aembed_documents([text for _, text in batch])
+            fresh = {content_hash: vector for (content_hash, _), vector in zip(batch, result)}
+            vectors.update(fresh)
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.set_many, fresh)
+
+        batches = list(self._batches(pending))
+        await asyncio.gather(*(embed_batch(batch) for batch in batches))
+
+        self.stats["chunks"] += len(texts)
+        self.stats["unique_texts"] += len(unique)
+        self.stats["cache_hits"] += len(unique) - len(pending)
+        self.stats["embedded"] += len(pending)
+        self.stats["requests"] += len(batches)
+        self.stats["seconds"] += time.perf_counter() - started
+        return [list(map(float, vectors[content_hash])) for content_hash in hashes]
+
+    async def aembed_chunks(self, chunks: Sequence[Chunk]) -> Sequence[Chunk]:
+        """
+        Fill Vector_Embeddings for every chunk.
+
+        Args:
+            chunks: Chunks to embed, updated in place
+
+        Returns:
+            The same chunks
+        """
+        vectors = await self.aembed_texts([chunk.Context for chunk in chunks])
+        for chunk, vector in zip(chunks, vectors):
+            chunk.Vector_Embeddings = vector
+        logger.info(f"Embedded {len(chunks)} chunks")
+        return chunks
+
+    def embed_chunks(self, chunks: Sequence[Chunk]) -> Sequence[Chunk]:
+        """Synchronous wrapper around aembed_chunks for scripts (not for use inside an event loop)."""
+        return asyncio.run(self.aembed_chunks(chunks))
@@ -0,0 +1,279 @@
+"""
+Streaming ingestion of source documents into linked Chunk records.
+
+The pipeline is a chain of generators, so only the current line, the open
+section path and one batch of chunks are held in memory at any time:
+
+    byte chunks -> lines -> blocks (headings / paragraphs) -> chunks -> batches -> segments
+
+Markdown headings open sections. Every section becomes a parent chunk whose
+Parent_ChunkId is the enclosing section (or the document root). Paragraph text
+is packed into leaf chunks under the current section, and leaf chunks are
+linked to each other in reading order through Next/Previous_ChunkId.
+"""
+import codecs
+import os
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from app.models.DataStoreModel import Chunk
+from app.services.AdmissionController import AdmissionController
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+_HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+# Longest line kept in memory before it is split, guards against inputs without newlines
+_MAX_LINE_CHARS = 1 << 20
+
+
+def iter_lines(byte_chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    """Decode a byte stream incrementally and yield lines without their line endings."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    for data in byte_chunks:
+        pending += decoder.decode(data)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+        while len(pending) > _MAX_LINE_CHARS:
+            yield pending[:_MAX_LINE_CHARS]
+            pending = pending[_MAX_LINE_CHARS:]
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, int, str]]:
+    """
+    Group lines into blocks.
+
+    Yields:
+        ("heading", level, title) or ("paragraph", 0, text)
+    """
+    paragraph: List[str] = []
+    for line in lines:
+        heading = _HEADING_PATTERN.match(line)
+        if heading or not line.strip():
+            if paragraph:
+                yield "paragraph", 0, " ".join(paragraph)
+                paragraph = []
+            if heading:
+                yield "heading", len(heading.group(1)), heading.group(2)
+        else:
+            paragraph.append(line.strip())
+    if paragraph:
+        yield "paragraph", 0, " ".join(paragraph)
+
+
+def _split_text(text: str, max_chars: int) -> Iterator[str]:
+    """Split an oversized paragraph at whitespace."""
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        cut = cut if cut > 0 else max_chars
+        yield text[:cut]
+        text = text[cut:].lstrip()
+    if text:
+        yield text
+
+
+def iter_chunks(blocks: Iterable[Tuple[str, int, str]], rid: str, tag: str = "", max_chars: int = 2000,
+                on_section: Optional[Callable[[Chunk], None]] = None) -> Iterator[Chunk]:
+    """
+    Build the linked chunk hierarchy from document blocks.
+
+    Chunk ids are "{rid}-{sequence}" in document order. Section chunks are
+    yielded when their heading is read; leaf chunks are yielded one step late so
+    their Next_ChunkId is known.
+
+    Args:
+        blocks: Output of iter_blocks
+        rid: Resource id of the document, also the id of the root chunk
+        tag: Tag applied to every chunk
+        max_chars: Maximum Context length of a leaf chunk
+        on_section: Called with every section chunk as it is created
+
+    Yields:
+        Chunks, parents always before their children
+    """
+    sequence = 0
+
+    def next_id() -> str:
+        nonlocal sequence
+        sequence += 1
+        return f"{rid}-{sequence:08d}"
+
+    yield Chunk(RId=rid, ChunkId=rid, Next_ChunkId=None, Previous_ChunkId=None, Parent_ChunkId=None,
+                Context=rid, Tag=tag, Categories=[], Vector_Embeddings=None)
+
+    # Open sections as (level, chunk id, title)
+    sections: List[Tuple[int, str, str]] = []
+    held: Optional[Chunk] = None
+    text_parts: List[str] = []
+    text_length = 0
+
+    def leaf(context: str) -> Optional[Chunk]:
+        """Create a leaf chunk, link it after the held one and return the chunk that is now complete."""
+        nonlocal held
+        chunk = Chunk(RId=rid, ChunkId=next_id(), Next_ChunkId=None,
+                      Previous_ChunkId=held.ChunkId if held else None,
+                      Parent_ChunkId=sections[-1][1] if sections else rid,
+                      Context=context, Tag=tag, Categories=[title for _, _, title in sections], Vector_Embeddings=None)
+        complete = held
+        if complete is not None:
+            complete.Next_ChunkId = chunk.ChunkId
+        held = chunk
+        return complete
+
+    def flush() -> Optional[Chunk]:
+        nonlocal text_parts, text_length
+        if not text_parts:
+            return None
+        context = "\n\n".join(text_parts)
+        text_parts, text_length = [], 0
+        return leaf(context)
+
+    for kind, level, text in blocks:
+        if kind == "heading":
+            complete = flush()
+            if complete is not None:
+                yield complete
+            while sections and sections[-1][0] >= level:
+                sections.pop()
+            parent_id = sections[-1][1] if sections else rid
+            section_id = next_id()
+            sections.append((level, section_id, text))
+            section = Chunk(RId=rid, ChunkId=section_id, Next_ChunkId=None, Previous_ChunkId=None, Parent_ChunkId=parent_id,
+                            Context=text, Tag=tag, Categories=[title for _, _, title in sections], Vector_Embeddings=None)
+            if on_section is not None:
+                on_section(section)
+            yield section
+            continue
+
+        for piece in _split_text(text, max_chars):
+            if text_parts and text_length + len(piece) > max_chars:
+                complete = flush()
+                if complete is not None:
+                    yield complete
+            text_parts.append(piece)
+            text_length += len(piece)
+
+    complete = flush()
+    if complete is not None:
+        yield complete
+    if held is not None:
+        yield held
+
+
+def batched(chunks: Iterable[Chunk], size: int) -> Iterator[List[Chunk]]:
+    batch: List[Chunk] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class IngestionService:
+    """Turns source documents in blob storage into chunk segments."""
+
+    @staticmethod
+    def ingest_stream(byte_chunks: Iterable[bytes], rid: str,
+                      write_batch: Callable[[str, Sequence[Chunk]], None], tag: str = "",
+                      max_chars: Optional[int] = None, batch_size: Optional[int] = None,
+                      embedding_pipeline=None) -> dict:
+        """
+        Chunk a document stream and hand the chunks to a writer in batches.
+
+        Args:
+            byte_chunks: The document as an iterable of byte chunks
+            rid: Resource id of the document
+            write_batch: Called with a batch name and the chunks of that batch
+            tag: Tag applied to every chunk
+            max_chars: Maximum Context length of a leaf chunk, defaults to INGEST_CHUNK_MAX_CHARS
+            batch_size: Chunks per write, defaults to INGEST_BATCH_SIZE
+            embedding_pipeline: Optional EmbeddingPipeline that embeds each batch before it is written
+
+        Returns:
+            Summary with chunk, section and batch counts
+        """
+        max_chars = max_chars or int(os.getenv("INGEST_CHUNK_MAX_CHARS", "2000"))
+        batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+
+        sections = 0
+
+        def count_section(section: Chunk) -> None:
+            nonlocal sections
+            sections += 1
+
+        chunks = iter_chunks(iter_blocks(iter_lines(byte_chunks)), rid, tag=tag, max_chars=max_chars, on_section=count_section)
+        total = batches = 0
+        for batch in batched(chunks, batch_size):
+            if embedding_pipeline is not None:
+                # Bulk embedding yields to interactive LLM calls under admission control
+                with AdmissionController.priority("batch"):
+                    embedding_pipeline.embed_chunks(batch)
+            write_batch(f"{rid}-{batches:05d}", batch)
+            total += len(batch)
+            batches += 1
+        logger.info(f"Ingested '{rid}' into {total} chunks ({sections} sections, {batches} batches)")
+        return {"rid": rid, "chunks": total, "sections": sections, "batches": batches}
+
+    @staticmethod
+    def ingest_blob(source_container: str, blob_name: str, target_container: str, rid: Optional[str] = None,
+                    tag: str = "", embed: bool = False, **kwargs) -> dict:
+        """
+        Stream a source blob into chunk segments in the target container.
+
+        Segments left from an earlier, longer version of the document are deleted,
+        and the written and deleted chunks are applied to the container's vector index.
+
+        Args:
+            source_container: Container holding the source document
+            blob_name: Source document blob
+            target_container: Container receiving the chunk segments
+            rid: Resource id, defaults to the blob name without extension
+            tag: Tag applied to every chunk
+            embed: Generate embeddings with the EmbeddingPipeline before writing (call from a worker thread in async code)
+            **kwargs: Passed to ingest_stream
+
+        Returns:
+            Ingestion summary
+        """
+        from app.services.azurestorageservice import AzureStorageService
+        from app.services.ChunkSegment import ChunkSegmentStore
+
+        rid = rid or os.path.splitext(os.path.basename(blob_name))[0]
+        byte_chunks = AzureStorageService.stream_blob(source_container, blob_name)
+
+        pipeline = None
+        if embed:
+            from app.services.EmbeddingPipeline import EmbeddingPipeline
+
+            pipeline = EmbeddingPipeline()
+
+        from app.services.VectorIndex import VectorIndexRegistry
+
+        written, chunk_ids = [], set()
+
+        def write_batch(name: str, batch: Sequence[Chunk]) -> None:
+            written.append(ChunkSegmentStore.write(target_container, name, batch))
+            chunk_ids.update(chunk.ChunkId for chunk in batch)
+            VectorIndexRegistry.update(target_container, batch)
+
+        summary = IngestionService.ingest_stream(
+            byte_chunks, rid, write_batch, tag=tag, embedding_pipeline=pipeline, **kwargs,
+        )
+        # A shorter re-ingest leaves the higher-numbered batches of the previous version behind
+        stale_ids = ChunkSegmentStore.delete_stale(target_container, f"{rid}-", r"\d{5}", written)
+        VectorIndexRegistry.update(target_container, removed=[chunk_id for chunk_id in stale_ids if chunk_id not in chunk_ids])
+        return summary
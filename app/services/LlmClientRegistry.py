@@ -0,0 +1,308 @@
+import os
+import threading
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.services.AdmissionController import AdmissionController
+from app.services.LlmDeploymentPool import LlmDeploymentPool, PoolMember
+from app.services.LoggerService import LoggerService
+from app.services.RunnableCache import RunnableCache
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt, about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def _chat_usage(result: Any) -> Optional[int]:
+    """Total tokens reported for a chat completion, if any."""
+    usage = (getattr(result, "llm_output", None) or {}).get("token_usage") or {}
+    return usage.get("total_tokens")
+
+
+@lru_cache(maxsize=None)
+def _admitted_chat_class() -> type:
+    """AzureChatOpenAI that passes the admission controller of its deployment before every completion."""
+    from langchain_openai import AzureChatOpenAI
+
+    class AdmittedAzureChatOpenAI(AzureChatOpenAI):
+        # Controller name, the deployment name unless the client belongs to a pool member
+        admission_key: Optional[str] = None
+
+        def _estimate(self, messages: List[Any]) -> int:
+            prompt = sum(_estimate_tokens(str(message.content)) + 4 for message in messages)
+            return prompt + (self.max_tokens or int(os.getenv("LLM_ADMISSION_COMPLETION_TOKENS", "256")))
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            parent = super()._generate
+            controller = AdmissionController.for_deployment(self.admission_key or self.deployment_name)
+            if controller is None:
+                return parent(messages, stop, run_manager, **kwargs)
+            return controller.call(lambda: parent(messages, stop, run_manager, **kwargs), self._estimate(messages), _chat_usage)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            parent = super()._agenerate
+            controller = AdmissionController.for_deployment(self.admission_key or self.deployment_name)
+            if controller is None:
+                return await parent(messages, stop, run_manager, **kwargs)
+            return await controller.acall(lambda: parent(messages, stop, run_manager, **kwargs), self._estimate(messages), _chat_usage)
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            parent = super()._stream
+            controller = AdmissionController.for_deployment(self.admission_key or self.deployment_name)
+            if controller is None:
+                yield from parent(messages, stop, run_manager, **kwargs)
+                return
+            yield from controller.stream(lambda: parent(messages, stop, run_manager, **kwargs), self._estimate(messages))
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            parent = super()._astream
+            controller = AdmissionController.for_deployment(self.admission_key or self.deployment_name)
+            if controller is None:
+                async for chunk in parent(messages, stop, run_manager, **kwargs):
+                    yield chunk
+                return
+            async for chunk in controller.astream(lambda: parent(messages, stop, run_manager, **kwargs), self._estimate(messages)):
+                yield chunk
+
+    return AdmittedAzureChatOpenAI
+
+
+@lru_cache(maxsize=None)
+def _pooled_chat_class() -> type:
+    """AzureChatOpenAI front for the LlmDeploymentPool, each completion runs on the member the pool picks."""
+    from langchain_openai import AzureChatOpenAI
+
+    class PooledAzureChatOpenAI(AzureChatOpenAI):
+        pool_hedge: bool = False
+
+        def _member(self, member: PoolMember) -> "AzureChatOpenAI":
+            return LlmClientRegistry.get_member_llm(member, self.temperature)
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            return LlmDeploymentPool.get_instance().call(
+                lambda member: self._member(member)._generate(messages, stop, run_manager, **kwargs), hedge=self.pool_hedge)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            return await LlmDeploymentPool.get_instance().acall(
+                lambda member: self._member(member)._agenerate(messages, stop, run_manager, **kwargs), hedge=self.pool_hedge)
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            # Streams are not hedged, tokens from two requests cannot be merged
+            yield from LlmDeploymentPool.get_instance().stream(
+                lambda member: self._member(member)._stream(messages, stop, run_manager, **kwargs))
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            async for chunk in LlmDeploymentPool.get_instance().astream(
+                    lambda member: self._member(member)._astream(messages, stop, run_manager, **kwargs)):
+                yield chunk
+
+    return PooledAzureChatOpenAI
+
+
+@lru_cache(maxsize=None)
+def _admitted_embeddings_class() -> type:
+    """AzureOpenAIEmbeddings that passes the admission controller of its deployment before every request."""
+    from langchain_openai import AzureOpenAIEmbeddings
+
+    class AdmittedAzureOpenAIEmbeddings(AzureOpenAIEmbeddings):
+        def embed_documents(self, texts, chunk_size=None, **kwargs):
+            parent = super().embed_documents
+            controller = AdmissionController.for_deployment(self.deployment)
+            if controller is None:
+                return parent(texts, chunk_size, **kwargs)
+            return controller.call(lambda: parent(texts, chunk_size, **kwargs), sum(map(_estimate_tokens, texts)))
+
+        async def aembed_documents(self, texts, chunk_size=None, **kwargs):
+            parent = super().aembed_documents
+            controller = AdmissionController.for_deployment(self.deployment)
+            if controller is None:
+                return await parent(texts, chunk_size, **kwargs)
+            return await controller.acall(lambda: parent(texts, chunk_size, **kwargs), sum(map(_estimate_tokens, texts)))
+
+    return AdmittedAzureOpenAIEmbeddings
+
+
+def _max_retries() -> int:
+    """Client-side retries; none when admission control retries 429s and transient errors itself."""
+    return 0 if os.getenv("LLM_ADMISSION_ENABLED", "true").lower() == "true" else 2
+
+
+class LlmClientRegistry:
+    """
+    Process-wide registry of Azure OpenAI chat and embedding clients.
+
+    Chat clients are keyed by deployment and temperature and built once. All of them
+    share one sync and one async httpx client, so keep-alive connections (HTTP/2
+    when the h2 package is installed) are reused across requests. The open sockets
+    per worker are capped at twice LLM_HTTP_MAX_CONNECTIONS, one pool per client.
+    Every completion and embedding request passes the AdmissionController of its
+    deployment, which also takes over retrying 429s and transient errors from the openai client.
+    Chat clients of a configured LlmDeploymentPool are keyed by member name.
+    """
+    _models: Dict[Tuple, "AzureChatOpenAI"] = {}
+    _embeddings: Dict[str, "AzureOpenAIEmbeddings"] = {}
+    _http_client: Optional["httpx.Client"] = None
+    _http_async_client: Optional["httpx.AsyncClient"] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _http_options() -> dict:
+        """Connection pool settings shared by the sync and async HTTP clients."""
+        import httpx
+        from openai import DEFAULT_TIMEOUT
+
+        http2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+        if http2 and find_spec("h2") is None:
+            logger.warning("LLM_HTTP2 is enabled but the h2 package is not installed, falling back to HTTP/1.1")
+            http2 = False
+
+        return {
+            "http2": http2,
+            "timeout": DEFAULT_TIMEOUT,
+            "limits": httpx.Limits(
+                max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "10")),
+                keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60")),
+            ),
+        }
+
+    @classmethod
+    def get_http_clients(cls) -> Tuple["httpx.Client", "httpx.AsyncClient"]:
+        """
+        Get the shared HTTP clients, creating them on first use.
+
+        Returns:
+            Tuple of the sync and async httpx clients
+        """
+        if cls._http_client is None or cls._http_async_client is None:
+            with cls._lock:
+                if cls._http_client is None or cls._http_async_client is None:
+                    import httpx
+
+                    options = cls._http_options()
+                    cls._http_client = httpx.Client(**options)
+                    cls._http_async_client = httpx.AsyncClient(**options)
+                    logger.info(f"Created shared LLM HTTP clients (http2={options['http2']})")
+        return cls._http_client, cls._http_async_client
+
+    @classmethod
+    def get_llm(cls, deployment_name: Optional[str] = None, temperature: float = 0.3, hedge: bool = False) -> "AzureChatOpenAI":
+        """
+        Get the shared chat client for a deployment and temperature.
+
+        When LLM_POOL_DEPLOYMENTS is configured and no deployment is given, the client
+        routes every completion through the LlmDeploymentPool.
+
+        Args:
+            deployment_name: Azure OpenAI deployment, defaults to AZURE_OPENAI_DEPLOYMENT_NAME or the pool
+            temperature: Sampling temperature
+            hedge: Hedge pooled completions with a second request to another deployment (latency-critical calls)
+
+        Returns:
+            AzureChatOpenAI instance that uses the shared connection pools
+        """
+        pool = LlmDeploymentPool.get_instance() if deployment_name is None else None
+        if pool is not None:
+            primary = pool.members[0]
+            return cls._get_chat(("pool", temperature, hedge), _pooled_chat_class(), temperature,
+                                 deployment_name=primary.deployment, azure_endpoint=primary.endpoint,
+                                 api_key=primary.api_key, api_version=primary.api_version, pool_hedge=hedge)
+
+        deployment_name = deployment_name or os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+        return cls._get_chat((deployment_name, temperature), _admitted_chat_class(), temperature,
+                             deployment_name=deployment_name, azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                             api_key=os.getenv("AZURE_OPENAI_API_KEY"), api_version=os.getenv("AZURE_OPENAI_API_VERSION"))
+
+    @classmethod
+    def get_member_llm(cls, member: PoolMember, temperature: float) -> "AzureChatOpenAI":
+        """Get the chat client of one pool member, admitted under the member's name."""
+        return cls._get_chat((f"pool:{member.name}", temperature), _admitted_chat_class(), temperature, cached=False,
+                             deployment_name=member.deployment, azure_endpoint=member.endpoint, api_key=member.api_key,
+                             api_version=member.api_version, admission_key=member.name)
+
+    @classmethod
+    def _get_chat(cls, key: Tuple, model_class: type, temperature: float, cached: bool = True, **settings) -> "AzureChatOpenAI":
+        model = cls._models.get(key)
+        if model is None:
+            from app.services.LlmResponseCache import LlmResponseCache
+
+            http_client, http_async_client = cls.get_http_clients()
+            # Only near-deterministic calls are worth answering from the cache. Resolved
+            # before taking the lock because the semantic tier needs get_embeddings().
+            cache = None
+            if cached and temperature <= float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3")):
+                cache = LlmResponseCache.get_instance()
+
+            with cls._lock:
+                model = cls._models.get(key)
+                if model is None:
+                    model = model_class(
+                        temperature=temperature,
+                        http_client=http_client,
+                        http_async_client=http_async_client,
+                        max_retries=_max_retries(),
+                        cache=cache,
+                        **settings,
+                    )
+                    cls._models[key] = model
+        return model
+
+    @classmethod
+    def get_embeddings(cls, deployment_name: Optional[str] = None) -> "AzureOpenAIEmbeddings":
+        """
+        Get the shared embeddings client for a deployment.
+
+        Args:
+            deployment_name: Azure OpenAI embedding deployment, defaults to AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME
+
+        Returns:
+            AzureOpenAIEmbeddings instance that uses the shared connection pools
+        """
+        deployment_name = deployment_name or os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME", "text-embedding-3-small")
+        embeddings = cls._embeddings.get(deployment_name)
+        if embeddings is None:
+            http_client, http_async_client = cls.get_http_clients()
+            with cls._lock:
+                embeddings = cls._embeddings.get(deployment_name)
+                if embeddings is None:
+                    embeddings = _admitted_embeddings_class()(
+                        azure_deployment=deployment_name,
+                        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+                        http_client=http_client,
+                        http_async_client=http_async_client,
+                        max_retries=_max_retries(),
+                        # Token-length checks need tiktoken downloads, the service enforces limits anyway
+                        check_embedding_ctx_length=False,
+                    )
+                    cls._embeddings[deployment_name] = embeddings
+        return embeddings
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared HTTP clients and forget the cached model clients and the runnables built on them."""
+        with cls._lock:
+            http_client, http_async_client = cls._http_client, cls._http_async_client
+            cls._http_client = None
+            cls._http_async_client = None
+            cls._models = {}
+            cls._embeddings = {}
+        RunnableCache.clear()
+        if http_client is not None:
+            http_client.close()
+        if http_async_client is not None:
+            await http_async_client.aclose()
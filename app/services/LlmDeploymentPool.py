@@ -0,0 +1,438 @@
+"""
+Latency-aware routing of chat completions across several Azure OpenAI deployments.
+
+The pool is configured with the names of its members and per-member settings that
+fall back to the single-deployment ones:
+
+    LLM_POOL_DEPLOYMENTS=eastus,swedencentral
+    LLM_POOL_EASTUS_ENDPOINT=https://eastus.openai.azure.com/
+    LLM_POOL_EASTUS_DEPLOYMENT=gpt-4o             (default AZURE_OPENAI_DEPLOYMENT_NAME)
+    LLM_POOL_EASTUS_API_KEY=...                    (default AZURE_OPENAI_API_KEY)
+    LLM_POOL_EASTUS_API_VERSION=...                (default AZURE_OPENAI_API_VERSION)
+
+Each call goes to the available member with the lowest score, its latency EWMA
+inflated by its error-rate EWMA; members without samples are tried first and a
+small share of calls explores the others so their figures stay current. After
+LLM_POOL_BREAKER_FAILURES consecutive failures a member's circuit opens for
+LLM_POOL_BREAKER_SECONDS, after which a single probe call decides whether it
+closes again. A failed call fails over to the next member, except for client
+errors (4xx other than 408 and 429) that another deployment would reject as well.
+
+Hedged calls send a second request to the next best member when the first has
+not answered within the p95 of its recent latencies, and take whichever answers
+first. Hedges are capped at LLM_POOL_HEDGE_MAX_RATIO of the hedged calls.
+"""
+import asyncio
+import contextvars
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+from app.services.AdmissionController import AdmissionRejected
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolMember:
+    """Connection settings, recent latency and circuit state of one deployment in the pool."""
+
+    def __init__(self, name: str, deployment: str, endpoint: str, api_key: Optional[str], api_version: Optional[str],
+                 alpha: float = 0.2, breaker_failures: int = 5, breaker_seconds: float = 30.0):
+        self.name = name
+        self.deployment = deployment
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.api_version = api_version
+        self.alpha = alpha
+        self.breaker_failures = breaker_failures
+        self.breaker_seconds = breaker_seconds
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.in_flight = 0
+        self._latencies: deque = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "breaker_opened": 0}
+
+    def available(self, now: float) -> bool:
+        """Whether the circuit lets a call through; a half-open circuit admits one probe at a time."""
+        if self.consecutive_failures < self.breaker_failures:
+            return True
+        return now >= self.open_until and not self.probing
+
+    def score(self) -> float:
+        """Expected cost of a call: latency EWMA inflated by the error rate, plus the calls in flight."""
+        if self.latency_ewma is None:
+            # Untried members go first, members that have only ever failed go last
+            return 0.0 if not self.error_ewma else float("inf")
+        return self.latency_ewma * (1 + self.in_flight * 0.1) / max(0.05, 1.0 - self.error_ewma)
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of the recent latencies in seconds, None until there are enough samples."""
+        with self._lock:
+            if len(self._latencies) < 20:
+                return None
+            return statistics.quantiles(self._latencies, n=20)[-1]
+
+    def start(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.counters["calls"] += 1
+            if self.consecutive_failures >= self.breaker_failures:
+                self.probing = True
+
+    def succeeded(self, latency: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._latencies.append(latency)
+            self.latency_ewma = latency if self.latency_ewma is None else self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+            self.error_ewma *= 1 - self.alpha
+            if self.consecutive_failures >= self.breaker_failures:
+                logger.info(f"LLM pool member {self.name} recovered, closing its circuit")
+            self.consecutive_failures = 0
+            self.probing = False
+
+    def failed(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.error_ewma = self.alpha + (1 - self.alpha) * self.error_ewma
+            self.consecutive_failures += 1
+            self.counters["failures"] += 1
+            self.probing = False
+            if self.consecutive_failures >= self.breaker_failures:
+                self.open_until = time.monotonic() + self.breaker_seconds
+                self.counters["breaker_opened"] += 1
+                logger.warning(f"LLM pool member {self.name} failed {self.consecutive_failures} times, "
+                               f"opening its circuit for {self.breaker_seconds:g}s")
+
+    def abandoned(self) -> None:
+        """The call was cancelled or shed locally, which says nothing about the endpoint's health."""
+        with self._lock:
+            self.in_flight -= 1
+            self.probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "deployment": self.deployment,
+            "endpoint": self.endpoint,
+            "available": self.available(time.monotonic()),
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_ewma": round(self.error_ewma, 4),
+            "in_flight": self.in_flight,
+            **self.counters,
+        }
+
+
+class LlmDeploymentPool:
+    """Routes calls to the best member of a set of equivalent deployments, with failover and optional hedging."""
+    _instance: Optional["LlmDeploymentPool"] = None
+    _loaded = False
+    _lock = threading.Lock()
+
+    def __init__(self, members: List[PoolMember], explore: float = 0.05, max_attempts: int = 2,
+                 hedge_delay: float = 1.0, hedge_min_delay: float = 0.05, hedge_max_ratio: float = 0.1):
+        if not members:
+            raise ValueError("An LLM deployment pool needs at least one member")
+        self.members = members
+        self.explore = explore
+        self.max_attempts = max_attempts
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_ratio = hedge_max_ratio
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        self.counters = {"calls": 0, "failovers": 0, "hedged_calls": 0, "hedges": 0, "hedges_won": 0}
+
+    @classmethod
+    def get_instance(cls) -> Optional["LlmDeploymentPool"]:
+        """Get the process-wide pool, or None when LLM_POOL_DEPLOYMENTS is not set."""
+        if not cls._loaded:
+            with cls._lock:
+                if not cls._loaded:
+                    cls._instance = cls.from_env()
+                    cls._loaded = True
+        return cls._instance
+
+    @classmethod
+    def from_env(cls) -> Optional["LlmDeploymentPool"]:
+        """Build the pool from the LLM_POOL_* settings."""
+        names = [name.strip() for name in os.getenv("LLM_POOL_DEPLOYMENTS", "").split(",") if name.strip()]
+        if not names:
+            return None
+
+        breaker_failures = int(os.getenv("LLM_POOL_BREAKER_FAILURES", "5"))
+        breaker_seconds = float(os.getenv("LLM_POOL_BREAKER_SECONDS", "30"))
+        alpha = float(os.getenv("LLM_POOL_EWMA_ALPHA", "0.2"))
+        members = []
+        for name in names:
+            scope = re.sub(r"[^A-Z0-9]+", "_", name.upper())
+
+            def setting(key: str, default: Optional[str]) -> Optional[str]:
+                return os.getenv(f"LLM_POOL_{scope}_{key}", default)
+
+            members.append(PoolMember(
+                name,
+                deployment=setting("DEPLOYMENT", os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")),
+                endpoint=setting("ENDPOINT", os.getenv("AZURE_OPENAI_ENDPOINT")),
+                api_key=setting("API_KEY", os.getenv("AZURE_OPENAI_API_KEY")),
+                api_version=setting("API_VERSION", os.getenv("AZURE_OPENAI_API_VERSION")),
+                alpha=alpha,
+                breaker_failures=breaker_failures,
+                breaker_seconds=breaker_seconds,
+            ))
+        logger.info(f"LLM deployment pool: {', '.join(f'{m.name} ({m.deployment} at {m.endpoint})' for m in members)}")
+        return cls(
+            members,
+            explore=float(os.getenv("LLM_POOL_EXPLORE", "0.05")),
+            max_attempts=int(os.getenv("LLM_POOL_MAX_ATTEMPTS", "2")),
+            hedge_delay=float(os.getenv("LLM_POOL_HEDGE_DELAY_MS", "1000")) / 1000.0,
+            hedge_min_delay=float(os.getenv("LLM_POOL_HEDGE_MIN_DELAY_MS", "50")) / 1000.0,
+            hedge_max_ratio=float(os.getenv("LLM_POOL_HEDGE_MAX_RATIO", "0.1")),
+        )
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget the process-wide pool so the next get_instance() reads the settings again."""
+        with cls._lock:
+            cls._instance = None
+            cls._loaded = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "members": {member.name: member.snapshot() for member in self.members}}
+
+    # Routing
+
+    def rank(self) -> List[PoolMember]:
+        """Members in the order they should be tried."""
+        now = time.monotonic()
+        available = [member for member in self.members if member.available(now)]
+        if not available:
+            # Every circuit is open: failing fast helps nobody, try the one that reopens first
+            return sorted(self.members, key=lambda member: member.open_until)[:1]
+        ranked = sorted(available, key=PoolMember.score)
+        if len(ranked) > 1 and random.random() < self.explore:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def _hedge_after(self, member: PoolMember) -> float:
+        p95 = member.p95()
+        return self.hedge_delay if p95 is None else max(self.hedge_min_delay, p95)
+
+    def _may_hedge(self, candidates: List[PoolMember], hedge: bool) -> bool:
+        if not hedge or len(candidates) < 2:
+            return False
+        self.counters["hedged_calls"] += 1
+        return self.counters["hedges"] < self.hedge_max_ratio * self.counters["hedged_calls"]
+
+    @staticmethod
+    def _is_endpoint_failure(error: BaseException) -> bool:
+        """Whether an error reflects on the endpoint rather than on the request."""
+        status = getattr(error, "status_code", None)
+        return not (isinstance(status, int) and 400 <= status < 500 and status not in (408, 429))
+
+    def _settle(self, member: PoolMember, started: float, error: Optional[BaseException]) -> None:
+        if error is None:
+            member.succeeded(time.perf_counter() - started)
+        elif self._is_endpoint_failure(error) and not isinstance(error, (AdmissionRejected, asyncio.CancelledError, GeneratorExit)):
+            member.failed()
+        else:
+            member.abandoned()
+
+    def _should_fail_over(self, error: BaseException, attempt: int, candidates: List[PoolMember]) -> bool:
+        if attempt + 1 >= min(self.max_attempts, len(candidates)):
+            return False
+        if isinstance(error, AdmissionRejected) or self._is_endpoint_failure(error):
+            self.counters["failovers"] += 1
+            logger.warning(f"LLM call on {candidates[attempt].name} failed ({error}), failing over to {candidates[attempt + 1].name}")
+            return True
+        return False
+
+    def _timed(self, member: PoolMember, fn: Callable[[PoolMember], T]) -> T:
+        member.start()
+        started = time.perf_counter()
+        try:
+            result = fn(member)
+        except BaseException as e:
+            self._settle(member, started, e)
+            raise
+        self._settle(member, started, None)
+        return result
+
+    async def _atimed(self, member: PoolMember, fn: Callable[[PoolMember], Awaitable[T]]) -> T:
+        member.start()
+        started = time.perf_counter()
+        try:
+            result = await fn(member)
+        except BaseException as e:
+            self._settle(member, started, e)
+            raise
+        self._settle(member, started, None)
+        return result
+
+    # Call wrappers
+
+    def call(self, fn: Callable[[PoolMember], T], hedge: bool = False) -> T:
+        """Run fn against the best member, failing over on endpoint errors and hedging if asked."""
+        self.counters["calls"] += 1
+        candidates = self.rank()
+        if self._may_hedge(candidates, hedge):
+            return self._hedged(fn, candidates)
+        for attempt, member in enumerate(candidates):
+            try:
+                return self._timed(member, fn)
+            except Exception as e:
+                if not self._should_fail_over(e, attempt, candidates):
+                    raise
+
+    async def acall(self, fn: Callable[[PoolMember], Awaitable[T]], hedge: bool = False) -> T:
+        """Async variant of call."""
+        self.counters["calls"] += 1
+        candidates = self.rank()
+        if self._may_hedge(candidates, hedge):
+            return await self._ahedged(fn, candidates)
+        for attempt, member in enumerate(candidates):
+            try:
+                return await self._atimed(member, fn)
+            except Exception as e:
+                if not self._should_fail_over(e, attempt, candidates):
+                    raise
+
+    def _submit(self, member: PoolMember, fn: Callable[[PoolMember], T]) -> "futures.Future[T]":
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = futures.ThreadPoolExecutor(thread_name_prefix="llm-hedge")
+        # Carry the admission priority and callbacks context into the worker thread
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._timed, member, fn)
+
+    def _hedged(self, fn: Callable[[PoolMember], T], candidates: List[PoolMember]) -> T:
+        primary, backup = candidates[0], candidates[1]
+        first = self._submit(primary, fn)
+        done, _ = futures.wait([first], timeout=self._hedge_after(primary))
+        if done:
+            try:
+                return first.result()
+            except Exception as e:
+                if not self._should_fail_over(e, 0, candidates):
+                    raise
+                return self._timed(backup, fn)
+
+        self.counters["hedges"] += 1
+        second = self._submit(backup, fn)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self.counters["hedges_won"] += 1
+                    # The slower request cannot be interrupted in its thread, its result is discarded
+                    return future.result()
+                error = future.exception()
+                if not self._is_endpoint_failure(error) and not isinstance(error, AdmissionRejected):
+                    raise error
+        raise error
+
+    async def _ahedged(self, fn: Callable[[PoolMember], Awaitable[T]], candidates: List[PoolMember]) -> T:
+        primary, backup = candidates[0], candidates[1]
+        first = asyncio.ensure_future(self._atimed(primary, fn))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait([first], timeout=self._hedge_after(primary))
+            if done:
+                try:
+                    return first.result()
+                except Exception as e:
+                    if not self._should_fail_over(e, 0, candidates):
+                        raise
+                    return await self._atimed(backup, fn)
+
+            self.counters["hedges"] += 1
+            second = asyncio.ensure_future(self._atimed(backup, fn))
+            tasks.append(second)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.counters["hedges_won"] += 1
+                        return task.result()
+                    error = task.exception()
+                    if not self._is_endpoint_failure(error) and not isinstance(error, AdmissionRejected):
+                        raise error
+            raise error
+        finally:
+            # Cancel the slower request, also when the caller itself is cancelled
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stream(self, fn: Callable[[PoolMember], Iterator[T]]) -> Iterator[T]:
+        """Stream from the best member, failing over when it errors before the first chunk."""
+        self.counters["calls"] += 1
+        candidates = self.rank()
+        for attempt, member in enumerate(candidates):
+            member.start()
+            started = time.perf_counter()
+            first_chunk = False
+            try:
+                for chunk in fn(member):
+                    if not first_chunk:
+                        # Time to first token is what the routing optimizes for streams
+                        first_chunk = True
+                        self._settle(member, started, None)
+                    yield chunk
+                if not first_chunk:
+                    self._settle(member, started, None)
+                return
+            except BaseException as e:
+                if first_chunk:
+                    raise
+                self._settle(member, started, e)
+                if not isinstance(e, Exception) or not self._should_fail_over(e, attempt, candidates):
+                    raise
+
+    async def astream(self, fn: Callable[[PoolMember], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Async variant of stream."""
+        self.counters["calls"] += 1
+        candidates = self.rank()
+        for attempt, member in enumerate(candidates):
+            member.start()
+            started = time.perf_counter()
+            first_chunk = False
+            try:
+                async for chunk in fn(member):
+                    if not first_chunk:
+                        first_chunk = True
+                        self._settle(member, started, None)
+                    yield chunk
+                if not first_chunk:
+                    self._settle(member, started, None)
+                return
+            except BaseException as e:
+                if first_chunk:
+                    raise
+                self._settle(member, started, e)
+                if not isinstance(e, Exception) or not self._should_fail_over(e, attempt, candidates):
+                    raise
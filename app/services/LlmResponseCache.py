@@ -0,0 +1,347 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+# Message fields that change between otherwise identical requests
+_VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+class InMemoryCacheStore:
+    """Size-bounded LRU store with TTL, kept in process memory."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheStore:
+    """Size-bounded LRU store with TTL, persisted to a local SQLite file."""
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            now = time.time()
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class LlmResponseCache(BaseCache):
+    """
+    LangChain response cache with an exact tier and an optional semantic tier.
+
+    The exact tier is keyed on the normalized messages plus the model string,
+    which covers deployment, temperature and bound tools/response format. The
+    semantic tier matches the last user message by embedding similarity, scoped
+    to the same model string and preceding conversation, and points at entries
+    of the exact tier. It holds at most as many vectors as the exact tier holds
+    entries, across all scopes, and drops those that outlive the TTL or whose
+    exact entry has been evicted.
+    """
+    _instance = None
+
+    def __init__(self, store, embeddings=None, semantic_threshold: float = 0.95):
+        self.store = store
+        self.embeddings = embeddings
+        self.semantic_threshold = semantic_threshold
+        # Exact key -> (created at, scope, vector), least recently used first
+        self._semantic_index: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        # Exact key -> created at, oldest first; hits do not reorder it, so expiry can stop at the first live entry
+        self._semantic_created: "OrderedDict[str, float]" = OrderedDict()
+        # Scope -> exact keys with a vector in that scope
+        self._semantic_scopes: Dict[str, set] = {}
+        self._semantic_lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "updates": 0}
+        self._counters_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["LlmResponseCache"]:
+        """
+        Build the cache from LLM_CACHE_* environment variables.
+
+        Returns:
+            The configured cache, or None when LLM_CACHE_ENABLED is false
+        """
+        if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+            return None
+
+        max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+        ttl_seconds = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+        if os.getenv("LLM_CACHE_BACKEND", "memory").lower() == "disk":
+            store = DiskCacheStore(os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite"), max_entries, ttl_seconds)
+        else:
+            store = InMemoryCacheStore(max_entries, ttl_seconds)
+
+        embeddings = None
+        if os.getenv("LLM_CACHE_SEMANTIC_ENABLED", "false").lower() == "true":
+            from app.services.LlmClientRegistry import LlmClientRegistry
+
+            embeddings = LlmClientRegistry.get_embeddings()
+
+        return cls(store, embeddings, float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0.95")))
+
+    @classmethod
+    def get_instance(cls) -> Optional["LlmResponseCache"]:
+        """Get the process-wide cache configured from the environment (None if disabled)."""
+        if cls._instance is None:
+            cls._instance = cls.from_env() or False
+        return cls._instance or None
+
+    @staticmethod
+    def _normalize_messages(prompt: str) -> List[Dict[str, Any]]:
+        """Parse the serialized messages and drop fields that differ between identical requests."""
+        try:
+            messages = json.loads(prompt)
+        except ValueError:
+            return [{"content": re.sub(r"\s+", " ", prompt).strip()}]
+
+        normalized = []
+        for message in messages:
+            fields = dict(message.get("kwargs", message))
+            for field in _VOLATILE_MESSAGE_FIELDS:
+                fields.pop(field, None)
+            if isinstance(fields.get("content"), str):
+                fields["content"] = re.sub(r"\s+", " ", fields["content"]).strip()
+            normalized.append(fields)
+        return normalized
+
+    @staticmethod
+    def _hash(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _semantic_parts(self, messages: List[Dict[str, Any]], llm_string: str) -> Tuple[Optional[str], Optional[str]]:
+        """Split a request into the scope key (model + earlier messages) and the text to embed."""
+        if not messages or messages[-1].get("type") != "human" or not isinstance(messages[-1].get("content"), str):
+            return None, None
+        return self._hash(llm_string, messages[:-1]), messages[-1]["content"]
+
+    @staticmethod
+    def _similarity(a, b) -> float:
+        import numpy as np
+
+        return float(np.dot(a, b) / ((np.linalg.norm(a) * np.linalg.norm(b)) or 1.0))
+
+    def _semantic_drop(self, key: str) -> None:
+        """Forget the vector of an exact key; call with the semantic lock held."""
+        entry = self._semantic_index.pop(key, None)
+        self._semantic_created.pop(key, None)
+        if entry is not None:
+            keys = self._semantic_scopes.get(entry[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._semantic_scopes[entry[1]]
+
+    def _semantic_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.store.ttl_seconds) and now - created_at > self.store.ttl_seconds
+
+    def _count(self, counter: str) -> None:
+        with self._counters_lock:
+            self.counters[counter] += 1
+
+    def _semantic_candidates(self, scope: str) -> List[Tuple[Any, str]]:
+        """Live (vector, exact key) pairs of a scope, dropping expired ones."""
+        now = time.time()
+        candidates = []
+        with self._semantic_lock:
+            for key in list(self._semantic_scopes.get(scope, ())):
+                created_at, _, vector = self._semantic_index[key]
+                if self._semantic_expired(created_at, now):
+                    self._semantic_drop(key)
+                else:
+                    candidates.append((vector, key))
+        return candidates
+
+    def _load(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self.store.get(key)
+        if value is None:
+            return None
+        return loads(value, allowed_objects="core")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Look up a cached response for the prompt and model string."""
+        messages = self._normalize_messages(prompt)
+        key = self._hash(llm_string, messages)
+        generations = self._load(key)
+        if generations is not None:
+            self._count("exact_hits")
+            return generations
+
+        if self.embeddings is not None:
+            scope, text = self._semantic_parts(messages, llm_string)
+            candidates = self._semantic_candidates(scope) if scope is not None else []
+            if candidates:
+                vector = self.embeddings.embed_query(text)
+                scored = sorted(((self._similarity(vector, candidate), candidate_key) for candidate, candidate_key in candidates),
+                                key=lambda item: item[0], reverse=True)
+                for score, candidate_key in scored:
+                    if score < self.semantic_threshold:
+                        break
+                    generations = self._load(candidate_key)
+                    with self._semantic_lock:
+                        if generations is None:
+                            # Evicted or expired in the exact tier
+                            self._semantic_drop(candidate_key)
+                            continue
+                        if candidate_key in self._semantic_index:
+                            self._semantic_index.move_to_end(candidate_key)
+                    self._count("semantic_hits")
+                    return generations
+
+        self._count("misses")
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store a response for the prompt and model string."""
+        messages = self._normalize_messages(prompt)
+        key = self._hash(llm_string, messages)
+
+        # Cached messages are replayed into other conversations, so they must not keep their ids
+        generations = [
+            generation.model_copy(update={"message": generation.message.model_copy(update={"id": None})})
+            if getattr(generation, "message", None) is not None else generation
+            for generation in return_val
+        ]
+        self.store.set(key, dumps(generations))
+        self._count("updates")
+
+        if self.embeddings is not None:
+            scope, text = self._semantic_parts(messages, llm_string)
+            if scope is not None:
+                vector = self.embeddings.embed_query(text)
+                now = time.time()
+                with self._semantic_lock:
+                    self._semantic_drop(key)
+                    self._semantic_index[key] = (now, scope, vector)
+                    self._semantic_created[key] = now
+                    self._semantic_scopes.setdefault(scope, set()).add(key)
+                    while self._semantic_created:
+                        oldest_key, created_at = next(iter(self._semantic_created.items()))
+                        if not self._semantic_expired(created_at, now):
+                            break
+                        self._semantic_drop(oldest_key)
+                    # One bound across all scopes, the same as the exact tier's
+                    while len(self._semantic_index) > self.store.max_entries:
+                        self._semantic_drop(next(iter(self._semantic_index)))
+
+    def clear(self, **kwargs: Any) -> None:
+        """Clear both tiers."""
+        self.store.clear()
+        with self._semantic_lock:
+            self._semantic_index.clear()
+            self._semantic_created.clear()
+            self._semantic_scopes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss metrics.
+
+        Returns:
+            Counters, hit rate, entry count and evictions
+        """
+        with self._counters_lock:
+            counters = dict(self.counters)
+        lookups = counters["exact_hits"] + counters["semantic_hits"] + counters["misses"]
+        hits = counters["exact_hits"] + counters["semantic_hits"]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self.store),
+            "evictions": self.store.evictions,
+            "semantic_enabled": self.embeddings is not None,
+            "semantic_entries": len(self._semantic_index),
+        }
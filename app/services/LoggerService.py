@@ -1,36 +1,303 @@
+import atexit
+import json
 import logging
-from typing import Optional
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fields bound to the current request (request_id, thread_id), copied onto every record
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "suppressed"}
+
+
+def _parse_prefixes(value: str) -> List[Tuple[str, float]]:
+    """Parse 'app.core=0.1,azure=0.01' into (prefix, value) pairs, longest prefix first."""
+    pairs = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        prefix, _, number = item.partition("=")
+        pairs.append((prefix.strip(), float(number)))
+    return sorted(pairs, key=lambda pair: len(pair[0]), reverse=True)
+
+
+def _match(pairs: List[Tuple[str, float]], name: str) -> Optional[float]:
+    for prefix, value in pairs:
+        if name == prefix or name.startswith(prefix + "."):
+            return value
+    return None
+
+
+class ContextFilter(logging.Filter):
+    """Copies the fields bound to the current request onto the record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-logger sampling and rate limits for chatty paths.
+
+    Sample rates keep a random share of the records of a logger prefix, rate limits
+    keep at most N records per second; the next record let through carries the
+    number suppressed in between. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, sample_rates: List[Tuple[str, float]], rate_limits: List[Tuple[str, float]]):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        # Per logger: [tokens, last refill, suppressed]
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.sample_rates:
+            rate = _match(self.sample_rates, record.name)
+            if rate is not None and random.random() >= rate:
+                return False
+        if self.rate_limits:
+            limit = _match(self.rate_limits, record.name)
+            if limit is not None:
+                return self._take(record, limit)
+        return True
+
+    def _take(self, record: logging.LogRecord, limit: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [limit, now, 0]
+            bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the request context and any extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the background listener without waiting on I/O.
+
+    Only the message is rendered on the calling thread. When the queue is full,
+    records below ERROR are dropped and counted instead of blocking the request;
+    errors wait up to a second for room.
+    """
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks keep frames alive, render them before the record changes hands
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if record.levelno >= logging.ERROR:
+                self.queue.put(record, timeout=1.0)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class CorrelationIdMiddleware:
+    """
+    ASGI middleware that binds a correlation id to every HTTP request.
+
+    The id comes from the X-Request-ID header or is generated, is logged with every
+    record of the request (including those of the graph run, which inherits the
+    context) and is returned in the X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = next((value.decode("latin-1")[:128] for key, value in scope.get("headers", []) if key == b"x-request-id"), None)
+        request_id = request_id or uuid.uuid4().hex
+        header = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        token = LoggerService.bind(request_id=request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            LoggerService.unbind(token)
+
 
 class LoggerService:
     """Service for configuring and providing logging functionality."""
-    
+    _listener: Optional[logging.handlers.QueueListener] = None
+    _queue_handler: Optional[NonBlockingQueueHandler] = None
+
     @staticmethod
     def configure_logger(
-        level: int = logging.INFO,
+        level: Optional[int] = None,
         format_str: str = '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         log_file: Optional[str] = None
     ):
         """Configure the root logger with specified settings.
-        
+
+        Records are passed through a bounded queue to a background thread that
+        formats and writes them, so log I/O stays off the request path. Settings
+        not given as arguments are read from the environment:
+
+            LOG_LEVEL=INFO
+            LOG_FORMAT=json                 (json or text, text uses format_str)
+            LOG_FILE=                       (stderr when empty)
+            LOG_ASYNC=true                  (false writes on the calling thread)
+            LOG_QUEUE_SIZE=10000
+            LOG_SAMPLE_RATES=app.core.ContextWindow=0.1,azure=0.01
+            LOG_RATE_LIMITS=app.services.BlobCache=5        (records per second)
+
         Args:
-            level: Logging level (default: INFO)
-            format_str: Log message format
+            level: Logging level (default: LOG_LEVEL or INFO)
+            format_str: Log message format for LOG_FORMAT=text
             log_file: Optional file path to save logs
         """
-        logging.basicConfig(
-            level=level,
-            format=format_str,
-            filename=log_file
-        )
-    
+        LoggerService.shutdown()
+        level = level if level is not None else logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+        log_file = log_file or os.getenv("LOG_FILE") or None
+
+        handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler()
+        if os.getenv("LOG_FORMAT", "json").lower() == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(format_str))
+
+        filters = [ContextFilter()]
+        sample_rates = _parse_prefixes(os.getenv("LOG_SAMPLE_RATES", ""))
+        rate_limits = _parse_prefixes(os.getenv("LOG_RATE_LIMITS", ""))
+        if sample_rates or rate_limits:
+            filters.insert(0, SamplingFilter(sample_rates, rate_limits))
+
+        if os.getenv("LOG_ASYNC", "true").lower() == "true":
+            log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+            front = LoggerService._queue_handler = NonBlockingQueueHandler(log_queue)
+            LoggerService._listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+            LoggerService._listener.start()
+        else:
+            front = handler
+        # Dropped records are filtered before they cost a queue slot or a format call
+        for log_filter in filters:
+            front.addFilter(log_filter)
+
+        root = logging.getLogger()
+        for existing in root.handlers[:]:
+            root.removeHandler(existing)
+            existing.close()
+        root.addHandler(front)
+        root.setLevel(level)
+
+    @staticmethod
+    def shutdown() -> None:
+        """
+        Flush the queued records and stop the background thread.
+
+        The queue handler is swapped for the handlers it fed, with its filters, so
+        that records logged afterwards are written directly instead of queued for
+        a listener that no longer runs.
+        """
+        listener, LoggerService._listener = LoggerService._listener, None
+        queue_handler, LoggerService._queue_handler = LoggerService._queue_handler, None
+        if listener is None:
+            return
+        root = logging.getLogger()
+        if queue_handler is not None and queue_handler in root.handlers:
+            root.removeHandler(queue_handler)
+            for handler in listener.handlers:
+                for log_filter in queue_handler.filters:
+                    handler.addFilter(log_filter)
+                root.addHandler(handler)
+        listener.stop()
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Queue depth and records dropped because the queue was full."""
+        handler = LoggerService._queue_handler
+        if handler is None or LoggerService._listener is None:
+            return {"async": False}
+        return {"async": True, "queued": handler.queue.qsize(), "dropped": handler.dropped}
+
+    @staticmethod
+    def bind(**fields: Any) -> Token:
+        """Add fields (e.g. request_id, thread_id) to every record logged in the current context; returns a token for unbind."""
+        return _log_context.set({**_log_context.get(), **fields})
+
+    @staticmethod
+    def unbind(token: Token) -> None:
+        """Restore the fields bound before the matching bind()."""
+        _log_context.reset(token)
+
+    @staticmethod
+    def context() -> Dict[str, Any]:
+        """Fields bound to the current context."""
+        return _log_context.get()
+
     @staticmethod
     def get_logger(name: str) -> logging.Logger:
         """Get a logger with the specified name.
-        
+
         Args:
             name: Name for the logger (typically __name__)
-            
+
         Returns:
             Configured logger instance
         """
-        return logging.getLogger(name)
\ No newline at end of file
+        return logging.getLogger(name)
+
+
+atexit.register(LoggerService.shutdown)
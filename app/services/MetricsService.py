@@ -0,0 +1,173 @@
+"""
+Process-wide counters and histograms exported in the Prometheus text format.
+
+Metrics are plain in-process objects, so recording one costs a lock and a few
+dict and bisect operations. Figures that other services already keep (cache
+counters, admission queues, pool health) are read by collectors when /metrics
+is scraped instead of being recorded twice.
+
+METRICS_ENABLED=false detaches the LangChain callback handler and the storage
+request hooks, which record the bulk of the samples.
+"""
+import bisect
+import math
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels."""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        return [(f"{self.name}_total", dict(zip(self.labelnames, key)), value) for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (the last one is +Inf), count and sum
+        self._values: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        samples = []
+        for key, counts, count, total in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_count", labels, count))
+            samples.append((f"{self.name}_sum", labels, total))
+        return samples
+
+
+class MetricsService:
+    """Registry of the process metrics and of collectors for figures kept elsewhere."""
+    _metrics: Dict[str, object] = {}
+    _collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+    _lock = threading.Lock()
+    enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    @classmethod
+    def _get_or_create(cls, metric_class: type, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        metric = cls._metrics.get(name)
+        if metric is None:
+            with cls._lock:
+                metric = cls._metrics.get(name)
+                if metric is None:
+                    metric = cls._metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+        return metric
+
+    @classmethod
+    def counter(cls, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Get the counter with the given name, registering it on first use."""
+        return cls._get_or_create(Counter, name, documentation, labelnames)
+
+    @classmethod
+    def histogram(cls, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Get the histogram with the given name, registering it on first use."""
+        return cls._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    @classmethod
+    def register_collector(cls, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]) -> None:
+        """
+        Register a function called on every scrape.
+
+        Args:
+            collector: Returns (name, type, documentation, samples) families, where
+                samples are (sample name, labels, value) tuples
+        """
+        with cls._lock:
+            if collector not in cls._collectors:
+                cls._collectors.append(collector)
+
+    @classmethod
+    def render(cls) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        families = [(metric.name, metric.type, metric.documentation, metric.samples()) for metric in list(cls._metrics.values())]
+        for collector in list(cls._collectors):
+            families.extend(collector())
+
+        lines = []
+        for name, metric_type, documentation, samples in families:
+            if not samples:
+                continue
+            # Counter families are named after their _total samples, as prometheus_client does
+            family = f"{name}_total" if metric_type == "counter" else name
+            lines.append(f"# HELP {family} {documentation}")
+            lines.append(f"# TYPE {family} {metric_type}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def counter_family(name: str, documentation: str, values: Dict[Tuple[Tuple[str, str], ...], float]) -> Tuple[str, str, str, List[Sample]]:
+    """A counter family for a collector, from label tuples to values."""
+    return name, "counter", documentation, [(f"{name}_total", dict(labels), value) for labels, value in values.items()]
+
+
+def gauge_family(name: str, documentation: str, values: Dict[Tuple[Tuple[str, str], ...], Optional[float]]) -> Tuple[str, str, str, List[Sample]]:
+    """A gauge family for a collector, from label tuples to values; None values are skipped."""
+    return name, "gauge", documentation, [(name, dict(labels), value) for labels, value in values.items() if value is not None]
@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable
+
+from app.services.LoggerService import LoggerService
+
+logger = LoggerService.get_logger(__name__)
+
+
+class RunnableCache:
+    """
+    Process-wide cache of compiled runnables such as chains and agent executors.
+
+    Runnables are built once per key (template, tool set, model config) and then
+    reused across requests, so a request only pays for the model call.
+    """
+    _entries: Dict[Hashable, Any] = {}
+    _stats: Dict[Hashable, Dict[str, float]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_or_build(cls, key: Hashable, builder: Callable[[], Any]) -> Any:
+        """
+        Get the runnable for a key, building it on first use.
+
+        Args:
+            key: Hashable description of everything the runnable depends on
+            builder: Zero-argument callable that builds the runnable
+
+        Returns:
+            The cached runnable
+        """
+        runnable = cls._entries.get(key)
+        if runnable is not None:
+            cls._stats[key]["hits"] += 1
+            return runnable
+
+        with cls._lock:
+            runnable = cls._entries.get(key)
+            if runnable is not None:
+                cls._stats[key]["hits"] += 1
+                return runnable
+
+            start = time.perf_counter()
+            runnable = builder()
+            build_seconds = time.perf_counter() - start
+            cls._entries[key] = runnable
+            cls._stats[key] = {"hits": 0, "build_seconds": build_seconds}
+            logger.info(f"Built runnable {key[0] if isinstance(key, tuple) else key} in {build_seconds:.3f}s")
+            return runnable
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Totals for entries, hits and build time plus per-entry figures
+        """
+        entries = {repr(key)[:120]: dict(value) for key, value in cls._stats.items()}
+        return {
+            "entries": len(entries),
+            "hits": sum(value["hits"] for value in entries.values()),
+            "build_seconds": round(sum(value["build_seconds"] for value in entries.values()), 6),
+            "by_entry": entries,
+        }
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all cached runnables, e.g. after the model configuration changed."""
+        with cls._lock:
+            cls._entries = {}
+            cls._stats = {}
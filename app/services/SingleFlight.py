@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+from app.services.LoggerService import LoggerService
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One in-flight execution and the number of requests waiting on it."""
+
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class _Broadcast:
+    """One in-flight event stream, replayed to every subscriber from the first event."""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+        self.subscribers = 0
+        self.task: Optional["asyncio.Future"] = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent requests onto one execution within this process.
+
+    Requests with the same key that arrive while an execution is in flight wait
+    for its result instead of starting their own; streams are shared the same way
+    and every subscriber receives all events from the start. The execution keeps
+    running as long as at least one request is waiting on it, so a client that
+    disconnects does not cancel the work of the others. Nothing is cached: once an
+    execution finishes, the next request with the same key starts a new one.
+    """
+    _groups: Dict[str, "SingleFlight"] = {}
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self.counters = {"executions": 0, "coalesced": 0, "stream_executions": 0, "stream_coalesced": 0}
+
+    @classmethod
+    def group(cls, name: str) -> "SingleFlight":
+        """Get the process-wide group for an entry point, enabled unless SINGLE_FLIGHT_ENABLED is false."""
+        group = cls._groups.get(name)
+        if group is None:
+            enabled = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+            group = cls._groups.setdefault(name, cls(name, enabled))
+        return group
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, int]]:
+        """Counters per group, with the number of executions currently in flight."""
+        return {
+            name: {**group.counters, "in_flight": len(group._flights) + len(group._streams)}
+            for name, group in cls._groups.items()
+        }
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """
+        Build the coalescing key of a request.
+
+        Args:
+            parts: Input and parameters of the request; whitespace in strings is
+                collapsed so trivially different spellings of a query coalesce
+
+        Returns:
+            Hex digest identifying the request
+        """
+        normalized = [re.sub(r"\s+", " ", part).strip() if isinstance(part, str) else part for part in parts]
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            logger.debug(f"Single-flight execution of {self.name} failed: {flight.task.exception()}")
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn, or wait for the in-flight execution with the same key.
+
+        Args:
+            key: Coalescing key from SingleFlight.key
+            fn: Zero-argument coroutine function performing the request
+
+        Returns:
+            The result of the shared execution; its exception is raised to every waiter
+        """
+        if not self.enabled:
+            return await fn()
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.counters["executions"] += 1
+        else:
+            self.counters["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every request gave up on the result
+                flight.task.cancel()
+
+    async def _pump(self, key: str, broadcast: _Broadcast, events: AsyncIterator[Dict[str, Any]]) -> None:
+        """Pull the source stream and publish each event to the subscribers."""
+        try:
+            async for event in events:
+                broadcast.events.append(event)
+                async with broadcast.changed:
+                    broadcast.changed.notify_all()
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            broadcast.done = True
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            async with broadcast.changed:
+                broadcast.changed.notify_all()
+
+    async def stream(self, key: str, events: Callable[[], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the events of events(), or join the in-flight stream with the same key.
+
+        Args:
+            key: Coalescing key from SingleFlight.key
+            events: Zero-argument callable returning the source event iterator
+
+        Yields:
+            Every event of the shared stream, starting from the first one
+        """
+        if not self.enabled:
+            async for event in events():
+                yield event
+            return
+
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, events()))
+            self.counters["stream_executions"] += 1
+        else:
+            self.counters["stream_coalesced"] += 1
+
+        broadcast.subscribers += 1
+        index = 0
+        try:
+            while True:
+                async with broadcast.changed:
+                    await broadcast.changed.wait_for(lambda: index < len(broadcast.events) or broadcast.done)
+                while index < len(broadcast.events):
+                    event = broadcast.events[index]
+                    index += 1
+                    yield event
+                if broadcast.done and index >= len(broadcast.events):
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.task.done():
+                # Every subscriber disconnected
+                broadcast.task.cancel()
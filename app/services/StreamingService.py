@@ -0,0 +1,73 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from app.services.AdmissionController import AdmissionRejected
+from app.services.LoggerService import LoggerService
+
+logger = LoggerService.get_logger(__name__)
+
+
+class StreamingService:
+    """Service for turning async event generators into Server-Sent-Events responses."""
+
+    @staticmethod
+    def format_event(event: str, data: Any) -> str:
+        """
+        Format a single SSE frame.
+
+        Args:
+            event: Name of the event (e.g. 'token', 'node', 'end')
+            data: JSON-serializable payload
+
+        Returns:
+            The encoded SSE frame
+        """
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    @staticmethod
+    async def _event_stream(request: Request, events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+        """
+        Pull events one at a time and forward them to the client.
+
+        Events are only produced when the previous frame has been handed to the
+        server, so a slow client slows down consumption of the underlying LLM
+        stream instead of buffering it in memory. When the client disconnects the
+        source generator is closed, which cancels the in-flight LLM call.
+        """
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    logger.info("Client disconnected, cancelling stream")
+                    break
+                yield StreamingService.format_event(event["event"], event["data"])
+        except AdmissionRejected as e:
+            logger.warning(f"Stream shed by LLM admission control: {str(e)}")
+            yield StreamingService.format_event("error", {"detail": str(e), "status_code": e.status_code, "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error while streaming: {str(e)}")
+            yield StreamingService.format_event("error", {"detail": str(e)})
+        finally:
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    @staticmethod
+    def sse_response(request: Request, events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+        """
+        Build a StreamingResponse that sends the given events as SSE.
+
+        Args:
+            request: The incoming request, used for disconnect detection
+            events: Async iterator of {"event": name, "data": payload} dicts
+
+        Returns:
+            StreamingResponse with the text/event-stream media type
+        """
+        return StreamingResponse(
+            StreamingService._event_stream(request, events),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
@@ -0,0 +1,752 @@
+import io
+import json
+import os
+import struct
+import threading
+import time
+import zipfile
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.models.DataStoreModel import Chunk
+from app.services.LoggerService import LoggerService
+
+if TYPE_CHECKING:
+    from app.services.ChunkSegment import ChunkSegment
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so inner product equals cosine similarity."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class VectorIndex:
+    """
+    In-process cosine-similarity index over chunk embeddings.
+
+    Small corpora are searched brute force with one matrix multiply. Larger ones
+    use an IVF-flat layout: vectors are bucketed by their nearest k-means centroid
+    and a query only scans the `nprobe` closest buckets. Rows are stored in one
+    float32 matrix; deletes are tombstones that are compacted away in bulk.
+    """
+
+    def __init__(self, dimensions: int, mode: str = "auto", nlist: Optional[int] = None, nprobe: int = 8, brute_force_limit: int = 20000):
+        """
+        Args:
+            dimensions: Embedding dimensions
+            mode: 'flat' (brute force), 'ivf', or 'auto' (flat until brute_force_limit vectors)
+            nlist: Number of IVF buckets, defaults to ~sqrt(n) when trained
+            nprobe: Buckets scanned per query in IVF mode
+            brute_force_limit: Size at which 'auto' switches to IVF
+        """
+        self.dimensions = dimensions
+        self.mode = mode
+        self.nlist = nlist
+        self._configured_nlist = nlist
+        self.nprobe = nprobe
+        self.brute_force_limit = brute_force_limit
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._size = 0
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = []
+        self._trained_size = 0
+        # First VectorIndexRegistry journal not included in the snapshot this index was saved as
+        self.journal = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def uses_ivf(self) -> bool:
+        return self._centroids is not None
+
+    def _reserve(self, extra: int) -> None:
+        """Grow the row storage geometrically."""
+        needed = self._size + extra
+        if needed <= len(self._vectors):
+            return
+        capacity = max(needed, 2 * len(self._vectors), 1024)
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        assignments = np.full(capacity, -1, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        self._vectors, self._alive, self._assignments = vectors, alive, assignments
+
+    def add(self, ids: Sequence[str], vectors) -> None:
+        """
+        Add or replace vectors.
+
+        Args:
+            ids: Chunk ids, one per vector
+            vectors: Array-like of shape (len(ids), dimensions)
+        """
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dimensions))
+        with self._lock:
+            self.delete([chunk_id for chunk_id in ids if chunk_id in self._rows])
+            self._reserve(len(ids))
+            start = self._size
+            rows = np.arange(start, start + len(ids))
+            self._vectors[rows] = vectors
+            self._alive[rows] = True
+            for row, chunk_id in zip(rows, ids):
+                self._rows[chunk_id] = int(row)
+            self._ids.extend(ids)
+            self._size += len(ids)
+
+            if self.uses_ivf and len(self) <= 4 * self._trained_size:
+                self._assign(rows)
+            elif self.mode == "ivf" or (self.mode == "auto" and len(self) >= self.brute_force_limit):
+                # First training, or the corpus outgrew the buckets it was trained with
+                self.train()
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """
+        Remove vectors by id.
+
+        Returns:
+            Number of vectors removed
+        """
+        removed = 0
+        with self._lock:
+            for chunk_id in ids:
+                row = self._rows.pop(chunk_id, None)
+                if row is not None:
+                    self._alive[row] = False
+                    self._ids[row] = None
+                    removed += 1
+            # Reclaim space once tombstones make up a quarter of the rows
+            if removed and self._size - len(self) > max(1024, self._size // 4):
+                self._compact()
+        return removed
+
+    def _compact(self) -> None:
+        """Drop tombstoned rows and rebuild the row mapping and buckets."""
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._vectors = self._vectors[keep].copy()
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._assignments = self._assignments[keep].copy()
+        self._ids = [self._ids[row] for row in keep]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._size = len(keep)
+        if self.uses_ivf:
+            self._rebuild_lists()
+
+    def train(self, nlist: Optional[int] = None, iterations: int = 10, sample_size: int = 65536, seed: int = 0) -> None:
+        """
+        Train IVF centroids with k-means on a sample of the stored vectors.
+
+        Args:
+            nlist: Number of buckets, defaults to ~sqrt(n)
+            iterations: k-means iterations
+            sample_size: Maximum vectors used for training
+            seed: Random seed
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            if len(rows) == 0:
+                return
+            nlist = nlist or self._configured_nlist or max(1, int(np.sqrt(len(rows))))
+            nlist = min(nlist, len(rows))
+            rng = np.random.default_rng(seed)
+            sample = self._vectors[rng.choice(rows, size=min(sample_size, len(rows)), replace=False)]
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                # Sum members per bucket in one pass; empty buckets keep their centroid
+                counts = np.bincount(labels, minlength=nlist)
+                starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                nonempty = counts > 0
+                centroids[nonempty] = np.add.reduceat(sample[np.argsort(labels, kind="stable")], starts[nonempty], axis=0)
+                centroids = _normalize(centroids)
+            self._centroids = centroids
+            self.nlist = nlist
+            self._trained_size = len(rows)
+            self._assign(rows, rebuild=True)
+            logger.info(f"Trained IVF index with {nlist} buckets over {len(rows)} vectors")
+
+    def _assign(self, rows: np.ndarray, rebuild: bool = False) -> None:
+        """Assign rows to their nearest centroid and add them to the bucket lists."""
+        for start in range(0, len(rows), 65536):
+            batch = rows[start:start + 65536]
+            self._assignments[batch] = np.argmax(self._vectors[batch] @ self._centroids.T, axis=1)
+        if rebuild or len(self._lists) != len(self._centroids):
+            self._rebuild_lists()
+            return
+        # Incremental add: append to the touched buckets only, deleted rows are filtered at query time
+        assignments = self._assignments[rows]
+        for bucket in np.unique(assignments):
+            self._lists[bucket] = np.concatenate([self._lists[bucket], rows[assignments == bucket]])
+
+    def _rebuild_lists(self) -> None:
+        assignments = self._assignments[:self._size]
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+
+    def search(self, query, k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Find the k most similar chunks.
+
+        Args:
+            query: Query embedding
+            k: Number of results
+            nprobe: Buckets to scan in IVF mode, defaults to the index setting
+
+        Returns:
+            List of (chunk id, cosine similarity), best first
+        """
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(1, self.dimensions))[0]
+        with self._lock:
+            if self.uses_ivf:
+                probes = np.argsort(self._centroids @ query)[::-1][:nprobe or self.nprobe]
+                candidates = np.concatenate([self._lists[p] for p in probes]) if len(probes) else np.zeros(0, dtype=np.int64)
+            else:
+                candidates = np.arange(self._size)
+            candidates = candidates[self._alive[candidates]]
+            if len(candidates) == 0:
+                return []
+            scores = self._vectors[candidates] @ query
+            k = min(k, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[candidates[i]], float(scores[i])) for i in top]
+
+    def add_chunks(self, chunks: Iterable[Chunk], batch_size: int = 4096) -> int:
+        """
+        Add every chunk that carries an embedding.
+
+        Returns:
+            Number of chunks indexed
+        """
+        added = 0
+        ids, vectors = [], []
+        for chunk in chunks:
+            if chunk.Vector_Embeddings:
+                ids.append(chunk.ChunkId)
+                vectors.append(chunk.Vector_Embeddings)
+            if len(ids) >= batch_size:
+                self.add(ids, vectors)
+                added += len(ids)
+                ids, vectors = [], []
+        if ids:
+            self.add(ids, vectors)
+            added += len(ids)
+        return added
+
+    def add_segment(self, segment: "ChunkSegment") -> int:
+        """
+        Add every row of a chunk segment that carries an embedding.
+
+        Returns:
+            Number of chunks indexed
+        """
+        mask = segment.has_vector
+        ids = [chunk_id for chunk_id, present in zip(segment.ids(), mask) if present]
+        if ids:
+            self.add(ids, segment.vectors[mask])
+        return len(ids)
+
+    def to_bytes(self) -> bytes:
+        """Serialize a compacted snapshot of the index."""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            buffer = io.BytesIO()
+            arrays = {
+                "vectors": self._vectors[rows],
+                "ids": np.array([self._ids[row] for row in rows], dtype=np.str_),
+                "config": np.frombuffer(json.dumps({
+                    "dimensions": self.dimensions, "mode": self.mode, "nlist": self._configured_nlist,
+                    "nprobe": self.nprobe, "brute_force_limit": self.brute_force_limit,
+                }).encode("utf-8"), dtype=np.uint8),
+                "journal": np.array([self.journal], dtype=np.int64),
+            }
+            if self.uses_ivf:
+                arrays["centroids"] = self._centroids
+            np.savez(buffer, **arrays)
+            return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "VectorIndex":
+        """Load a snapshot written by to_bytes()."""
+        arrays = np.load(io.BytesIO(data), allow_pickle=False)
+        index = cls(**json.loads(arrays["config"].tobytes().decode("utf-8")))
+        ids = arrays["ids"].tolist()
+        if "journal" in arrays:
+            index.journal = int(arrays["journal"][0])
+        if "centroids" in arrays:
+            index._centroids = arrays["centroids"]
+            index.nlist = len(index._centroids)
+        # Snapshot vectors are already normalized, load them without re-training
+        index._reserve(len(ids))
+        index._vectors[:len(ids)] = arrays["vectors"]
+        index._alive[:len(ids)] = True
+        index._ids = list(ids)
+        index._rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        index._size = len(ids)
+        if index.uses_ivf:
+            index._trained_size = len(ids)
+            index._assign(np.arange(len(ids)), rebuild=True)
+        return index
+
+
+
+
+# Upper bound of one journal record, the service limit on one append block
+_JOURNAL_RECORD_BYTES = 4 * 1024 * 1024
+
+
+def _encode_records(chunks: Sequence[Chunk], removed: Sequence[str]) -> List[bytes]:
+    """
+    Encode index changes as journal records of at most _JOURNAL_RECORD_BYTES.
+
+    A record is uint32 header length | uint32 vector bytes | JSON header | float32
+    vectors, with a header of {"delete": [ids]} or {"add": [ids], "dimensions": n}.
+    """
+    def record(header: dict, vectors: bytes = b"") -> bytes:
+        encoded = json.dumps(header).encode("utf-8")
+        return struct.pack("<II", len(encoded), len(vectors)) + encoded + vectors
+
+    records = []
+    batch: List[str] = []
+    size = 0
+    for chunk_id in removed:
+        if batch and size + len(chunk_id) + 4 > _JOURNAL_RECORD_BYTES - 1024:
+            records.append(record({"delete": batch}))
+            batch, size = [], 0
+        batch.append(chunk_id)
+        size += len(chunk_id) + 4
+    if batch:
+        records.append(record({"delete": batch}))
+
+    batch_chunks: List[Chunk] = []
+    size = 0
+
+    def add_record() -> bytes:
+        vectors = np.asarray([chunk.Vector_Embeddings for chunk in batch_chunks], dtype=np.float32)
+        return record({"add": [chunk.ChunkId for chunk in batch_chunks], "dimensions": vectors.shape[1]}, vectors.tobytes())
+
+    for chunk in chunks:
+        chunk_size = len(chunk.ChunkId) + 4 + 4 * len(chunk.Vector_Embeddings)
+        if batch_chunks and size + chunk_size > _JOURNAL_RECORD_BYTES - 1024:
+            records.append(add_record())
+            batch_chunks, size = [], 0
+        batch_chunks.append(chunk)
+        size += chunk_size
+    if batch_chunks:
+        records.append(add_record())
+    return records
+
+
+def _decode_records(data: bytes) -> Iterator[Tuple[dict, memoryview, int]]:
+    """Yield (header, vector bytes, end offset) for every complete record in data."""
+    view = memoryview(data)
+    offset = 0
+    while offset + 8 <= len(view):
+        header_length, vector_length = struct.unpack_from("<II", view, offset)
+        end = offset + 8 + header_length + vector_length
+        if end > len(view):
+            break
+        yield json.loads(bytes(view[offset + 8:offset + 8 + header_length]).decode("utf-8")), view[end - vector_length:end], end
+        offset = end
+
+
+class _LoadedIndex:
+    """An index loaded in this process and how far it has replayed the journals."""
+
+    def __init__(self, index: VectorIndex):
+        self.index = index
+        # Journal being replayed and the bytes of it applied so far
+        self.journal = index.journal
+        self.offset = 0
+        # Journal bytes applied since the snapshot
+        self.journal_bytes = 0
+        self.refreshed_at = time.monotonic()
+
+
+class VectorIndexRegistry:
+    """
+    Process-wide vector indexes, one per data store container.
+
+    A container's index is stored as a snapshot plus numbered append-blob journals
+    of the chunks written and deleted since. A write appends a journal record
+    instead of storing the index again, whether or not the index is loaded in
+    this process. Loading replays the journals from the one the snapshot names,
+    and loaded indexes pick up other processes' records at most every
+    VECTOR_INDEX_REFRESH_SECONDS. Once the journals outgrow
+    VECTOR_INDEX_JOURNAL_MAX_BYTES they are folded into a new snapshot: the next
+    journal is created and the current one sealed before it is read to its end,
+    so no append is lost.
+    """
+    _indexes: Dict[str, _LoadedIndex] = {}
+    # Guards the registry dicts only; loads, builds and journal I/O hold the container's lock
+    _lock = threading.Lock()
+    _container_locks: Dict[str, threading.RLock] = {}
+    # Journal last appended to, per container, for writers without a loaded index
+    _journal_hints: Dict[str, int] = {}
+
+    @staticmethod
+    def snapshot_blob_name() -> str:
+        return os.getenv("VECTOR_INDEX_SNAPSHOT_BLOB", "_index/vector_index.npz")
+
+    @staticmethod
+    def refresh_seconds() -> float:
+        return float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "30"))
+
+    @staticmethod
+    def journal_max_bytes() -> int:
+        return int(os.getenv("VECTOR_INDEX_JOURNAL_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    @classmethod
+    def _journal_name(cls, number: int) -> str:
+        return f"{cls.snapshot_blob_name()}.{number:08d}.journal"
+
+    @classmethod
+    def _journals(cls, container_name: str) -> Dict[int, int]:
+        """Size of every journal of a container, by number."""
+        from app.services.azurestorageservice import AzureStorageService
+
+        start = f"{cls.snapshot_blob_name()}."
+        return {int(blob.name[len(start):-len(".journal")]): blob.size
+                for blob in AzureStorageService.list_blobs(container_name, name_starts_with=start)
+                if blob.name.endswith(".journal")}
+
+    @classmethod
+    def _container_lock(cls, container_name: str) -> threading.RLock:
+        with cls._lock:
+            return cls._container_locks.setdefault(container_name, threading.RLock())
+
+    @classmethod
+    def get_index(cls, container_name: str) -> VectorIndex:
+        """
+        Get the index for a container: from memory, else its snapshot, else built from the stored chunks.
+
+        Args:
+            container_name: Data store container holding the chunks
+
+        Returns:
+            The loaded VectorIndex
+        """
+        loaded = cls._indexes.get(container_name)
+        if loaded is None:
+            with cls._container_lock(container_name):
+                loaded = cls._indexes.get(container_name)
+                if loaded is None:
+                    loaded = cls._load(container_name)
+                    with cls._lock:
+                        cls._indexes[container_name] = loaded
+        elif time.monotonic() - loaded.refreshed_at > cls.refresh_seconds():
+            cls._refresh(container_name, loaded)
+            loaded = cls._indexes.get(container_name, loaded)
+        return loaded.index
+
+    @classmethod
+    def _load(cls, container_name: str) -> _LoadedIndex:
+        """Load the snapshot (or build the index) and replay the journals; container lock held."""
+        for _ in range(3):
+            index = cls._load_snapshot(container_name)
+            loaded = _LoadedIndex(index if index is not None else cls._rebuild(container_name))
+            if cls._catch_up(container_name, loaded):
+                cls._compact_if_needed(container_name, loaded)
+                return loaded
+        raise RuntimeError(f"The vector index journals of '{container_name}' kept changing while loading")
+
+    @classmethod
+    def _load_snapshot(cls, container_name: str) -> Optional[VectorIndex]:
+        """
+        Read the stored snapshot.
+
+        Returns:
+            The index, or None when there is no snapshot or it cannot be parsed; other
+            errors (throttling, timeouts, a missing container) are raised rather than
+            answered with a full rebuild
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        try:
+            data = AzureStorageService.download_data(container_name, cls.snapshot_blob_name())
+        except ResourceNotFoundError as e:
+            if e.error_code == "ContainerNotFound":
+                raise
+            logger.info(f"No vector index snapshot for '{container_name}', building from chunks")
+            return None
+        try:
+            index = VectorIndex.from_bytes(data)
+        except (ValueError, KeyError, OSError, EOFError, zipfile.BadZipFile) as e:
+            logger.warning(f"Corrupt vector index snapshot for '{container_name}', building from chunks: {str(e)}")
+            return None
+        logger.info(f"Loaded vector index snapshot for '{container_name}' ({len(index)} vectors)")
+        return index
+
+    @classmethod
+    def _rebuild(cls, container_name: str) -> VectorIndex:
+        """Build the index from the chunks and store it as the snapshot of the current journal."""
+        from app.services.azurestorageservice import AzureStorageService
+
+        journals = cls._journals(container_name)
+        if not journals:
+            AzureStorageService.create_append_blob(container_name, cls._journal_name(0))
+        index = cls._build_index(container_name)
+        # Writes made while building are in this journal or later ones and are replayed on top
+        index.journal = max(journals, default=0)
+        cls.save_snapshot(container_name, index)
+        return index
+
+    @classmethod
+    def build(cls, container_name: str, prefix: Optional[str] = None) -> VectorIndex:
+        """
+        Build an index from the chunks stored in a container.
+
+        A full build is persisted as the container's snapshot and registered; an
+        index of a prefix only is returned.
+
+        Args:
+            container_name: Data store container holding the chunks
+            prefix: Optional blob name prefix; the index is then neither saved nor registered
+
+        Returns:
+            The built VectorIndex
+        """
+        if prefix is not None:
+            return cls._build_index(container_name, prefix)
+        with cls._container_lock(container_name):
+            loaded = _LoadedIndex(cls._rebuild(container_name))
+            if not cls._catch_up(container_name, loaded):
+                loaded = cls._load(container_name)
+            with cls._lock:
+                cls._indexes[container_name] = loaded
+        return loaded.index
+
+    @classmethod
+    def _build_index(cls, container_name: str, prefix: Optional[str] = None) -> VectorIndex:
+        """
+        Index the chunks stored in a container.
+
+        Chunk segments are read in bulk, then the per-chunk JSON records are added,
+        replacing segment rows with the same ChunkId. A JSON record that is not newer
+        than the segment holding its id (i.e. was converted into it) is not read.
+        """
+        from app.services.azurestorageservice import AzureStorageService
+        from app.services.ChunkSegment import VECTOR_COLUMNS, ChunkSegmentStore
+
+        # Last-modified time of the segment each indexed chunk id came from
+        segment_modified = {}
+
+        def stored_chunks():
+            for blob in AzureStorageService.list_blobs(container_name, name_starts_with=prefix):
+                if not blob.name.endswith(".json"):
+                    continue
+                converted = segment_modified.get(blob.name[:-len(".json")])
+                if converted is not None and blob.last_modified <= converted:
+                    continue
+                try:
+                    yield Chunk(**json.loads(AzureStorageService.download_data(container_name, blob.name)))
+                except Exception:
+                    # Not every record in the container is a chunk
+                    continue
+
+        index = VectorIndex(dimensions=int(os.getenv("VECTOR_INDEX_DIMENSIONS", "1536")))
+        if prefix is None:
+            for blob in AzureStorageService.list_blobs(container_name, name_starts_with=ChunkSegmentStore.prefix()):
+                if not blob.name.endswith(".cseg"):
+                    continue
+                segment = ChunkSegmentStore.load_columns(container_name, blob.name, VECTOR_COLUMNS)
+                index.add_segment(segment)
+                segment_modified.update(dict.fromkeys(segment.ids(), blob.last_modified))
+        index.add_chunks(stored_chunks())
+        logger.info(f"Built vector index for '{container_name}' with {len(index)} chunks")
+        return index
+
+    @classmethod
+    def save_snapshot(cls, container_name: str, index: VectorIndex) -> None:
+        """Persist an index snapshot to the data store."""
+        from app.services.azurestorageservice import AzureStorageService
+
+        AzureStorageService.upload_data(container_name, cls.snapshot_blob_name(), io.BytesIO(index.to_bytes()))
+
+    @staticmethod
+    def _apply(index: VectorIndex, data: bytes) -> int:
+        """
+        Apply journal records to an index.
+
+        Returns:
+            Bytes consumed, up to the end of the last complete record
+        """
+        consumed = 0
+        for header, vectors, end in _decode_records(data):
+            if "delete" in header:
+                index.delete(header["delete"])
+            elif header["dimensions"] != index.dimensions:
+                logger.warning(f"Skipped {len(header['add'])} journaled vectors with {header['dimensions']} dimensions, the index has {index.dimensions}")
+            else:
+                index.add(header["add"], np.frombuffer(vectors, dtype=np.float32).reshape(len(header["add"]), index.dimensions))
+            consumed = end
+        return consumed
+
+    @classmethod
+    def _catch_up(cls, container_name: str, loaded: _LoadedIndex) -> bool:
+        """
+        Replay the journal records appended since the index was last brought up to date.
+
+        Returns:
+            False if a journal the index still needs was folded into a newer snapshot
+            and deleted, the index must then be loaded again
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        journals = cls._journals(container_name)
+        if loaded.journal not in journals:
+            return not any(number > loaded.journal for number in journals)
+        for number in sorted(number for number in journals if number >= loaded.journal):
+            if number != loaded.journal:
+                loaded.journal, loaded.offset = number, 0
+            if journals[number] <= loaded.offset:
+                continue
+            try:
+                data = AzureStorageService.download_range(container_name, cls._journal_name(number), loaded.offset,
+                                                          journals[number] - loaded.offset)
+            except ResourceNotFoundError:
+                return False
+            consumed = cls._apply(loaded.index, data)
+            loaded.offset += consumed
+            loaded.journal_bytes += consumed
+        loaded.refreshed_at = time.monotonic()
+        return True
+
+    @classmethod
+    def _refresh(cls, container_name: str, loaded: _LoadedIndex) -> None:
+        """Pick up other processes' journal records; searches keep using the index meanwhile."""
+        lock = cls._container_lock(container_name)
+        if not lock.acquire(blocking=False):
+            # Another thread is writing to or refreshing this index
+            return
+        try:
+            if cls._indexes.get(container_name) is not loaded:
+                return
+            if cls._catch_up(container_name, loaded):
+                cls._compact_if_needed(container_name, loaded)
+            else:
+                reloaded = cls._load(container_name)
+                with cls._lock:
+                    cls._indexes[container_name] = reloaded
+        except Exception as e:
+            loaded.refreshed_at = time.monotonic()
+            logger.warning(f"Failed to refresh the vector index of '{container_name}', serving it as loaded: {str(e)}")
+        finally:
+            lock.release()
+
+    @classmethod
+    def _append(cls, container_name: str, record: bytes, number: Optional[int]) -> Tuple[int, int]:
+        """
+        Append a record to the current journal.
+
+        Args:
+            number: Journal believed to be current, None to look it up
+
+        Returns:
+            Journal number and offset the record was written at
+        """
+        from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        number = number if number is not None else cls._journal_hints.get(container_name)
+        for _ in range(5):
+            if number is None:
+                journals = cls._journals(container_name)
+                if not journals:
+                    AzureStorageService.create_append_blob(container_name, cls._journal_name(0))
+                number = max(journals, default=0)
+            try:
+                offset, _ = AzureStorageService.append_block(container_name, cls._journal_name(number), record)
+                cls._journal_hints[container_name] = number
+                return number, offset
+            except ResourceNotFoundError:
+                pass
+            except HttpResponseError as e:
+                # Sealed: folded into a snapshot, the next journal exists already
+                if e.status_code != 409:
+                    raise
+            number = None
+        raise RuntimeError(f"Could not append to the vector index journal of '{container_name}'")
+
+    @classmethod
+    def update(cls, container_name: str, chunks: Iterable[Chunk] = (), removed: Iterable[str] = ()) -> None:
+        """
+        Record written and deleted chunks in the container's index journal.
+
+        An index loaded in this process applies the change right away; other
+        processes apply it on their next refresh and new loads replay it.
+
+        Args:
+            container_name: Data store container holding the chunks
+            chunks: Written chunks; those without an embedding are skipped
+            removed: Ids of deleted chunks
+        """
+        records = _encode_records([chunk for chunk in chunks if chunk.Vector_Embeddings], list(removed))
+        if not records:
+            return
+        with cls._container_lock(container_name):
+            loaded = cls._indexes.get(container_name)
+            for record in records:
+                number, offset = cls._append(container_name, record, loaded.journal if loaded is not None else None)
+                if loaded is None:
+                    continue
+                if (number, offset) == (loaded.journal, loaded.offset):
+                    # Nothing from other processes in between, apply without reading it back
+                    loaded.offset += cls._apply(loaded.index, record)
+                    loaded.journal_bytes += len(record)
+                elif not cls._catch_up(container_name, loaded):
+                    # Folded into a newer snapshot meanwhile, load that on next use
+                    with cls._lock:
+                        cls._indexes.pop(container_name, None)
+                    loaded = None
+            if loaded is not None:
+                cls._compact_if_needed(container_name, loaded)
+
+    @classmethod
+    def _compact_if_needed(cls, container_name: str, loaded: _LoadedIndex) -> None:
+        """Fold the journals into a new snapshot once they outgrow VECTOR_INDEX_JOURNAL_MAX_BYTES; container lock held."""
+        if loaded.journal_bytes <= cls.journal_max_bytes():
+            return
+        try:
+            cls._compact(container_name, loaded)
+        except Exception as e:
+            logger.warning(f"Failed to compact the vector index journals of '{container_name}': {str(e)}")
+
+    @classmethod
+    def _compact(cls, container_name: str, loaded: _LoadedIndex) -> None:
+        from azure.core.exceptions import ResourceNotFoundError
+        from app.services.azurestorageservice import AzureStorageService
+
+        # Writers move on to the next journal once the current one is sealed
+        AzureStorageService.create_append_blob(container_name, cls._journal_name(loaded.journal + 1))
+        AzureStorageService.seal_append_blob(container_name, cls._journal_name(loaded.journal))
+        if not cls._catch_up(container_name, loaded):
+            # Another process compacted first
+            return
+        loaded.index.journal = loaded.journal
+        cls.save_snapshot(container_name, loaded.index)
+        loaded.journal_bytes = loaded.offset
+        for number in cls._journals(container_name):
+            if number < loaded.journal:
+                try:
+                    AzureStorageService.delete_blob(container_name, cls._journal_name(number))
+                except ResourceNotFoundError:
+                    pass
+        logger.info(f"Folded the vector index journals of '{container_name}' into a new snapshot ({len(loaded.index)} vectors)")
@@ -1,13 +1,109 @@
+import asyncio
 import os
-from typing import Optional, BinaryIO
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
-from app.services.DataStoreManager import DataStoreManager
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, BinaryIO, Sequence, Tuple, TypeVar, Union
+from app.services.BlobCache import BlobCache, FetchResult
+from app.services.BlobManifest import BlobManifest
+from app.services.DataStoreManager import DataStoreManager, download_options
+
+if TYPE_CHECKING:
+    from azure.storage.blob import BlobClient
+
+T = TypeVar("T")
+
+# Service limit on sub-requests in one blob batch
+_DELETE_BATCH_SIZE = 256
+
+# Service limit on the data of one append block
+_APPEND_BLOCK_SIZE = 4 * 1024 * 1024
 
 class AzureStorageService:
     """Service for interacting with Azure Blob Storage."""
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    @staticmethod
+    def max_concurrency() -> int:
+        return int(os.getenv("STORAGE_MAX_CONCURRENCY", "16"))
+
+    @staticmethod
+    def download_concurrency() -> int:
+        """Parallel range requests used for a single large download."""
+        return int(os.getenv("STORAGE_DOWNLOAD_CONCURRENCY", "4"))
+
+    @staticmethod
+    def list_page_size() -> int:
+        """Default number of names per listing page (the service returns at most 5000)."""
+        return min(int(os.getenv("STORAGE_LIST_PAGE_SIZE", "1000")), 5000)
+
+    @classmethod
+    def _map(cls, fn: Callable[[str], T], names: Sequence[str]) -> Dict[str, Union[T, Exception]]:
+        """
+        Run a blocking blob call per name on the shared I/O pool.
+
+        The pool has STORAGE_MAX_CONCURRENCY threads, which bounds the blob requests
+        in flight across all bulk calls of the process.
+
+        Returns:
+            Result or raised exception per name
+        """
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=cls.max_concurrency(), thread_name_prefix="blob-io")
+
+        def call(name: str) -> Union[T, Exception]:
+            try:
+                return fn(name)
+            except Exception as e:
+                return e
+
+        return dict(zip(names, cls._executor.map(call, names)))
+
+    @staticmethod
+    def _invalidate(container_name: str, blob_names: Sequence[str]) -> None:
+        """Drop written or deleted blobs from the read-through cache, if enabled."""
+        cache = BlobCache.get_instance()
+        if cache is not None:
+            for blob_name in blob_names:
+                cache.invalidate(container_name, blob_name)
+
+    @staticmethod
+    def _record(container_name: str, added: Sequence[str] = (), removed: Sequence[str] = ()) -> None:
+        """Record created or deleted blobs in the prefix manifests covering them."""
+        BlobManifest.record(container_name, added, removed)
+
+    @staticmethod
+    def _download(container_client, container_name: str, blob_name: str, max_concurrency: int) -> bytes:
+        """Download a whole blob, through the read-through cache when BLOB_CACHE_ENABLED is set."""
+        blob_client = container_client.get_blob_client(blob_name)
+        cache = BlobCache.get_instance()
+        if cache is None:
+            return blob_client.download_blob(max_concurrency=max_concurrency).readall()
+
+        def fetch(etag: Optional[str]) -> FetchResult:
+            from azure.core import MatchConditions
+            from azure.core.exceptions import HttpResponseError
+
+            try:
+                if etag is None:
+                    downloader = blob_client.download_blob(max_concurrency=max_concurrency)
+                else:
+                    downloader = blob_client.download_blob(
+                        max_concurrency=max_concurrency, etag=etag, match_condition=MatchConditions.IfModified
+                    )
+            except HttpResponseError as e:
+                # The storage SDK surfaces 304 Not Modified as a generic response error
+                if e.status_code == 304:
+                    return None
+                raise
+            return downloader.readall(), downloader.properties.etag
+
+        return cache.read_through(container_name, blob_name, fetch)
     
     @staticmethod
-    def upload_file(container_name: str, blob_name: str, file_path: str) -> BlobClient:
+    def upload_file(container_name: str, blob_name: str, file_path: str) -> "BlobClient":
         """
         Upload a file to an Azure Storage container.
         
@@ -25,11 +121,13 @@ class AzureStorageService:
         
         with open(file_path, "rb") as data:
             blob_client.upload_blob(data, overwrite=True)
+        AzureStorageService._invalidate(container_name, [blob_name])
+        AzureStorageService._record(container_name, [blob_name])
             
         return blob_client
     
     @staticmethod
-    def upload_data(container_name: str, blob_name: str, data: BinaryIO) -> BlobClient:
+    def upload_data(container_name: str, blob_name: str, data: BinaryIO) -> "BlobClient":
         """
         Upload binary data to an Azure Storage container.
         
@@ -46,25 +144,252 @@ class AzureStorageService:
         blob_client = container_client.get_blob_client(blob_name)
         
         blob_client.upload_blob(data, overwrite=True)
+        AzureStorageService._invalidate(container_name, [blob_name])
+        AzureStorageService._record(container_name, [blob_name])
         return blob_client
     
     @staticmethod
-    def download_data(container_name: str, blob_name: str) -> bytes:
+    def append_data(container_name: str, blob_name: str, data: bytes, overwrite: bool = False) -> None:
+        """
+        Append bytes to an append blob, creating the blob on first use.
+
+        Each call is a single append request per 4 MiB of data as long as the blob
+        exists, so small records can be added without rewriting what is already stored.
+
+        Args:
+            container_name: Name of the target container
+            blob_name: Name of the append blob
+            data: Bytes to append
+            overwrite: Replace the blob with a new append blob holding only data
+        """
+        from azure.core import MatchConditions
+        from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+        from azure.storage.blob import BlobType
+
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        blob_client = container_client.get_blob_client(blob_name)
+        created = overwrite
+        if overwrite:
+            blob_client.upload_blob(data, blob_type=BlobType.APPENDBLOB, overwrite=True)
+        elif data:
+            blocks = [data[offset:offset + _APPEND_BLOCK_SIZE] for offset in range(0, len(data), _APPEND_BLOCK_SIZE)]
+            try:
+                blob_client.append_block(blocks[0])
+            except ResourceNotFoundError:
+                try:
+                    blob_client.create_append_blob(match_condition=MatchConditions.IfMissing)
+                    created = True
+                except HttpResponseError as e:
+                    # Another writer created it first
+                    if e.status_code not in (409, 412):
+                        raise
+                blob_client.append_block(blocks[0])
+            for block in blocks[1:]:
+                blob_client.append_block(block)
+        AzureStorageService._invalidate(container_name, [blob_name])
+        if created:
+            AzureStorageService._record(container_name, [blob_name])
+
+    @staticmethod
+    def create_append_blob(container_name: str, blob_name: str) -> bool:
+        """
+        Create an empty append blob unless the blob exists.
+
+        Returns:
+            True if it was created, False if it existed already
+        """
+        from azure.core import MatchConditions
+        from azure.core.exceptions import HttpResponseError
+
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        try:
+            container_client.get_blob_client(blob_name).create_append_blob(match_condition=MatchConditions.IfMissing)
+        except HttpResponseError as e:
+            if e.status_code not in (409, 412):
+                raise
+            return False
+        AzureStorageService._record(container_name, [blob_name])
+        return True
+
+    @staticmethod
+    def append_block(container_name: str, blob_name: str, data: bytes, append_position: Optional[int] = None,
+                     etag: Optional[str] = None) -> Tuple[int, str]:
+        """
+        Append one block of at most 4 MiB to an existing append blob.
+
+        Unlike append_data, a missing blob is not created, so writers of a blob that
+        was retired (deleted or sealed) find out instead of reviving it.
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the append blob
+            data: Bytes to append
+            append_position: Only append if the blob is exactly this long
+            etag: Only append if the blob still has this ETag
+
+        Returns:
+            Offset in the blob at which the block was written, and the new ETag
+
+        Raises:
+            ResourceNotFoundError: If the blob does not exist
+            HttpResponseError: 409 if the blob is sealed, 412 if a condition does not hold
+        """
+        from azure.core import MatchConditions
+
+        conditions = {"etag": etag, "match_condition": MatchConditions.IfNotModified} if etag else {}
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        result = container_client.get_blob_client(blob_name).append_block(data, appendpos_condition=append_position, **conditions)
+        AzureStorageService._invalidate(container_name, [blob_name])
+        return int(result["blob_append_offset"]), result["etag"]
+
+    @staticmethod
+    def upload_append_blob(container_name: str, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        """
+        Replace a blob with a new append blob holding data, unless someone else changed it.
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the blob
+            data: Initial content
+            etag: Only replace the blob if it still has this ETag; None to only create it if it does not exist
+
+        Returns:
+            ETag of the new blob
+
+        Raises:
+            HttpResponseError: 409 if the blob exists (etag None), 412 if its ETag changed
+        """
+        from azure.core import MatchConditions
+        from azure.storage.blob import BlobType
+
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        blob_client = container_client.get_blob_client(blob_name)
+        if etag:
+            result = blob_client.upload_blob(data, blob_type=BlobType.APPENDBLOB, overwrite=True,
+                                             etag=etag, match_condition=MatchConditions.IfNotModified)
+        else:
+            result = blob_client.upload_blob(data, blob_type=BlobType.APPENDBLOB, overwrite=False)
+        AzureStorageService._invalidate(container_name, [blob_name])
+        if not etag:
+            AzureStorageService._record(container_name, [blob_name])
+        return result["etag"]
+
+    @staticmethod
+    def seal_append_blob(container_name: str, blob_name: str) -> None:
+        """Make an append blob read-only; later appends fail with 409."""
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        container_client.get_blob_client(blob_name).seal_append_blob()
+
+    @staticmethod
+    def download_data(container_name: str, blob_name: str, max_concurrency: Optional[int] = None) -> bytes:
         """
         Download a blob as binary data.
         
         Args:
             container_name: Name of the container
             blob_name: Name of the blob to download
+            max_concurrency: Parallel range requests for large blobs, defaults to STORAGE_DOWNLOAD_CONCURRENCY
             
         Returns:
             The blob content as bytes
         """
         manager = DataStoreManager.get_instance()
         container_client = manager.get_container_client(container_name)
-        blob_client = container_client.get_blob_client(blob_name)
         
-        return blob_client.download_blob().readall()
+        return AzureStorageService._download(
+            container_client, container_name, blob_name, max_concurrency or AzureStorageService.download_concurrency()
+        )
+
+    @staticmethod
+    def download_with_etag(container_name: str, blob_name: str) -> Tuple[bytes, str]:
+        """
+        Download a whole blob and the ETag of the content read, bypassing the read-through cache.
+
+        Returns:
+            The blob content and its ETag
+        """
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        downloader = container_client.get_blob_client(blob_name).download_blob(
+            max_concurrency=AzureStorageService.download_concurrency()
+        )
+        return downloader.readall(), downloader.properties.etag
+
+    @staticmethod
+    def get_etag(container_name: str, blob_name: str) -> Optional[str]:
+        """ETag of a blob with a single properties request, None if it does not exist."""
+        from azure.core.exceptions import ResourceNotFoundError
+
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        try:
+            return container_client.get_blob_client(blob_name).get_blob_properties().etag
+        except ResourceNotFoundError:
+            return None
+
+    @staticmethod
+    def stream_blob(container_name: str, blob_name: str) -> Iterator[bytes]:
+        """
+        Stream a blob in chunks of at most STORAGE_DOWNLOAD_CHUNK_SIZE bytes.
+
+        Only one chunk is held in memory at a time.
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the blob to read
+
+        Returns:
+            Iterator over the blob content
+        """
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        return container_client.get_blob_client(blob_name).download_blob().chunks()
+
+    @staticmethod
+    def download_range(container_name: str, blob_name: str, offset: int, length: Optional[int] = None) -> bytes:
+        """
+        Read a byte range of a blob.
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the blob to read
+            offset: First byte to read
+            length: Number of bytes, to the end of the blob when None
+
+        Returns:
+            The requested bytes
+        """
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        return container_client.get_blob_client(blob_name).download_blob(offset=offset, length=length).readall()
+
+    @staticmethod
+    def download_to_file(container_name: str, blob_name: str, file_path: str, max_concurrency: Optional[int] = None) -> int:
+        """
+        Download a blob straight to a local file using parallel range requests.
+
+        The content is written to a temporary file next to file_path and moved into
+        place when complete, so readers never see a partial file.
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the blob to download
+            file_path: Destination path
+            max_concurrency: Parallel range requests, defaults to STORAGE_DOWNLOAD_CONCURRENCY
+
+        Returns:
+            Number of bytes written
+        """
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        downloader = container_client.get_blob_client(blob_name).download_blob(
+            max_concurrency=max_concurrency or AzureStorageService.download_concurrency()
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            with open(temp_path, "wb") as f:
+                written = downloader.readinto(f)
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return written
     
     @staticmethod
     def list_blobs(container_name: str, name_starts_with: Optional[str] = None):
@@ -81,6 +406,34 @@ class AzureStorageService:
         manager = DataStoreManager.get_instance()
         container_client = manager.get_container_client(container_name)
         return container_client.list_blobs(name_starts_with=name_starts_with)
+
+    @staticmethod
+    def list_page(container_name: str, name_starts_with: Optional[str] = None, page_size: Optional[int] = None,
+                  continuation_token: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        """
+        List one page of blob names.
+
+        Args:
+            container_name: Name of the container
+            name_starts_with: Optional prefix filter
+            page_size: Maximum names to return, defaults to STORAGE_LIST_PAGE_SIZE
+            continuation_token: Token returned with the previous page
+
+        Returns:
+            Tuple of the blob names and the token for the next page (None on the last page)
+        """
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        pages = container_client.list_blob_names(
+            name_starts_with=name_starts_with, results_per_page=page_size or AzureStorageService.list_page_size()
+        ).by_page(continuation_token=continuation_token)
+        names = list(next(pages, []))
+        return names, pages.continuation_token or None
+
+    @staticmethod
+    def blob_exists(container_name: str, blob_name: str) -> bool:
+        """Check whether a blob exists with a single properties request."""
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        return container_client.get_blob_client(blob_name).exists()
     
     @staticmethod
     def delete_blob(container_name: str, blob_name: str) -> None:
@@ -96,3 +449,366 @@ class AzureStorageService:
         blob_client = container_client.get_blob_client(blob_name)
         
         blob_client.delete_blob()
+        AzureStorageService._invalidate(container_name, [blob_name])
+        AzureStorageService._record(container_name, removed=[blob_name])
+
+    @staticmethod
+    def upload_many(container_name: str, items: Dict[str, bytes]) -> Dict[str, Optional[Exception]]:
+        """
+        Upload several blobs concurrently.
+
+        Args:
+            container_name: Name of the target container
+            items: Blob name to content
+
+        Returns:
+            None per successfully uploaded blob, the exception for failed ones
+        """
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+
+        def upload(blob_name: str) -> None:
+            container_client.get_blob_client(blob_name).upload_blob(items[blob_name], overwrite=True)
+
+        results = AzureStorageService._map(upload, list(items))
+        AzureStorageService._invalidate(container_name, list(items))
+        AzureStorageService._record(container_name, [blob_name for blob_name, error in results.items() if error is None])
+        return results
+
+    @staticmethod
+    def download_many(container_name: str, blob_names: Sequence[str]) -> Dict[str, Union[bytes, Exception]]:
+        """
+        Download several blobs concurrently.
+
+        Args:
+            container_name: Name of the container
+            blob_names: Names of the blobs to download
+
+        Returns:
+            Content per blob, or the exception for blobs that failed
+        """
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        return AzureStorageService._map(
+            lambda blob_name: AzureStorageService._download(container_client, container_name, blob_name, 1), list(blob_names)
+        )
+
+    @staticmethod
+    def delete_many(container_name: str, blob_names: Sequence[str]) -> Dict[str, Optional[Exception]]:
+        """
+        Delete several blobs using batch requests of up to 256 deletes.
+
+        Batches run concurrently. If the account does not accept batch requests,
+        the blobs of that batch are deleted one by one instead.
+
+        Args:
+            container_name: Name of the container
+            blob_names: Names of the blobs to delete
+
+        Returns:
+            None per deleted blob, the exception for blobs that failed
+        """
+        container_client = DataStoreManager.get_instance().get_container_client(container_name)
+        names = list(dict.fromkeys(blob_names))
+        batches = {str(i): names[i:i + _DELETE_BATCH_SIZE] for i in range(0, len(names), _DELETE_BATCH_SIZE)}
+
+        def delete_batch(key: str) -> Dict[str, Optional[Exception]]:
+            batch = batches[key]
+            try:
+                responses = list(container_client.delete_blobs(*batch, raise_on_any_failure=False))
+            except Exception:
+                return AzureStorageService._delete_each(container_client, batch)
+            return {
+                blob_name: None if response.status_code in (200, 202)
+                else RuntimeError(f"Delete failed with status {response.status_code}: {response.reason}")
+                for blob_name, response in zip(batch, responses)
+            }
+
+        results: Dict[str, Optional[Exception]] = {}
+        for key, outcome in AzureStorageService._map(delete_batch, list(batches)).items():
+            if isinstance(outcome, Exception):
+                results.update({blob_name: outcome for blob_name in batches[key]})
+            else:
+                results.update(outcome)
+        AzureStorageService._invalidate(container_name, names)
+        AzureStorageService._record(container_name, removed=[blob_name for blob_name, error in results.items() if error is None])
+        return results
+
+    @staticmethod
+    def _delete_each(container_client, blob_names: List[str]) -> Dict[str, Optional[Exception]]:
+        """Delete blobs individually; runs inside a pool worker, so the deletes are sequential."""
+        results: Dict[str, Optional[Exception]] = {}
+        for blob_name in blob_names:
+            try:
+                container_client.get_blob_client(blob_name).delete_blob()
+                results[blob_name] = None
+            except Exception as e:
+                results[blob_name] = e
+        return results
+
+
+class AsyncAzureStorageService:
+    """Non-blocking counterpart of AzureStorageService, backed by AsyncDataStoreManager."""
+
+    @staticmethod
+    def _container_client(container_name: str):
+        from app.services.DataStoreManager import AsyncDataStoreManager
+
+        return AsyncDataStoreManager.get_instance().get_container_client(container_name)
+
+    @staticmethod
+    async def _gather(fn: Callable[[str], Awaitable[T]], names: Sequence[str]) -> Dict[str, Union[T, Exception]]:
+        """Run an async blob call per name, at most STORAGE_MAX_CONCURRENCY at a time."""
+        semaphore = asyncio.Semaphore(AzureStorageService.max_concurrency())
+
+        async def call(name: str) -> Union[T, Exception]:
+            async with semaphore:
+                try:
+                    return await fn(name)
+                except Exception as e:
+                    return e
+
+        return dict(zip(names, await asyncio.gather(*(call(name) for name in names))))
+
+    @staticmethod
+    async def _cache_call(cache: BlobCache, fn: Callable[..., T], *args) -> T:
+        """Run a read-through cache call, in a worker thread when the disk tier (SQLite and file I/O) is enabled."""
+        if cache.disk is None:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    @staticmethod
+    async def _invalidate(container_name: str, blob_names: Sequence[str]) -> None:
+        """Drop written or deleted blobs from the read-through cache without blocking the event loop."""
+        cache = BlobCache.get_instance()
+        if cache is not None:
+            await AsyncAzureStorageService._cache_call(cache, AzureStorageService._invalidate, container_name, blob_names)
+
+    @staticmethod
+    async def _record(container_name: str, added: Sequence[str] = (), removed: Sequence[str] = ()) -> None:
+        """Record created or deleted blobs in the covering prefix manifests on a worker thread."""
+        if added or removed:
+            await asyncio.to_thread(BlobManifest.record, container_name, added, removed)
+
+    @staticmethod
+    async def upload_data(container_name: str, blob_name: str, data: Union[bytes, BinaryIO]) -> None:
+        """
+        Upload binary data to an Azure Storage container.
+
+        Args:
+            container_name: Name of the target container
+            blob_name: Name to assign to the blob in storage
+            data: Binary data to upload
+        """
+        container_client = AsyncAzureStorageService._container_client(container_name)
+        await container_client.get_blob_client(blob_name).upload_blob(data, overwrite=True)
+        await AsyncAzureStorageService._invalidate(container_name, [blob_name])
+        await AsyncAzureStorageService._record(container_name, [blob_name])
+
+    @staticmethod
+    async def download_data(container_name: str, blob_name: str) -> bytes:
+        """
+        Download a blob as binary data.
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the blob to download
+
+        Returns:
+            The blob content as bytes
+        """
+        blob_client = AsyncAzureStorageService._container_client(container_name).get_blob_client(blob_name)
+        max_concurrency = AzureStorageService.download_concurrency()
+        cache = BlobCache.get_instance()
+        if cache is None:
+            downloader = await blob_client.download_blob(max_concurrency=max_concurrency)
+            return await downloader.readall()
+
+        async def fetch(etag: Optional[str]) -> FetchResult:
+            from azure.core import MatchConditions
+            from azure.core.exceptions import HttpResponseError
+
+            try:
+                if etag is None:
+                    downloader = await blob_client.download_blob(max_concurrency=max_concurrency)
+                else:
+                    downloader = await blob_client.download_blob(
+                        max_concurrency=max_concurrency, etag=etag, match_condition=MatchConditions.IfModified
+                    )
+            except HttpResponseError as e:
+                # The storage SDK surfaces 304 Not Modified as a generic response error
+                if e.status_code == 304:
+                    return None
+                raise
+            return await downloader.readall(), downloader.properties.etag
+
+        call = AsyncAzureStorageService._cache_call
+        data, etag = await call(cache, cache.lookup, container_name, blob_name)
+        if data is not None:
+            return data
+        try:
+            return await call(cache, cache.complete, container_name, blob_name, await fetch(etag))
+        except LookupError:
+            # Evicted between revalidation and read, fetch unconditionally
+            return await call(cache, cache.complete, container_name, blob_name, await fetch(None))
+
+    @staticmethod
+    async def stream_blob(container_name: str, blob_name: str) -> AsyncIterator[bytes]:
+        """Stream a blob in chunks, see AzureStorageService.stream_blob."""
+        container_client = AsyncAzureStorageService._container_client(container_name)
+        downloader = await container_client.get_blob_client(blob_name).download_blob()
+        async for chunk in downloader.chunks():
+            yield chunk
+
+    @staticmethod
+    async def download_range(container_name: str, blob_name: str, offset: int, length: Optional[int] = None) -> bytes:
+        """Read a byte range of a blob, see AzureStorageService.download_range."""
+        container_client = AsyncAzureStorageService._container_client(container_name)
+        downloader = await container_client.get_blob_client(blob_name).download_blob(offset=offset, length=length)
+        return await downloader.readall()
+
+    @staticmethod
+    async def download_to_file(container_name: str, blob_name: str, file_path: str, max_concurrency: Optional[int] = None) -> int:
+        """
+        Download a blob to a local file with parallel range requests, see AzureStorageService.download_to_file.
+
+        Ranges of STORAGE_DOWNLOAD_CHUNK_SIZE are fetched concurrently, pinned to the
+        ETag of the first one, and written at their offsets on worker threads, so
+        the event loop never waits on disk I/O.
+        """
+        from azure.core import MatchConditions
+        from azure.core.exceptions import HttpResponseError
+
+        blob_client = AsyncAzureStorageService._container_client(container_name).get_blob_client(blob_name)
+        chunk_size = download_options()["max_chunk_get_size"]
+        try:
+            first = await blob_client.download_blob(offset=0, length=chunk_size)
+        except HttpResponseError as e:
+            # 416: a ranged read of an empty blob
+            if e.status_code != 416:
+                raise
+            first = await blob_client.download_blob()
+        size, etag = first.properties.size, first.properties.etag
+        semaphore = asyncio.Semaphore(max_concurrency or AzureStorageService.download_concurrency())
+        write_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.{id(first)}.part"
+        f = await asyncio.to_thread(open, temp_path, "wb")
+
+        def write_at(offset: int, data: bytes) -> None:
+            with write_lock:
+                f.seek(offset)
+                f.write(data)
+
+        async def fetch(offset: int) -> None:
+            async with semaphore:
+                downloader = await blob_client.download_blob(
+                    offset=offset, length=min(chunk_size, size - offset), etag=etag, match_condition=MatchConditions.IfNotModified
+                )
+                data = await downloader.readall()
+            await asyncio.to_thread(write_at, offset, data)
+
+        try:
+            try:
+                await asyncio.to_thread(write_at, 0, await first.readall())
+                await asyncio.gather(*(fetch(offset) for offset in range(chunk_size, size, chunk_size)))
+            finally:
+                await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return size
+
+    @staticmethod
+    def list_blobs(container_name: str, name_starts_with: Optional[str] = None) -> AsyncIterator:
+        """
+        List all blobs in a container, optionally filtered by prefix.
+
+        Args:
+            container_name: Name of the container
+            name_starts_with: Optional prefix filter
+
+        Returns:
+            Async iterator yielding blob items
+        """
+        container_client = AsyncAzureStorageService._container_client(container_name)
+        return container_client.list_blobs(name_starts_with=name_starts_with)
+
+    @staticmethod
+    async def list_page(container_name: str, name_starts_with: Optional[str] = None, page_size: Optional[int] = None,
+                        continuation_token: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        """List one page of blob names, see AzureStorageService.list_page."""
+        container_client = AsyncAzureStorageService._container_client(container_name)
+        pages = container_client.list_blob_names(
+            name_starts_with=name_starts_with, results_per_page=page_size or AzureStorageService.list_page_size()
+        ).by_page(continuation_token=continuation_token)
+        names = []
+        async for page in pages:
+            names = [name async for name in page]
+            break
+        return names, pages.continuation_token or None
+
+    @staticmethod
+    async def blob_exists(container_name: str, blob_name: str) -> bool:
+        """Check whether a blob exists, see AzureStorageService.blob_exists."""
+        container_client = AsyncAzureStorageService._container_client(container_name)
+        return await container_client.get_blob_client(blob_name).exists()
+
+    @staticmethod
+    async def delete_blob(container_name: str, blob_name: str) -> None:
+        """
+        Delete a blob.
+
+        Args:
+            container_name: Name of the container
+            blob_name: Name of the blob to delete
+        """
+        container_client = AsyncAzureStorageService._container_client(container_name)
+        await container_client.get_blob_client(blob_name).delete_blob()
+        await AsyncAzureStorageService._invalidate(container_name, [blob_name])
+        await AsyncAzureStorageService._record(container_name, removed=[blob_name])
+
+    @staticmethod
+    async def upload_many(container_name: str, items: Dict[str, bytes]) -> Dict[str, Optional[Exception]]:
+        """Upload several blobs concurrently, see AzureStorageService.upload_many."""
+        return await AsyncAzureStorageService._gather(
+            lambda blob_name: AsyncAzureStorageService.upload_data(container_name, blob_name, items[blob_name]), list(items)
+        )
+
+    @staticmethod
+    async def download_many(container_name: str, blob_names: Sequence[str]) -> Dict[str, Union[bytes, Exception]]:
+        """Download several blobs concurrently, see AzureStorageService.download_many."""
+        return await AsyncAzureStorageService._gather(
+            lambda blob_name: AsyncAzureStorageService.download_data(container_name, blob_name), list(blob_names)
+        )
+
+    @staticmethod
+    async def delete_many(container_name: str, blob_names: Sequence[str]) -> Dict[str, Optional[Exception]]:
+        """Delete several blobs with batch requests, see AzureStorageService.delete_many."""
+        container_client = AsyncAzureStorageService._container_client(container_name)
+        names = list(dict.fromkeys(blob_names))
+        batches = {str(i): names[i:i + _DELETE_BATCH_SIZE] for i in range(0, len(names), _DELETE_BATCH_SIZE)}
+
+        async def delete_batch(key: str) -> Dict[str, Optional[Exception]]:
+            batch = batches[key]
+            try:
+                responses = [response async for response in await container_client.delete_blobs(*batch, raise_on_any_failure=False)]
+            except Exception:
+                return await AsyncAzureStorageService._gather(
+                    lambda blob_name: AsyncAzureStorageService.delete_blob(container_name, blob_name), batch
+                )
+            return {
+                blob_name: None if response.status_code in (200, 202)
+                else RuntimeError(f"Delete failed with status {response.status_code}: {response.reason}")
+                for blob_name, response in zip(batch, responses)
+            }
+
+        results: Dict[str, Optional[Exception]] = {}
+        for key, outcome in (await AsyncAzureStorageService._gather(delete_batch, list(batches))).items():
+            if isinstance(outcome, Exception):
+                results.update({blob_name: outcome for blob_name in batches[key]})
+            else:
+                results.update(outcome)
+        await AsyncAzureStorageService._invalidate(container_name, names)
+        await AsyncAzureStorageService._record(container_name, removed=[blob_name for blob_name, error in results.items() if error is None])
+        return results
@@ -1,14 +1,19 @@
-from typing import Dict, Any, List, Union, Type
+from typing import Dict, Any, List, Optional, Union, Type
 from langchain.tools import BaseTool
+import asyncio
 import json
 from dotenv import load_dotenv
-from app.services.azurestorageservice import AzureStorageService
-from app.models.DataStoreModel import DataStoreInput
+from app.services.azurestorageservice import AsyncAzureStorageService, AzureStorageService
+from app.services.BlobManifest import BlobManifest
+from app.models.DataStoreModel import Chunk, DataStoreInput
+from app.services.LoggerService import LoggerService
 from langchain_core.tools import Tool, StructuredTool
 
 # Load environment variables
 load_dotenv()
 
+logger = LoggerService.get_logger(__name__)
+
 class DataStoreTools(BaseTool):
     """Tool for storing and retrieving data from Azure Blob Storage."""
     name: str = "data_store_tool"
@@ -16,14 +21,48 @@ class DataStoreTools(BaseTool):
                 - Only triggered by other tools to handle data the below actions:
                     - For 'store' action: Provide container_name, data_id, and data
                     - For 'retrieve' action: Provide container_name and data_id
-                    - For 'list' action: Provide container_name and optional prefix
-                    - For 'delete' action: Provide container_name and data_id"""
+                    - For 'list' action: Provide container_name, optional prefix, page_size and continuation_token
+                    - For 'delete' action: Provide container_name and data_id
+                    - For 'exists' action: Provide container_name and data_id
+                    - For 'store_many' action: Provide container_name and items (data_id -> data)
+                    - For 'retrieve_many' action: Provide container_name and data_ids
+                    - For 'delete_many' action: Provide container_name and data_ids
+                    - For 'build_manifest' action: Provide container_name and optional prefix
+                - List returns one page of data_ids; pass its continuation_token back to get the next page
+                - Bulk actions report a result per data_id and do not fail the whole batch"""
     args_schema: Type[DataStoreInput] = DataStoreInput
     
     def __init__(self):
         """Initialize the DataStoreTool with Azure Storage connection."""
         super().__init__()
     
+    @staticmethod
+    def _embedded_chunks(records: List[Dict[str, Any]]) -> List[Chunk]:
+        """The stored records that are chunks with an embedding."""
+        chunks = []
+        for data in records:
+            try:
+                chunk = Chunk(**data)
+            except Exception:
+                # Not every record is a chunk
+                continue
+            if chunk.Vector_Embeddings:
+                chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def _update_index(container_name: str, chunks: List[Chunk] = (), removed: List[str] = ()) -> None:
+        """Apply stored and deleted chunks to the container's vector index; the write itself has succeeded either way."""
+        if not chunks and not removed:
+            return
+        # Imported here so that the data store tool does not load numpy
+        from app.services.VectorIndex import VectorIndexRegistry
+
+        try:
+            VectorIndexRegistry.update(container_name, chunks, removed)
+        except Exception as e:
+            logger.warning(f"Failed to update the vector index of '{container_name}': {str(e)}")
+
     def _store_data(self, dataStoreInput: DataStoreInput) -> Dict[str, str]:
         """Store data in Azure Blob Storage."""
         if not dataStoreInput.data_id:
@@ -37,6 +76,7 @@ class DataStoreTools(BaseTool):
 
         blob_name = f"{dataStoreInput.data_id}.json"
         AzureStorageService.upload_data(dataStoreInput.container_name, blob_name, data_stream)
+        self._update_index(dataStoreInput.container_name, self._embedded_chunks([dataStoreInput.data]))
 
         return {"status": "success", "message": f"Data stored with ID: {dataStoreInput.data_id}"}
 
@@ -52,14 +92,54 @@ class DataStoreTools(BaseTool):
         except Exception as e:
             return {"status": "error", "message": f"Failed to retrieve data: {str(e)}"}
 
-    def _list_data(self, dataStoreInput: DataStoreInput) -> Union[List[str], Dict[str, str]]:
-        """List data in Azure Blob Storage."""
+    @staticmethod
+    def _page_size(dataStoreInput: DataStoreInput) -> int:
+        return max(1, min(dataStoreInput.page_size or AzureStorageService.list_page_size(), 5000))
+
+    @staticmethod
+    def _listed(names: List[str], continuation_token: Optional[str], source: str) -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "data_ids": [name.replace('.json', '') for name in names],
+            "continuation_token": continuation_token,
+            "source": source
+        }
+
+    def _list_data(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """List one page of data in Azure Blob Storage, from the prefix manifest when there is one."""
+        container_name, prefix = dataStoreInput.container_name, dataStoreInput.prefix or ""
+        page_size, token = self._page_size(dataStoreInput), dataStoreInput.continuation_token
         try:
-            blobs = AzureStorageService.list_blobs(dataStoreInput.container_name, name_starts_with=dataStoreInput.prefix)
-            return [blob.name.replace('.json', '') for blob in blobs]
+            page = BlobManifest.list_page(container_name, prefix, page_size, token)
+            if page is not None:
+                return self._listed(*page, "manifest")
+            return self._listed(*AzureStorageService.list_page(container_name, prefix or None, page_size, token), "listing")
         except Exception as e:
             return {"status": "error", "message": f"Failed to list data: {str(e)}"}
 
+    def _exists_data(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """Check whether data exists, from the prefix manifest when there is one."""
+        if not dataStoreInput.data_id:
+            raise ValueError("data_id is required for exists operation")
+
+        blob_name = f"{dataStoreInput.data_id}.json"
+        try:
+            exists, source = BlobManifest.contains(dataStoreInput.container_name, blob_name), "manifest"
+            if exists is None:
+                exists, source = AzureStorageService.blob_exists(dataStoreInput.container_name, blob_name), "storage"
+            return {"status": "success", "data_id": dataStoreInput.data_id, "exists": exists, "source": source}
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to check data: {str(e)}"}
+
+    def _build_manifest(self, dataStoreInput: DataStoreInput) -> Dict[str, str]:
+        """Create or refresh the manifest of a prefix from a full listing."""
+        prefix = dataStoreInput.prefix or ""
+        try:
+            count = BlobManifest.build(dataStoreInput.container_name, prefix)
+            return {"status": "success", "message": f"Manifest for prefix '{prefix}' built with {count} entries"}
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to build manifest: {str(e)}"}
+
     def _delete_data(self, dataStoreInput: DataStoreInput) -> Dict[str, str]:
         """Delete data from Azure Blob Storage."""
         if not dataStoreInput.data_id:
@@ -68,20 +148,204 @@ class DataStoreTools(BaseTool):
         blob_name = f"{dataStoreInput.data_id}.json"
         try:
             AzureStorageService.delete_blob(dataStoreInput.container_name, blob_name)
+            self._update_index(dataStoreInput.container_name, removed=[dataStoreInput.data_id])
             return {"status": "success", "message": f"Data with ID {dataStoreInput.data_id} deleted"}
         except Exception as e:
             return {"status": "error", "message": f"Failed to delete data: {str(e)}"}
 
-    def _run(self, operation: str, container_name: str, data_id: str = "", data: Dict[str, Any] = None, prefix: str = "") -> Union[Dict[str, Any], List[str], str]:
+    @staticmethod
+    def _bulk_response(results: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize per-item results: success, partial or error."""
+        failed = sum(1 for result in results.values() if isinstance(result, dict) and result.get("status") == "error")
+        status = "success" if not failed else "error" if failed == len(results) else "partial"
+        return {"status": status, "failed": failed, "results": results}
+
+    @staticmethod
+    def _blob_items(dataStoreInput: DataStoreInput) -> Dict[str, bytes]:
+        if not dataStoreInput.items:
+            raise ValueError("items is required for store_many operation")
+        return {f"{data_id}.json": json.dumps(data).encode('utf-8') for data_id, data in dataStoreInput.items.items()}
+
+    @staticmethod
+    def _blob_names(dataStoreInput: DataStoreInput) -> List[str]:
+        if not dataStoreInput.data_ids:
+            raise ValueError(f"data_ids is required for {dataStoreInput.operation} operation")
+        return [f"{data_id}.json" for data_id in dataStoreInput.data_ids]
+
+    def _stored(self, outcomes: Dict[str, Any]) -> Dict[str, Any]:
+        return self._bulk_response({
+            blob_name[:-len('.json')]: {"status": "success", "message": "Data stored"} if error is None
+            else {"status": "error", "message": f"Failed to store data: {str(error)}"}
+            for blob_name, error in outcomes.items()
+        })
+
+    def _retrieved(self, outcomes: Dict[str, Any]) -> Dict[str, Any]:
+        results = {}
+        for blob_name, outcome in outcomes.items():
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                results[blob_name[:-len('.json')]] = json.loads(outcome.decode('utf-8'))
+            except Exception as e:
+                results[blob_name[:-len('.json')]] = {"status": "error", "message": f"Failed to retrieve data: {str(e)}"}
+        return self._bulk_response(results)
+
+    def _deleted(self, outcomes: Dict[str, Any]) -> Dict[str, Any]:
+        return self._bulk_response({
+            blob_name[:-len('.json')]: {"status": "success", "message": "Data deleted"} if error is None
+            else {"status": "error", "message": f"Failed to delete data: {str(error)}"}
+            for blob_name, error in outcomes.items()
+        })
+
+    @staticmethod
+    def _succeeded(outcomes: Dict[str, Optional[Exception]]) -> List[str]:
+        return [blob_name for blob_name, error in outcomes.items() if error is None]
+
+    def _stored_chunks(self, dataStoreInput: DataStoreInput, stored: List[str]) -> List[Chunk]:
+        return self._embedded_chunks([dataStoreInput.items[blob_name[:-len('.json')]] for blob_name in stored])
+
+    def _store_many(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """Store several records in Azure Blob Storage concurrently."""
+        outcomes = AzureStorageService.upload_many(dataStoreInput.container_name, self._blob_items(dataStoreInput))
+        stored = self._succeeded(outcomes)
+        self._update_index(dataStoreInput.container_name, self._stored_chunks(dataStoreInput, stored))
+        return self._stored(outcomes)
+
+    def _retrieve_many(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """Retrieve several records from Azure Blob Storage concurrently."""
+        return self._retrieved(AzureStorageService.download_many(dataStoreInput.container_name, self._blob_names(dataStoreInput)))
+
+    def _delete_many(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """Delete several records from Azure Blob Storage using batch requests."""
+        outcomes = AzureStorageService.delete_many(dataStoreInput.container_name, self._blob_names(dataStoreInput))
+        deleted = self._succeeded(outcomes)
+        self._update_index(dataStoreInput.container_name, removed=[blob_name[:-len('.json')] for blob_name in deleted])
+        return self._deleted(outcomes)
+
+    async def _astore_data(self, dataStoreInput: DataStoreInput) -> Dict[str, str]:
+        """Store data in Azure Blob Storage without blocking the event loop."""
+        if not dataStoreInput.data_id:
+            raise ValueError("data_id is required for store operation")
+        if not dataStoreInput.data:
+            raise ValueError("data is required for store operation")
+
+        json_data = json.dumps(dataStoreInput.data).encode('utf-8')
+        blob_name = f"{dataStoreInput.data_id}.json"
+        await AsyncAzureStorageService.upload_data(dataStoreInput.container_name, blob_name, json_data)
+        await asyncio.to_thread(self._update_index, dataStoreInput.container_name, self._embedded_chunks([dataStoreInput.data]))
+
+        return {"status": "success", "message": f"Data stored with ID: {dataStoreInput.data_id}"}
+
+    async def _aretrieve_data(self, dataStoreInput: DataStoreInput) -> Union[Dict[str, Any], Dict[str, str]]:
+        """Retrieve data from Azure Blob Storage without blocking the event loop."""
+        if not dataStoreInput.data_id:
+            raise ValueError("data_id is required for retrieve operation")
+
+        try:
+            data_bytes = await AsyncAzureStorageService.download_data(dataStoreInput.container_name, f"{dataStoreInput.data_id}.json")
+            return json.loads(data_bytes.decode('utf-8'))
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to retrieve data: {str(e)}"}
+
+    async def _alist_data(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """List one page of data without blocking the event loop."""
+        container_name, prefix = dataStoreInput.container_name, dataStoreInput.prefix or ""
+        page_size, token = self._page_size(dataStoreInput), dataStoreInput.continuation_token
+        try:
+            page = await asyncio.to_thread(BlobManifest.list_page, container_name, prefix, page_size, token)
+            if page is not None:
+                return self._listed(*page, "manifest")
+            return self._listed(*await AsyncAzureStorageService.list_page(container_name, prefix or None, page_size, token), "listing")
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to list data: {str(e)}"}
+
+    async def _aexists_data(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """Check whether data exists without blocking the event loop."""
+        if not dataStoreInput.data_id:
+            raise ValueError("data_id is required for exists operation")
+
+        blob_name = f"{dataStoreInput.data_id}.json"
+        try:
+            exists, source = await asyncio.to_thread(BlobManifest.contains, dataStoreInput.container_name, blob_name), "manifest"
+            if exists is None:
+                exists, source = await AsyncAzureStorageService.blob_exists(dataStoreInput.container_name, blob_name), "storage"
+            return {"status": "success", "data_id": dataStoreInput.data_id, "exists": exists, "source": source}
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to check data: {str(e)}"}
+
+    async def _abuild_manifest(self, dataStoreInput: DataStoreInput) -> Dict[str, str]:
+        """Build the manifest of a prefix on a worker thread."""
+        return await asyncio.to_thread(self._build_manifest, dataStoreInput)
+
+    async def _adelete_data(self, dataStoreInput: DataStoreInput) -> Dict[str, str]:
+        """Delete data from Azure Blob Storage without blocking the event loop."""
+        if not dataStoreInput.data_id:
+            raise ValueError("data_id is required for delete operation")
+
+        try:
+            blob_name = f"{dataStoreInput.data_id}.json"
+            await AsyncAzureStorageService.delete_blob(dataStoreInput.container_name, blob_name)
+            await asyncio.to_thread(self._update_index, dataStoreInput.container_name, (), [dataStoreInput.data_id])
+            return {"status": "success", "message": f"Data with ID {dataStoreInput.data_id} deleted"}
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to delete data: {str(e)}"}
+
+    async def _astore_many(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """Store several records without blocking the event loop."""
+        outcomes = await AsyncAzureStorageService.upload_many(dataStoreInput.container_name, self._blob_items(dataStoreInput))
+        stored = self._succeeded(outcomes)
+        await asyncio.to_thread(self._update_index, dataStoreInput.container_name, self._stored_chunks(dataStoreInput, stored))
+        return self._stored(outcomes)
+
+    async def _aretrieve_many(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """Retrieve several records without blocking the event loop."""
+        return self._retrieved(await AsyncAzureStorageService.download_many(dataStoreInput.container_name, self._blob_names(dataStoreInput)))
+
+    async def _adelete_many(self, dataStoreInput: DataStoreInput) -> Dict[str, Any]:
+        """Delete several records without blocking the event loop."""
+        outcomes = await AsyncAzureStorageService.delete_many(dataStoreInput.container_name, self._blob_names(dataStoreInput))
+        deleted = self._succeeded(outcomes)
+        await asyncio.to_thread(self._update_index, dataStoreInput.container_name, (), [blob_name[:-len('.json')] for blob_name in deleted])
+        return self._deleted(outcomes)
+
+    @staticmethod
+    def _input(operation: str, container_name: str, data_id: str, data: Dict[str, Any], prefix: str,
+               data_ids: List[str], items: Dict[str, Dict[str, Any]], page_size: Optional[int], continuation_token: Optional[str],
+               operations: Dict[str, Any]) -> DataStoreInput:
+        """Build and validate the operation input."""
+        dataStoreInput: DataStoreInput = DataStoreInput(
+            operation=operation,
+            container_name=container_name,
+            data_id=data_id,
+            data=data,
+            prefix=prefix,
+            data_ids=data_ids,
+            items=items,
+            page_size=page_size,
+            continuation_token=continuation_token
+        )
+
+        if dataStoreInput.operation not in operations:
+            raise ValueError(f"Unknown operation: {dataStoreInput.operation}. Must be 'store', 'retrieve', 'list', 'delete', 'exists', 'store_many', 'retrieve_many', 'delete_many', or 'build_manifest'")
+
+        return dataStoreInput
+
+    def _run(self, operation: str, container_name: str, data_id: str = "", data: Dict[str, Any] = None, prefix: str = "",
+             data_ids: List[str] = None, items: Dict[str, Dict[str, Any]] = None, page_size: Optional[int] = None,
+             continuation_token: Optional[str] = None) -> Union[Dict[str, Any], List[str], str]:
         """
         Run the data store tool with the specified operation.
 
         Args:
-            operation (str): The operation to perform. Must be one of 'store', 'retrieve', 'list', or 'delete'.
+            operation (str): The operation to perform. Must be one of 'store', 'retrieve', 'list', 'delete', 'exists', 'store_many', 'retrieve_many', 'delete_many', or 'build_manifest'.
             container_name (str): The name of the Azure Blob Storage container.
-            data_id (str, optional): The ID of the data for 'store', 'retrieve', or 'delete' operations. Defaults to an empty string.
+            data_id (str, optional): The ID of the data for 'store', 'retrieve', 'delete' or 'exists' operations. Defaults to an empty string.
             data (str, optional): The data to store for the 'store' operation. Defaults to an empty string.
-            prefix (str, optional): The prefix to filter blobs for the 'list' operation. Defaults to an empty string.
+            prefix (str, optional): The prefix to filter blobs for the 'list' operation, or the prefix of 'build_manifest'. Defaults to an empty string.
+            data_ids (List[str], optional): The IDs for 'retrieve_many' or 'delete_many' operations.
+            items (Dict[str, Dict[str, Any]], optional): Records keyed by ID for the 'store_many' operation.
+            page_size (int, optional): Maximum IDs per 'list' page. Defaults to STORAGE_LIST_PAGE_SIZE.
+            continuation_token (str, optional): Token from the previous 'list' page.
 
         Returns:
             Union[Dict[str, Any], List[str], str]: The result of the operation, which varies based on the operation type.
@@ -90,22 +354,32 @@ class DataStoreTools(BaseTool):
             "store": self._store_data,
             "retrieve": self._retrieve_data,
             "list": self._list_data,
-            "delete": self._delete_data
+            "delete": self._delete_data,
+            "exists": self._exists_data,
+            "store_many": self._store_many,
+            "retrieve_many": self._retrieve_many,
+            "delete_many": self._delete_many,
+            "build_manifest": self._build_manifest
         }
 
-        dataStoreInput: DataStoreInput = DataStoreInput(
-            operation=operation,
-            container_name=container_name,
-            data_id=data_id,
-            data=data,
-            prefix=prefix
-        )
-
-        if dataStoreInput.operation not in operations:
-            raise ValueError(f"Unknown operation: {dataStoreInput.operation}. Must be 'store', 'retrieve', 'list', or 'delete'")
-
+        dataStoreInput = self._input(operation, container_name, data_id, data, prefix, data_ids, items, page_size, continuation_token, operations)
         return operations[dataStoreInput.operation](dataStoreInput)
 
-    async def _arun(self, operation: str, container_name: str, data_id: str = "", data: Dict[str, Any] = None, prefix: str = "") -> Union[Dict[str, Any], List[str], str]:
-        """Async implementation of the data store tool."""
-        return self._run(operation, container_name, data_id, data, prefix)
+    async def _arun(self, operation: str, container_name: str, data_id: str = "", data: Dict[str, Any] = None, prefix: str = "",
+                    data_ids: List[str] = None, items: Dict[str, Dict[str, Any]] = None, page_size: Optional[int] = None,
+             continuation_token: Optional[str] = None) -> Union[Dict[str, Any], List[str], str]:
+        """Async implementation of the data store tool, using the non-blocking storage client."""
+        operations = {
+            "store": self._astore_data,
+            "retrieve": self._aretrieve_data,
+            "list": self._alist_data,
+            "delete": self._adelete_data,
+            "exists": self._aexists_data,
+            "store_many": self._astore_many,
+            "retrieve_many": self._aretrieve_many,
+            "delete_many": self._adelete_many,
+            "build_manifest": self._abuild_manifest
+        }
+
+        dataStoreInput = self._input(operation, container_name, data_id, data, prefix, data_ids, items, page_size, continuation_token, operations)
+        return await operations[dataStoreInput.operation](dataStoreInput)
@@ -1,27 +1,39 @@
-from json import tool
-from typing import List
-from langchain_core.tools import Tool, StructuredTool
+from typing import List, Optional
+from langchain_core.tools import StructuredTool
 
+from app.models.DataStoreModel import Chunk
 from app.services.LoggerService import LoggerService
 
 logger = LoggerService.get_logger(__name__)
 
-# def _get_generate_embeddings() -> StructuredTool:
-#         """Get the DataStoreTool for interacting with Azure Blob Storage."""
-#         return StructuredTool.from_function(
-#             func=_generate_embeddings,
-#             name="generate_embeddings",
-#             description="Generate vector embeddings for a list of chunks.",
-#             )
-    
-
-# @tool
-# def _generate_embeddings(self, chunks: List[Chunk]) -> None:
-#         """Generate vector embeddings for chunks"""
-#         if not self.vector_embedding_service:
-#             logger.warning("Vector embedding service not configured")
-#             return
-            
-#         for chunk in chunks:
-#             chunk.Vector_Embeddings = self.vector_embedding_service.embed(chunk.Context)
+_pipeline = None
 
+
+def _get_pipeline():
+    """Get the shared embedding pipeline, created on first use."""
+    global _pipeline
+    if _pipeline is None:
+        from app.services.EmbeddingPipeline import EmbeddingPipeline
+
+        _pipeline = EmbeddingPipeline()
+    return _pipeline
+
+
+def _get_generate_embeddings() -> StructuredTool:
+    """Get the tool that generates vector embeddings for chunks."""
+    return StructuredTool.from_function(
+        func=_generate_embeddings,
+        coroutine=_agenerate_embeddings,
+        name="generate_embeddings",
+        description="Generate vector embeddings for a list of chunks.",
+    )
+
+
+def _generate_embeddings(chunks: List[Chunk]) -> List[Chunk]:
+    """Generate vector embeddings for chunks"""
+    return list(_get_pipeline().embed_chunks(chunks))
+
+
+async def _agenerate_embeddings(chunks: List[Chunk]) -> List[Chunk]:
+    """Generate vector embeddings for chunks"""
+    return list(await _get_pipeline().aembed_chunks(chunks))
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional, Type
+from langchain.tools import BaseTool
+from dotenv import load_dotenv
+from app.models.DataStoreModel import Chunk, VectorSearchInput
+from app.services.azurestorageservice import AsyncAzureStorageService, AzureStorageService
+from app.services.ChunkSegment import ChunkSegmentStore
+from app.services.LlmClientRegistry import LlmClientRegistry
+from app.services.LoggerService import LoggerService
+from app.services.VectorIndex import VectorIndexRegistry
+
+# Load environment variables
+load_dotenv()
+
+logger = LoggerService.get_logger(__name__)
+
+class VectorSearchTools(BaseTool):
+    """Tool for similarity search over the stored chunk embeddings."""
+    name: str = "vector_search_tool"
+    description: str = """Find the document chunks most similar to a query.
+                - Provide the query text, optionally the container_name and top_k
+                - Returns the matching chunk ids, similarity scores and chunk text"""
+    args_schema: Type[VectorSearchInput] = VectorSearchInput
+
+    def __init__(self):
+        """Initialize the VectorSearchTool."""
+        super().__init__()
+
+    @staticmethod
+    def _container(container_name: Optional[str]) -> str:
+        return container_name or os.getenv("VECTOR_INDEX_CONTAINER", "chunks")
+
+    @staticmethod
+    def _segment_chunks(container_name: str, chunk_ids: List[str]) -> Dict[str, Chunk]:
+        """Chunks of the hits stored in segments (ingested documents); the rest are per-chunk JSON records."""
+        try:
+            return ChunkSegmentStore.read_chunks(container_name, chunk_ids)
+        except Exception as e:
+            logger.warning(f"Failed to read search hits from the segments of '{container_name}': {str(e)}")
+            return {}
+
+    @staticmethod
+    def _describe(result: Dict[str, Any], chunk: Chunk) -> Dict[str, Any]:
+        result.update({"rid": chunk.RId, "tag": chunk.Tag, "context": chunk.Context})
+        return result
+
+    @staticmethod
+    def _load_chunk(container_name: str, chunk_id: str, score: float, chunk: Optional[Chunk] = None) -> Dict[str, Any]:
+        """Fetch the stored chunk for a search hit, unless it was read from a segment already."""
+        result = {"chunk_id": chunk_id, "score": round(score, 4)}
+        if chunk is not None:
+            return VectorSearchTools._describe(result, chunk)
+        try:
+            chunk = json.loads(AzureStorageService.download_data(container_name, f"{chunk_id}.json"))
+            result.update({"rid": chunk.get("RId"), "tag": chunk.get("Tag"), "context": chunk.get("Context")})
+        except Exception as e:
+            result["error"] = f"Failed to load chunk: {str(e)}"
+        return result
+
+    @staticmethod
+    async def _aload_chunk(container_name: str, chunk_id: str, score: float, chunk: Optional[Chunk] = None) -> Dict[str, Any]:
+        """Fetch the stored chunk for a search hit without blocking the event loop."""
+        result = {"chunk_id": chunk_id, "score": round(score, 4)}
+        if chunk is not None:
+            return VectorSearchTools._describe(result, chunk)
+        try:
+            chunk = json.loads(await AsyncAzureStorageService.download_data(container_name, f"{chunk_id}.json"))
+            result.update({"rid": chunk.get("RId"), "tag": chunk.get("Tag"), "context": chunk.get("Context")})
+        except Exception as e:
+            result["error"] = f"Failed to load chunk: {str(e)}"
+        return result
+
+    def _run(self, query: str, container_name: Optional[str] = None, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Run the vector search.
+
+        Args:
+            query (str): Text to find similar chunks for.
+            container_name (str, optional): Container holding the chunks. Defaults to VECTOR_INDEX_CONTAINER.
+            top_k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            List[Dict[str, Any]]: The best matching chunks, most similar first.
+        """
+        container_name = self._container(container_name)
+        index = VectorIndexRegistry.get_index(container_name)
+        vector = LlmClientRegistry.get_embeddings().embed_query(query)
+        hits = index.search(vector, top_k)
+        chunks = self._segment_chunks(container_name, [chunk_id for chunk_id, _ in hits])
+        return [self._load_chunk(container_name, chunk_id, score, chunks.get(chunk_id)) for chunk_id, score in hits]
+
+    async def _arun(self, query: str, container_name: Optional[str] = None, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Async implementation of the vector search tool."""
+        container_name = self._container(container_name)
+        index = await asyncio.to_thread(VectorIndexRegistry.get_index, container_name)
+        vector = await LlmClientRegistry.get_embeddings().aembed_query(query)
+        hits = index.search(vector, top_k)
+        chunks = await asyncio.to_thread(self._segment_chunks, container_name, [chunk_id for chunk_id, _ in hits])
+        return list(await asyncio.gather(*(self._aload_chunk(container_name, chunk_id, score, chunks.get(chunk_id)) for chunk_id, score in hits)))
@@ -0,0 +1,63 @@
+"""
+Blob read paths: whole-blob readall versus streamed chunks versus parallel ranged download to file.
+
+Runs against the storage account in AZURE_STORAGE_CONNECTION_STRING (Azurite
+works). Uploads a random test blob, then reports wall time and peak Python heap
+for each path.
+
+    python benchmarks/blob_download_benchmark.py --size-mb 256 --concurrency 1 4 8
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.azurestorageservice import AzureStorageService  # noqa: E402
+from app.services.DataStoreManager import DataStoreManager  # noqa: E402
+
+
+def measure(fn) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "peak_heap_mb": round(peak / (1 << 20), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--container", default="benchmarks")
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    DataStoreManager.initialize()
+    blob_name = f"download-benchmark-{args.size_mb}mb.bin"
+    AzureStorageService.upload_data(args.container, blob_name, io.BytesIO(os.urandom(args.size_mb << 20)))
+
+    results = {
+        "config": vars(args),
+        "readall": measure(lambda: AzureStorageService.download_data(args.container, blob_name, max_concurrency=1)),
+        "stream_blob": measure(lambda: sum(len(chunk) for chunk in AzureStorageService.stream_blob(args.container, blob_name))),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in args.concurrency:
+            path = os.path.join(tmp, blob_name)
+            results[f"download_to_file_x{concurrency}"] = measure(
+                lambda: AzureStorageService.download_to_file(args.container, blob_name, path, max_concurrency=concurrency)
+            )
+    AzureStorageService.delete_blob(args.container, blob_name)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
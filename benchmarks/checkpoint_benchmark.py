@@ -0,0 +1,127 @@
+"""
+Storage cost of multi-turn sessions with the data store checkpointer.
+
+Runs a conversation through a graph shaped like the orchestrator (a router node
+followed by a worker that runs its own subgraph on the conversation state) and
+reports, at the requested turn counts, the bytes the checkpointer wrote for the
+last turn, the bytes a full-state rewrite of the same checkpoints would take,
+the size of the thread log and the time to resume the thread cold, i.e. with
+one read of the log into an empty checkpointer.
+
+    python benchmarks/checkpoint_benchmark.py --turns 10 50 200
+    python benchmarks/checkpoint_benchmark.py --turns 50 --snapshot-every 50
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Annotated
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langgraph.graph import END, StateGraph  # noqa: E402
+from langgraph.graph.message import add_messages  # noqa: E402
+from typing_extensions import TypedDict  # noqa: E402
+
+from app.services.DataStoreCheckpointer import DataStoreCheckpointer, FileCheckpointBackend  # noqa: E402
+
+WORDS = ("document section retrieval index chunk feedback summary storage query answer policy "
+         "deployment latency budget manifest container embedding vector routing worker").split()
+
+
+class BenchState(TypedDict):
+    messages: Annotated[list, add_messages]
+    next: str
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def build_graph(checkpointer, rng: random.Random):
+    def answer(state):
+        return {"messages": [AIMessage(content=sentence(rng, 120))]}
+
+    worker_graph = StateGraph(BenchState)
+    worker_graph.add_node("answer", answer)
+    worker_graph.set_entry_point("answer")
+    worker_graph.add_edge("answer", END)
+    worker_graph = worker_graph.compile()
+
+    def router(state):
+        return {"next": "worker"}
+
+    def worker(state):
+        result = worker_graph.invoke(state)
+        return {"messages": [HumanMessage(content=result["messages"][-1].content, name="worker")]}
+
+    builder = StateGraph(BenchState)
+    builder.add_node("router", router)
+    builder.add_node("worker", worker)
+    builder.set_entry_point("router")
+    builder.add_edge("router", "worker")
+    builder.add_edge("worker", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def full_rewrite_bytes(checkpointer: DataStoreCheckpointer, thread_id: str, checkpoint_ids: set) -> int:
+    """Bytes needed to store the given checkpoints with every channel value written in full."""
+    total = 0
+    for item in checkpointer.list({"configurable": {"thread_id": thread_id}}):
+        if item.checkpoint["id"] in checkpoint_ids:
+            total += len(checkpointer.serde.dumps_typed(item.checkpoint)[1])
+            total += len(checkpointer.serde.dumps_typed(item.metadata)[1])
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--snapshot-every", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {"config": vars(args), "runs": []}
+    for turns in args.turns:
+        path = tempfile.mkdtemp(prefix="checkpoints-")
+        checkpointer = DataStoreCheckpointer(FileCheckpointBackend(path), snapshot_every=args.snapshot_every)
+        graph = build_graph(checkpointer, random.Random(turns))
+        rng = random.Random(0)
+        config = {"configurable": {"thread_id": "bench"}}
+
+        for turn in range(turns):
+            before = checkpointer.stats["append_bytes"] + checkpointer.stats["snapshot_bytes"]
+            seen = {item.checkpoint["id"] for item in checkpointer.list(config)}
+            graph.invoke({"messages": [("user", sentence(rng, 40))]}, config)
+        written = checkpointer.stats["append_bytes"] + checkpointer.stats["snapshot_bytes"] - before
+        # The last turn's checkpoints across all namespaces, as a full-state saver would store them
+        new_ids = {item.checkpoint["id"] for item in checkpointer.list(config)} - seen
+        log_bytes = len(FileCheckpointBackend(path).read("bench") or b"")
+
+        resume_ms = []
+        for _ in range(args.repeats):
+            cold = DataStoreCheckpointer(FileCheckpointBackend(path))
+            started = time.perf_counter()
+            state = cold.get_tuple(config)
+            resume_ms.append((time.perf_counter() - started) * 1000)
+
+        results["runs"].append({
+            "turns": turns,
+            "messages": len(state.checkpoint["channel_values"]["messages"]),
+            "last_turn_bytes_written": written,
+            "last_turn_bytes_full_rewrite": full_rewrite_bytes(checkpointer, "bench", new_ids),
+            "thread_log_bytes": log_bytes,
+            "cold_resume_ms": round(statistics.median(resume_ms), 3),
+            "request_payload_bytes": len(json.dumps({"query": "x" * 200, "thread_id": "bench"})),
+            "stats": checkpointer.stats,
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
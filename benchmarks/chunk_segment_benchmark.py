@@ -0,0 +1,88 @@
+"""
+Size and load time of per-chunk JSON records versus one columnar chunk segment.
+
+The JSON side mirrors DataStoreTools (one json.dumps document per chunk) and
+excludes blob round-trips, so it is a lower bound on the current load path.
+
+    python benchmarks/chunk_segment_benchmark.py --chunks 100000 --dimensions 1536
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.DataStoreModel import Chunk  # noqa: E402
+from app.services.ChunkSegment import ChunkSegment  # noqa: E402
+
+
+def make_chunks(count: int, dimensions: int, seed: int):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dimensions)).astype(np.float32)
+    return [
+        Chunk(RId=f"doc-{i // 100}", ChunkId=f"chunk-{i}", Next_ChunkId=f"chunk-{i + 1}" if i + 1 < count else None,
+              Previous_ChunkId=f"chunk-{i - 1}" if i else None, Parent_ChunkId=f"doc-{i // 100}-root",
+              Context=f"Paragraph {i} " + "lorem ipsum dolor sit amet " * 30, Tag="manual", Categories=["docs", f"topic-{i % 7}"],
+              Vector_Embeddings=vectors[i].tolist())
+        for i in range(count)
+    ]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, round(time.perf_counter() - started, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.dimensions, args.seed)
+
+    blobs, json_encode_s = timed(lambda: [json.dumps(chunk.model_dump()).encode("utf-8") for chunk in chunks])
+
+    def load_json():
+        loaded = [Chunk(**json.loads(blob)) for blob in blobs]
+        return [c.ChunkId for c in loaded], np.array([c.Vector_Embeddings for c in loaded], dtype=np.float32)
+
+    (_, json_vectors), json_load_s = timed(load_json)
+
+    segment_bytes, segment_encode_s = timed(lambda: ChunkSegment.encode(chunks))
+
+    def load_segment():
+        segment = ChunkSegment(segment_bytes)
+        return segment.ids(), segment.vectors
+
+    (ids, vectors), segment_load_s = timed(load_segment)
+    assert ids[-1] == chunks[-1].ChunkId and np.array_equal(vectors, json_vectors)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chunks.cseg")
+        with open(path, "wb") as f:
+            f.write(segment_bytes)
+        segment, mmap_open_s = timed(lambda: ChunkSegment.open(path))
+        sample = segment.chunk(len(segment) // 2)
+        assert sample == chunks[len(segment) // 2]
+        del sample
+        segment.close()
+
+    print(json.dumps({
+        "config": vars(args),
+        "json": {"bytes": sum(len(blob) for blob in blobs), "encode_s": json_encode_s, "load_ids_and_vectors_s": json_load_s},
+        "segment": {"bytes": len(segment_bytes), "encode_s": segment_encode_s, "load_ids_and_vectors_s": segment_load_s,
+                    "mmap_open_s": mmap_open_s},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Prompt size and routing latency with and without the bounded context window.
+
+Builds synthetic conversations of growing length and reports the prompt tokens
+sent by the core agent router and by a sub-agent ReAct loop with verbose tool
+outputs, before (full history) and after (ContextWindow), plus the time spent
+building the window. With --live the router is also called against the
+configured Azure OpenAI deployment with both prompts and the median latencies
+are reported, together with the latency of one summarization call.
+
+    python benchmarks/context_window_benchmark.py --turns 10 50 200
+    python benchmarks/context_window_benchmark.py --turns 50 --live --repeats 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Repeated identical prompts would otherwise be answered by the LLM response cache
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage  # noqa: E402
+
+from app.core.ContextWindow import ContextPolicy, ContextWindow, count_tokens  # noqa: E402
+from app.services.CommonService import read_prompt_template  # noqa: E402
+
+WORDS = ("document section retrieval index chunk feedback summary storage query answer policy "
+         "deployment latency budget manifest container embedding vector routing worker").split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def router_conversation(turns: int, seed: int = 0) -> list:
+    """User requests alternating with worker replies, as in the orchestrator state."""
+    rng = random.Random(seed)
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"Turn {turn}: {sentence(rng, 40)}?", id=str(uuid.uuid4())))
+        messages.append(HumanMessage(content=sentence(rng, 250), name="app.agents.Retrieval.RetrievalAgent", id=str(uuid.uuid4())))
+    messages.append(HumanMessage(content=f"Final question: {sentence(rng, 30)}?", id=str(uuid.uuid4())))
+    return messages
+
+
+def react_conversation(turns: int, seed: int = 0, tool_chars: int = 12000) -> list:
+    """A sub-agent loop where every turn makes a tool call with a large output."""
+    rng = random.Random(seed)
+    messages = []
+    for turn in range(turns):
+        call_id = f"call_{turn}"
+        messages.append(HumanMessage(content=f"Turn {turn}: {sentence(rng, 40)}?"))
+        messages.append(AIMessage(content="", tool_calls=[{"id": call_id, "name": "vector_search_tool", "args": {"query": sentence(rng, 6)}}]))
+        messages.append(ToolMessage(content=json.dumps([{"context": sentence(rng, 60)} for _ in range(tool_chars // 500)]), tool_call_id=call_id))
+        messages.append(AIMessage(content=sentence(rng, 120)))
+    return messages
+
+
+def timed(fn, repeats: int = 20):
+    """Median wall time in ms and the last result."""
+    times, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def measure(node: str, system_prompt: str, messages: list, policy: ContextPolicy) -> dict:
+    window = ContextWindow(node, policy)
+    full = [SystemMessage(content=system_prompt)] + messages
+    window_ms, windowed = timed(lambda: window.messages({"messages": messages}, system_prompt))
+    return {
+        "messages": len(messages),
+        "tokens_full": count_tokens(full),
+        "tokens_windowed": count_tokens(windowed),
+        "messages_windowed": len(windowed),
+        "window_build_ms": round(window_ms, 3),
+    }
+
+
+async def live_router(system_prompt: str, messages: list, policy: ContextPolicy, repeats: int) -> dict:
+    """Median router latency against the configured deployment, full versus windowed prompt."""
+    from app.core.CoreAgent import Router
+    from app.core.langchain_setup import get_llm
+
+    llm = get_llm()
+    router = llm.with_structured_output(Router)
+    window = ContextWindow("coreagent", policy)
+    prompts = {
+        "full": [SystemMessage(content=system_prompt)] + messages,
+        "windowed": window.messages({"messages": messages}, system_prompt),
+    }
+    report = {}
+    for name, prompt in prompts.items():
+        latencies = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            await router.ainvoke(prompt)
+            latencies.append((time.perf_counter() - started) * 1000)
+        report[f"router_ms_{name}"] = round(statistics.median(latencies), 1)
+
+    started = time.perf_counter()
+    update = await window.asummarize({"messages": messages}, llm)
+    report["summarize_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    report["summarized_messages"] = len(update.get("messages", []))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--max-tokens", type=int, default=4000)
+    parser.add_argument("--tool-output-chars", type=int, default=2000)
+    parser.add_argument("--summarize-tokens", type=int, default=8000)
+    parser.add_argument("--live", action="store_true", help="Also time router calls against the configured deployment")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    policy = ContextPolicy(args.max_tokens, args.tool_output_chars, args.summarize_tokens)
+    core_prompt = read_prompt_template("core/CoreAgentPromptTemplate.txt")
+    retrieval_prompt = read_prompt_template("agents/Retrieval/RetrievalAgentPrompt.txt")
+
+    results = {"config": vars(args), "runs": []}
+    for turns in args.turns:
+        run = {
+            "turns": turns,
+            "router": measure("coreagent", core_prompt, router_conversation(turns), policy),
+            "react": measure("retrievalAgent", retrieval_prompt, react_conversation(turns), policy),
+        }
+        if args.live:
+            run["router"].update(asyncio.run(live_router(core_prompt, router_conversation(turns), policy, args.repeats)))
+        results["runs"].append(run)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
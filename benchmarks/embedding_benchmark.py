@@ -0,0 +1,141 @@
+"""
+Embedding throughput (chunks/sec) against a local fake embedding server.
+
+Starts an Azure OpenAI compatible embeddings endpoint on localhost with a fixed
+per-request latency, then compares the old one-chunk-per-request loop with the
+EmbeddingPipeline on a cold cache and on a warm cache (unchanged re-ingest).
+
+    python benchmarks/embedding_benchmark.py --chunks 5000 --duplicate-ratio 0.2 --latency-ms 50
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def fake_embedding_app(dimensions: int, latency_ms: float):
+    from fastapi import FastAPI, Request, Response
+
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.post("/openai/deployments/{deployment}/embeddings")
+    async def embeddings(deployment: str, request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        app.state.requests += 1
+        await asyncio.sleep(latency_ms / 1000)
+        # The openai client asks for base64, which also keeps the fake server off the critical path
+        base64_output = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vector = np.random.default_rng(zlib.crc32(str(text).encode("utf-8"))).normal(size=dimensions).astype(np.float32)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if base64_output else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        payload = {"object": "list", "data": data, "model": deployment, "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+        return Response(json.dumps(payload), media_type="application/json")
+
+    return app
+
+
+def start_server(app):
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def make_chunks(count: int, duplicate_ratio: float, seed: int):
+    from app.models.DataStoreModel import Chunk
+
+    rng = np.random.default_rng(seed)
+    unique = max(1, int(count * (1 - duplicate_ratio)))
+    texts = [f"Section {i}: " + " ".join(f"word{j}" for j in rng.integers(0, 5000, 120)) for i in range(unique)]
+    return [
+        Chunk(RId="doc", ChunkId=f"chunk-{i}", Next_ChunkId=None, Previous_ChunkId=None, Parent_ChunkId=None,
+              Context=texts[i] if i < unique else texts[int(rng.integers(0, unique))], Tag="", Categories=[],
+              Vector_Embeddings=None)
+        for i in range(count)
+    ]
+
+
+async def sequential(embeddings, chunks):
+    for chunk in chunks:
+        chunk.Vector_Embeddings = await embeddings.aembed_query(chunk.Context)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated latency per request")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sequential-sample", type=int, default=200, help="Chunks timed for the one-by-one baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = fake_embedding_app(args.dimensions, args.latency_ms)
+    server, port = start_server(app)
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{port}",
+        "AZURE_OPENAI_API_KEY": "benchmark",
+        "AZURE_OPENAI_API_VERSION": os.getenv("AZURE_OPENAI_API_VERSION") or "2024-06-01",
+    })
+
+    from app.services.EmbeddingPipeline import EmbeddingCache, EmbeddingPipeline
+    from app.services.LlmClientRegistry import LlmClientRegistry
+
+    embeddings = LlmClientRegistry.get_embeddings()
+    results = {"config": vars(args)}
+
+    async def run():
+        sample = make_chunks(args.sequential_sample, args.duplicate_ratio, args.seed)
+        started = time.perf_counter()
+        await sequential(embeddings, sample)
+        elapsed = time.perf_counter() - started
+        results["sequential"] = {"chunks": len(sample), "seconds": round(elapsed, 3), "chunks_per_sec": round(len(sample) / elapsed, 1)}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = EmbeddingCache(os.path.join(tmp, "embeddings.sqlite"))
+            for label in ("pipeline_cold", "pipeline_warm"):
+                pipeline = EmbeddingPipeline(embeddings, cache=cache, batch_size=args.batch_size, concurrency=args.concurrency)
+                chunks = make_chunks(args.chunks, args.duplicate_ratio, args.seed)
+                requests_before = app.state.requests
+                started = time.perf_counter()
+                await pipeline.aembed_chunks(chunks)
+                elapsed = time.perf_counter() - started
+                results[label] = {
+                    "chunks": len(chunks),
+                    "seconds": round(elapsed, 3),
+                    "chunks_per_sec": round(len(chunks) / elapsed, 1),
+                    "requests": app.state.requests - requests_before,
+                    **{key: pipeline.stats[key] for key in ("unique_texts", "cache_hits", "embedded")},
+                }
+
+    asyncio.run(run())
+    server.should_exit = True
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
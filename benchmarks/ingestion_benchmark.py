@@ -0,0 +1,105 @@
+"""
+Throughput and peak memory of the streaming ingestion pipeline.
+
+Each size runs in a fresh interpreter that streams a synthetic markdown manual
+through IngestionService.ingest_stream and encodes every batch as a chunk
+segment (written to a temp directory, standing in for blob uploads). Peak RSS
+should stay flat as the input grows.
+
+    python benchmarks/ingestion_benchmark.py --sizes-mb 100 300 600
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def synthetic_manual(size_mb: int, read_size: int = 4 << 20):
+    """Yield a markdown document of roughly size_mb megabytes in read_size byte chunks, without materializing it."""
+    paragraph = ("The controller exposes a configuration interface for every module, and each setting is "
+                 "described with its default value, valid range and the components it affects. ") * 4
+    target, produced, buffer, section = size_mb << 20, 0, [], 0
+    while produced < target:
+        section += 1
+        parts = [f"# Chapter {section}\n\n"]
+        for sub in range(1, 6):
+            parts.append(f"## Section {section}.{sub}\n\n")
+            parts.extend(f"{paragraph}\n\n" for _ in range(6))
+            parts.append(f"### Notes {section}.{sub}\n\n{paragraph}\n\n")
+        data = "".join(parts).encode("utf-8")
+        buffer.append(data)
+        produced += len(data)
+        if sum(len(b) for b in buffer) >= read_size:
+            yield b"".join(buffer)
+            buffer = []
+    if buffer:
+        yield b"".join(buffer)
+
+
+def run_single(size_mb: int, batch_size: int, max_chars: int) -> dict:
+    from app.services.ChunkSegment import ChunkSegment
+    from app.services.IngestionService import IngestionService
+
+    stats = {"bytes_in": 0, "segment_bytes": 0}
+
+    def counted():
+        for data in synthetic_manual(size_mb):
+            stats["bytes_in"] += len(data)
+            yield data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def write_batch(name, batch):
+            encoded = ChunkSegment.encode(batch)
+            with open(os.path.join(tmp, f"{name}.cseg"), "wb") as f:
+                f.write(encoded)
+            stats["segment_bytes"] += len(encoded)
+
+        started = time.perf_counter()
+        summary = IngestionService.ingest_stream(counted(), "manual", write_batch, max_chars=max_chars, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "size_mb": round(stats["bytes_in"] / (1 << 20), 1),
+        "seconds": round(elapsed, 2),
+        "mb_per_sec": round(stats["bytes_in"] / (1 << 20) / elapsed, 1),
+        "chunks": summary["chunks"],
+        "chunks_per_sec": round(summary["chunks"] / elapsed),
+        "sections": summary["sections"],
+        "segments": summary["batches"],
+        "segment_mb": round(stats["segment_bytes"] / (1 << 20), 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[100, 300])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--max-chars", type=int, default=2000)
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_single(args.single, args.batch_size, args.max_chars)))
+        return
+
+    results = []
+    for size_mb in args.sizes_mb:
+        output = subprocess.run(
+            [sys.executable, __file__, "--single", str(size_mb), "--batch-size", str(args.batch_size), "--max-chars", str(args.max_chars)],
+            capture_output=True, text=True, check=True, cwd=ROOT,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps({"config": {k: v for k, v in vars(args).items() if k != "single"}, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Chat latency with one deployment, with the LlmDeploymentPool and with hedged pool calls.
+
+Starts one Azure OpenAI compatible chat endpoint on localhost per simulated
+deployment, each with its own median latency, a heavy tail (a share of requests
+that take --tail-ms instead) and an error rate, then sends the same number of
+concurrent chat calls:
+
+  single  - every call to the first endpoint, as with AZURE_OPENAI_DEPLOYMENT_NAME
+  pool    - routed by the pool on latency and error EWMA, with circuit breakers
+  hedged  - the pool with a second request after the primary member's p95
+
+and reports the latency percentiles, the calls each endpoint served and the pool
+statistics.
+
+    python benchmarks/llm_pool_benchmark.py --latency-ms 80 120 250 --errors 0 0 0.3 --tail-p 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Unique prompts are sent anyway, but the response cache must not hide endpoint latency
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+
+def fake_chat_app(name: str, latency_ms: float, tail_ms: float, tail_p: float, error_p: float, seed: int):
+    from fastapi import FastAPI, Response
+
+    app = FastAPI()
+    app.state.requests = 0
+    rng = random.Random(seed)
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat(deployment: str):
+        app.state.requests += 1
+        delay = tail_ms if rng.random() < tail_p else rng.lognormvariate(0, 0.25) * latency_ms
+        await asyncio.sleep(delay / 1000)
+        if rng.random() < error_p:
+            return Response(json.dumps({"error": {"message": f"{name} is unhealthy"}}), status_code=500, media_type="application/json")
+        payload = {
+            "id": f"chatcmpl-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"answer from {name}"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 4, "total_tokens": 14},
+        }
+        return Response(json.dumps(payload), media_type="application/json")
+
+    return app
+
+
+def start_server(app):
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+async def run_calls(llm, calls: int, concurrency: int) -> dict:
+    from langchain_core.messages import HumanMessage
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await llm.ainvoke([HumanMessage(content=f"Question {i}: which agent should handle this?")])
+                latencies.append((time.perf_counter() - started) * 1000)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    # The shared async HTTP client is bound to this event loop, close it before the loop ends
+    from app.services.LlmClientRegistry import LlmClientRegistry
+
+    await LlmClientRegistry.aclose()
+    latencies.sort()
+    percentile = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1) if latencies else None  # noqa: E731
+    return {
+        "seconds": round(elapsed, 3),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else None,
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[80.0, 120.0, 250.0], help="Median latency per endpoint")
+    parser.add_argument("--errors", type=float, nargs="+", help="Error rate per endpoint (default 0)")
+    parser.add_argument("--tail-ms", type=float, default=2000.0, help="Latency of a tail request")
+    parser.add_argument("--tail-p", type=float, default=0.05, help="Share of requests that hit the tail")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--hedge-max-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    errors = args.errors or [0.0] * len(args.latency_ms)
+    if len(errors) != len(args.latency_ms):
+        parser.error("--errors needs one value per --latency-ms")
+
+    apps, names = [], []
+    for i, (latency, error_p) in enumerate(zip(args.latency_ms, errors)):
+        name = f"region{i}"
+        app = fake_chat_app(name, latency, args.tail_ms, args.tail_p, error_p, args.seed + i)
+        _, port = start_server(app)
+        apps.append(app)
+        names.append(name)
+        os.environ[f"LLM_POOL_{name.upper()}_ENDPOINT"] = f"http://127.0.0.1:{port}"
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": os.environ["LLM_POOL_REGION0_ENDPOINT"],
+        "AZURE_OPENAI_API_KEY": "benchmark",
+        "AZURE_OPENAI_API_VERSION": os.getenv("AZURE_OPENAI_API_VERSION") or "2024-06-01",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "gpt-4o",
+        "LLM_POOL_DEPLOYMENTS": ",".join(names),
+        "LLM_POOL_HEDGE_MAX_RATIO": str(args.hedge_max_ratio),
+    })
+
+    from app.services.LlmClientRegistry import LlmClientRegistry
+    from app.services.LlmDeploymentPool import LlmDeploymentPool
+
+    results = {"config": vars(args), "runs": {}}
+    modes = {
+        "single": lambda: LlmClientRegistry.get_llm(deployment_name="gpt-4o"),
+        "pool": lambda: LlmClientRegistry.get_llm(),
+        "hedged": lambda: LlmClientRegistry.get_llm(hedge=True),
+    }
+    for mode, get_llm in modes.items():
+        LlmDeploymentPool.reset()
+        served_before = [app.state.requests for app in apps]
+        run = asyncio.run(run_calls(get_llm(), args.calls, args.concurrency))
+        run["requests_per_endpoint"] = {name: app.state.requests - before for name, app, before in zip(names, apps, served_before)}
+        pool = LlmDeploymentPool.get_instance()
+        if mode != "single" and pool is not None:
+            run["pool"] = pool.stats()
+        results["runs"][mode] = run
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
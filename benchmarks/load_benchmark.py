@@ -0,0 +1,578 @@
+"""
+End-to-end throughput and latency of the API routes, offline.
+
+Boots app.main:app in this process against local stand-ins for its backends,
+started in a separate process so that they do not compete with the app:
+
+  * an Azure OpenAI compatible endpoint with deterministic chat (plain, streamed,
+    tool call and JSON schema replies) and embeddings, with a fixed time to first
+    token, a token rate and a completion length,
+  * an in-memory Azure Blob Storage endpoint, so DataStoreManager, the storage
+    SDK and the data store checkpointer run unchanged.
+
+The routing LLM sends each new question to --route and finishes once a worker
+has answered. The sub-agents run as they are, their ReAct loop ending with the
+first reply of the LLM endpoint. With --stand-in-agents each is replaced by a
+worker that answers with one plain LLM call (the retrieval one embeds the
+question first), to measure the orchestration without the agent framework.
+
+Load is generated by a separate process that keeps --concurrency requests in
+flight until --requests have completed, for every scenario and concurrency.
+Each run reports throughput, latency percentiles, time to first token for the
+streaming routes, errors and shed requests, and the event loop lag, RSS and
+thread count of the app process. The results are printed as JSON and written to
+--output; with --baseline the runs are compared with an earlier result file and
+the exit status is 1 when one has regressed by more than --tolerance.
+
+    python benchmarks/load_benchmark.py --scenarios generate agent_stream --concurrency 1 16 64 --output load.json
+    python benchmarks/load_benchmark.py --scenarios generate agent_stream --concurrency 1 16 64 --baseline load.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Every request asks a new question anyway, but the response cache must not hide endpoint latency
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+# Route, request body, streamed
+SCENARIOS = {
+    "generate": ("/langchain/generate", "json", False),
+    "generate_stream": ("/langchain/generate/stream", "json", True),
+    "agent": ("/api/agent/process_query", "params", False),
+    "agent_stream": ("/api/agent/process_query/stream", "params", True),
+}
+
+WORKERS = ("documentAgent", "feedbackAgent", "retrievalAgent")
+
+WORDS = ("the", "ingestion", "pipeline", "reads", "each", "document", "into", "chunks", "which", "are", "embedded",
+         "and", "stored", "with", "their", "section", "so", "that", "retrieval", "can", "find", "them", "again")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app):
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    values = sorted(values)
+    at = lambda p: round(values[min(len(values) - 1, int(len(values) * p))], 2)  # noqa: E731
+    return {"mean": round(statistics.fmean(values), 2), "p50": at(0.5), "p95": at(0.95), "p99": at(0.99), "max": round(values[-1], 2)}
+
+
+# Stand-ins, served from their own process
+
+def fake_openai_app(config: dict):
+    import numpy as np
+    from fastapi import FastAPI, Request, Response
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+    latency = config["llm_latency_ms"] / 1000
+    token_interval = 1 / config["tokens_per_sec"] if config["tokens_per_sec"] > 0 else 0.0
+
+    def reply(body: dict):
+        """Text pieces, or a routing decision as a tool call or as JSON content."""
+        messages = body.get("messages") or [{}]
+        response_format = body.get("response_format") or {}
+        # Only the router asks for a Router; the sub-agents' tools are answered with text, which ends their loop
+        router_tool = next((tool["function"]["name"] for tool in body.get("tools") or [] if tool["function"]["name"] == "Router"), None)
+        schema = (response_format.get("json_schema") or {}).get("name")
+        if router_tool or schema == "Router" or response_format.get("type") == "json_object":
+            # A worker has answered when the last message carries its name
+            decision = json.dumps({"next": ["FINISH"] if messages[-1].get("name") else config["route"]})
+            if router_tool:
+                return [], {"id": "call_0", "type": "function", "function": {"name": router_tool, "arguments": decision}}
+            return [decision], None
+        seed = zlib.crc32(str(messages[-1].get("content", "")).encode("utf-8"))
+        return [" " + WORDS[(seed + i * 7) % len(WORDS)] for i in range(config["completion_tokens"])], None
+
+    def usage(body: dict, completion_tokens: int) -> dict:
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in body.get("messages", [])) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    async def stream(body: dict, deployment: str, pieces: List[str], tool_call: Optional[dict]):
+        created = int(time.time())
+
+        def frame(delta: dict, finish_reason: Optional[str] = None, **extra) -> str:
+            choices = [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+            chunk = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": created, "model": deployment,
+                     "choices": choices, **extra}
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        yield frame({"role": "assistant", "content": ""})
+        started = time.perf_counter()
+        for i, piece in enumerate(pieces):
+            # Paced against the start so that the rate does not drift with scheduling delays
+            delay = started + i * token_interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield frame({"content": piece})
+        if tool_call is not None:
+            yield frame({"tool_calls": [{"index": 0, **tool_call}]})
+        yield frame({}, "tool_calls" if tool_call else "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield frame(None, usage=usage(body, len(pieces) or 1))
+        yield "data: [DONE]\n\n"
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat(deployment: str, request: Request):
+        body = await request.json()
+        pieces, tool_call = reply(body)
+        await asyncio.sleep(latency)
+        if body.get("stream"):
+            return StreamingResponse(stream(body, deployment, pieces, tool_call), media_type="text/event-stream")
+        await asyncio.sleep(len(pieces) * token_interval)
+        message = {"role": "assistant", "content": "".join(pieces) or None}
+        if tool_call is not None:
+            message["tool_calls"] = [tool_call]
+        payload = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": deployment,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+            "usage": usage(body, len(pieces) or 1),
+        }
+        return Response(json.dumps(payload), media_type="application/json")
+
+    @app.post("/openai/deployments/{deployment}/embeddings")
+    async def embeddings(deployment: str, request: Request):
+        import base64
+
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(config["embedding_latency_ms"] / 1000)
+        data = []
+        for i, text in enumerate(inputs):
+            vector = np.random.default_rng(zlib.crc32(str(text).encode("utf-8"))).normal(size=config["dimensions"]).astype(np.float32)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if body.get("encoding_format") == "base64" else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        payload = {"object": "list", "data": data, "model": deployment, "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+        return Response(json.dumps(payload), media_type="application/json")
+
+    return app
+
+
+def fake_blob_app(config: dict):
+    """The blob operations of the request path: whole and ranged reads, block and append blobs, deletes."""
+    from fastapi import FastAPI, Request, Response
+
+    app = FastAPI()
+    # (container, blob) -> [data, blob type, version, last modified]
+    blobs: Dict[tuple, list] = {}
+    latency = config["blob_latency_ms"] / 1000
+
+    def error(status: int, code: str) -> Response:
+        body = f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{code}</Code><Message>{code}</Message></Error>'
+        return Response(body, status_code=status, media_type="application/xml", headers={"x-ms-error-code": code})
+
+    def properties(entry: list) -> Dict[str, str]:
+        return {"ETag": f'"0x{entry[2]:X}"', "Last-Modified": formatdate(entry[3], usegmt=True), "x-ms-blob-type": entry[1],
+                "Accept-Ranges": "bytes"}
+
+    def written(entry: list) -> None:
+        entry[2] += 1
+        entry[3] = time.time()
+
+    @app.api_route("/{account}/{container}/{blob:path}", methods=["GET", "HEAD", "PUT", "DELETE"])
+    async def blob(container: str, blob: str, request: Request):
+        await asyncio.sleep(latency)
+        key, entry = (container, blob), blobs.get((container, blob))
+        comp = request.query_params.get("comp")
+        if request.method == "PUT" and comp == "appendblock":
+            if entry is None:
+                return error(404, "BlobNotFound")
+            offset = len(entry[0])
+            entry[0] += await request.body()
+            written(entry)
+            return Response(status_code=201, headers={**properties(entry), "x-ms-blob-append-offset": str(offset)})
+        if request.method == "PUT" and comp is None:
+            if entry is not None and request.headers.get("if-none-match") == "*":
+                return error(409, "BlobAlreadyExists")
+            blob_type = request.headers.get("x-ms-blob-type", "BlockBlob")
+            data = await request.body()
+            entry = blobs[key] = [bytearray(data if blob_type == "BlockBlob" else b""), blob_type, entry[2] if entry else 0, 0.0]
+            written(entry)
+            return Response(status_code=201, headers=properties(entry))
+        if request.method == "PUT":
+            return error(501, "UnsupportedQueryParameter")
+        if entry is None:
+            return error(404, "BlobNotFound")
+        if request.method == "DELETE":
+            del blobs[key]
+            return Response(status_code=202)
+        headers = properties(entry)
+        if request.method == "HEAD":
+            return Response(status_code=200, headers={**headers, "Content-Length": str(len(entry[0]))})
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        data, size = bytes(entry[0]), len(entry[0])
+        byte_range = request.headers.get("x-ms-range") or request.headers.get("range")
+        if not byte_range:
+            return Response(data, media_type="application/octet-stream", headers=headers)
+        start, _, end = byte_range.split("=", 1)[1].partition("-")
+        start = int(start)
+        if start >= size:
+            # As the service does, the SDK then reads empty blobs without a range
+            return error(416, "InvalidRange")
+        end = min(int(end) if end else size - 1, size - 1)
+        return Response(data[start:end + 1], status_code=206, media_type="application/octet-stream",
+                        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"})
+
+    return app
+
+
+def serve_stand_ins(config: dict, conn) -> None:
+    _, llm_port = start_server(fake_openai_app(config))
+    _, blob_port = start_server(fake_blob_app(config))
+    conn.send((llm_port, blob_port))
+    # Serve until the benchmark terminates the process
+    threading.Event().wait()
+
+
+class StandInWorker:
+    """
+    Takes the place of a sub-agent with --stand-in-agents, answering with one LLM
+    call; the retrieval stand-in embeds the question first, as a vector search would.
+    """
+
+    def __init__(self, name: str, embed: bool):
+        from app.core.langchain_setup import get_llm
+
+        self.name = name
+        self.embed = embed
+        self.llm = get_llm()
+
+    def _command(self, content: str):
+        from langchain_core.messages import HumanMessage
+        from langgraph.types import Command
+
+        return Command(goto="coreagent", update={"messages": [HumanMessage(content=content, name=self.name)]})
+
+    def process_request(self, state):
+        from app.services.LlmClientRegistry import LlmClientRegistry
+
+        if self.embed:
+            LlmClientRegistry.get_embeddings().embed_query(state["messages"][-1].content)
+        return self._command(self.llm.invoke(state["messages"]).content)
+
+    async def aprocess_request(self, state):
+        from app.services.LlmClientRegistry import LlmClientRegistry
+
+        if self.embed:
+            await LlmClientRegistry.get_embeddings().aembed_query(state["messages"][-1].content)
+        return self._command((await self.llm.ainvoke(state["messages"])).content)
+
+
+# Load generation, run in its own process
+
+async def run_load(base_url: str, scenario: str, requests: int, concurrency: int, timeout: float, tag: str) -> dict:
+    import httpx
+
+    path, body, streamed = SCENARIOS[scenario]
+    pending = iter(range(requests))
+    latencies, first_tokens, outcomes = [], [], {}
+
+    async def one(client: "httpx.AsyncClient", i: int) -> None:
+        query = f"[{tag} {i}] How does the ingestion pipeline split a document into chunks?"
+        kwargs = {"json": {"query": query}} if body == "json" else {"params": {"query": query}}
+        started = time.perf_counter()
+        first_token = None
+        try:
+            if streamed:
+                frames = []
+                async with client.stream("POST", path, **kwargs) as response:
+                    async for text in response.aiter_text():
+                        if first_token is None and "event: token" in text:
+                            first_token = (time.perf_counter() - started) * 1000
+                        frames.append(text)
+                text = "".join(frames)
+                outcome = str(response.status_code)
+                if response.status_code == 200 and "event: error" in text:
+                    outcome = "stream_shed" if '"status_code": 503' in text else "stream_error"
+            else:
+                response = await client.post(path, **kwargs)
+                outcome = str(response.status_code)
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if outcome == "200":
+            latencies.append((time.perf_counter() - started) * 1000)
+            if first_token is not None:
+                first_tokens.append(first_token)
+
+    async def worker(client: "httpx.AsyncClient") -> None:
+        for i in pending:
+            await one(client, i)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    run = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "outcomes": outcomes,
+        "latency_ms": percentiles(latencies),
+    }
+    if streamed:
+        run["first_token_ms"] = percentiles(first_tokens)
+    return run
+
+
+def drive(base_url: str, scenario: str, requests: int, concurrency: int, timeout: float, tag: str) -> dict:
+    return asyncio.run(run_load(base_url, scenario, requests, concurrency, timeout, tag))
+
+
+# App process
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # Peak instead of current RSS where /proc is not available; KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoopMonitor:
+    """Samples how late a timer on the app's event loop fires, with the process RSS and thread count."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lags: List[float] = []
+        self.rss: List[int] = []
+        self.threads: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - expected) * 1000)
+            self.rss.append(rss_bytes())
+            self.threads.append(threading.active_count())
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def mark(self) -> tuple:
+        return len(self.lags), rss_bytes()
+
+    def report(self, mark: tuple) -> dict:
+        start, rss_start = mark
+        lags, rss = self.lags[start:], self.rss[start:] or [rss_start]
+        mb = lambda value: round(value / 2 ** 20, 1)  # noqa: E731
+        return {
+            "loop_lag_ms": percentiles(lags),
+            "memory": {"rss_start_mb": mb(rss_start), "rss_peak_mb": mb(max(rss)), "rss_end_mb": mb(rss_bytes())},
+            "threads_peak": max(self.threads[start:] or [threading.active_count()]),
+        }
+
+
+def configure(args, llm_port: int, blob_port: int, workdir: str) -> None:
+    """Point the app at the stand-ins; set before the app is imported, as the services read settings on import."""
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{llm_port}",
+        "AZURE_OPENAI_API_KEY": "benchmark",
+        "AZURE_OPENAI_API_VERSION": os.getenv("AZURE_OPENAI_API_VERSION") or "2024-06-01",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "gpt-4o",
+        "AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME": "text-embedding-3-small",
+        "AZURE_STORAGE_CONNECTION_STRING": (
+            f"DefaultEndpointsProtocol=http;AccountName=benchmark;AccountKey=YmVuY2htYXJr;"
+            f"BlobEndpoint=http://127.0.0.1:{blob_port}/benchmark;"
+        ),
+        "LLM_POOL_DEPLOYMENTS": "",
+        # Every turn goes through the routing LLM
+        "ROUTER_LOCAL_ENABLED": "false",
+        "CHECKPOINT_BACKEND": args.checkpoint,
+        "CHECKPOINT_DIR": os.path.join(workdir, "checkpoints"),
+    })
+    os.environ.pop("ROUTER_DECISION_LOG", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+async def benchmark(args) -> dict:
+    import uvicorn
+    from app.main import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+            raise RuntimeError("The app exited during startup")
+        await asyncio.sleep(0.05)
+
+    if args.stand_in_agents:
+        from app.core.CoreAgent import OrchestratorAgent
+
+        agent = OrchestratorAgent.get_instance()
+        for name in OrchestratorAgent.SUB_AGENTS:
+            agent._sub_agents[name] = StandInWorker(name, embed=name == "retrievalAgent")
+
+    monitor = LoopMonitor(args.lag_interval_ms / 1000)
+    monitor.start()
+    loop = asyncio.get_running_loop()
+    runs = {}
+    base_url = f"http://127.0.0.1:{port}"
+    # The load generator gets its own interpreter, so only the app's work shows up in the loop lag
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for concurrency in args.concurrency:
+            for scenario in args.scenarios:
+                key = f"{scenario}@{concurrency}"
+                if args.warmup:
+                    await loop.run_in_executor(pool, drive, base_url, scenario, args.warmup, min(concurrency, args.warmup),
+                                               args.timeout, f"warmup {key}")
+                gc.collect()
+                mark = monitor.mark()
+                run = await loop.run_in_executor(pool, drive, base_url, scenario, args.requests, concurrency, args.timeout, key)
+                run.update(monitor.report(mark))
+                runs[key] = run
+                print(f"{key}: {run['throughput_rps']} req/s, p95 {(run['latency_ms'] or {}).get('p95')} ms, "
+                      f"outcomes {run['outcomes']}", file=sys.stderr)
+
+    await monitor.stop()
+    server.should_exit = True
+    await serving
+    return runs
+
+
+# Regression comparison: metric, whether higher is worse, change below which it is noise
+COMPARED = (
+    ("throughput_rps", False, 0.0),
+    ("latency_ms.p50", True, 1.0),
+    ("latency_ms.p95", True, 1.0),
+    ("latency_ms.p99", True, 1.0),
+    ("first_token_ms.p95", True, 1.0),
+    ("loop_lag_ms.p99", True, 1.0),
+    ("memory.rss_peak_mb", True, 5.0),
+)
+
+
+def lookup(run: dict, metric: str) -> Optional[float]:
+    value = run
+    for part in metric.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(runs: dict, baseline: dict, tolerance: float) -> dict:
+    changes, regressions = {}, []
+    for key, run in runs.items():
+        before_run = baseline.get("runs", {}).get(key)
+        if before_run is None:
+            continue
+        changes[key] = {}
+        for metric, higher_is_worse, noise in COMPARED:
+            now, before = lookup(run, metric), lookup(before_run, metric)
+            if not now or not before:
+                continue
+            change = now / before - 1
+            changes[key][metric] = round(change, 3)
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            if worse and abs(now - before) > noise:
+                regressions.append(f"{key} {metric}: {before} -> {now} ({change:+.0%})")
+    return {"tolerance": tolerance, "changes": changes, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Requests in flight, one run per value")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per run")
+    parser.add_argument("--warmup", type=int, default=10, help="Unrecorded requests before each run")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request in seconds")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Chat time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0, help="Chat completion token rate, 0 for no delay")
+    parser.add_argument("--completion-tokens", type=int, default=60, help="Tokens of a chat answer")
+    parser.add_argument("--embedding-latency-ms", type=float, default=50.0)
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding size")
+    parser.add_argument("--blob-latency-ms", type=float, default=10.0, help="Latency of every blob request")
+    parser.add_argument("--route", nargs="+", default=["retrievalAgent"], choices=[*WORKERS, "FINISH"],
+                        help="Workers the routing LLM sends new questions to")
+    parser.add_argument("--stand-in-agents", action="store_true",
+                        help="Replace the sub-agents with single LLM call workers")
+    parser.add_argument("--checkpoint", default="datastore", choices=["datastore", "file", "none"], help="CHECKPOINT_BACKEND")
+    parser.add_argument("--lag-interval-ms", type=float, default=10.0, help="Event loop lag sampling interval")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Earlier results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change that counts as a regression")
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in ("llm_latency_ms", "tokens_per_sec", "completion_tokens",
+                                                   "embedding_latency_ms", "dimensions", "blob_latency_ms", "route")}
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    stand_ins = context.Process(target=serve_stand_ins, args=(config, sender), daemon=True)
+    stand_ins.start()
+    try:
+        if not receiver.poll(60):
+            raise RuntimeError("The stand-in servers did not start")
+        llm_port, blob_port = receiver.recv()
+        with tempfile.TemporaryDirectory() as workdir:
+            configure(args, llm_port, blob_port, workdir)
+            runs = asyncio.run(benchmark(args))
+    finally:
+        stand_ins.terminate()
+
+    results = {"config": vars(args), "runs": runs}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["comparison"] = {"baseline": args.baseline, **compare(runs, json.load(f), args.tolerance)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    if results.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
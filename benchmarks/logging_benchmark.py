@@ -0,0 +1,142 @@
+"""
+Per-log-call cost on the request thread, synchronous versus queued logging.
+
+Several threads log the same mix of messages through:
+
+  sync      - the previous basicConfig setup, formatting and writing on the caller
+  queued    - LoggerService with JSON output written by the background thread
+  sampled   - the queued pipeline keeping 10% of the chatty logger's records
+
+The log sink is a file, optionally slowed down per write to stand in for a
+congested stdout pipe or log driver. Reports the mean and p99 time each
+logger call blocks its thread, and the time to drain the queue at the end.
+
+    python benchmarks/logging_benchmark.py --threads 8 --calls 5000 --sink-latency-us 50
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.LoggerService import LoggerService  # noqa: E402
+
+
+class SlowFile:
+    """File wrapper whose writes take at least the given time, like a backed-up pipe."""
+
+    def __init__(self, path: str, latency_us: float):
+        self.file = open(path, "a", encoding="utf-8")
+        self.latency = latency_us / 1e6
+
+    def write(self, data: str) -> int:
+        if self.latency:
+            # Sleeping releases the GIL like a blocked write would
+            time.sleep(self.latency)
+        return self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def configure(mode: str, path: str, latency_us: float) -> None:
+    os.environ["LOG_FORMAT"] = "json"
+    os.environ["LOG_ASYNC"] = "false" if mode == "sync" else "true"
+    os.environ["LOG_SAMPLE_RATES"] = "bench.chatty=0.1" if mode == "sampled" else ""
+    if mode == "sync":
+        LoggerService.shutdown()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                            stream=SlowFile(path, latency_us), force=True)
+        return
+    LoggerService.configure_logger(level=logging.INFO, log_file=path)
+    # Swap the listener's file for the slowed-down one
+    handler = LoggerService._listener.handlers[0]
+    handler.stream.close()
+    handler.stream = SlowFile(path, latency_us)
+
+
+def worker(calls: int, timings: list, barrier: threading.Barrier) -> None:
+    chatty = logging.getLogger("bench.chatty")
+    service = logging.getLogger("bench.service")
+    token = LoggerService.bind(request_id=f"req-{threading.get_ident()}", thread_id="bench")
+    local = []
+    barrier.wait()
+    for i in range(calls):
+        started = time.perf_counter_ns()
+        if i % 4:
+            chatty.info(f"Cache lookup {i} for blob documents/section-{i % 97}.json")
+        else:
+            service.info(f"Routed query {i} to retrievalAgent in {i % 50} ms")
+        local.append(time.perf_counter_ns() - started)
+    LoggerService.unbind(token)
+    timings.extend(local)
+
+
+def run(mode: str, threads: int, calls: int, latency_us: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.log")
+        configure(mode, path, latency_us)
+        timings: list = []
+        barrier = threading.Barrier(threads + 1)
+        workers = [threading.Thread(target=worker, args=(calls, timings, barrier)) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        logged = time.perf_counter() - started
+        stats = LoggerService.stats()
+        LoggerService.shutdown()
+        drained = time.perf_counter() - started
+        for handler in logging.getLogger().handlers[:]:
+            handler.flush()
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+        if mode != "sync" and lines:
+            json.loads(lines[0])
+
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "mean_us": round(statistics.fmean(timings) / 1000, 2),
+        "p99_us": round(timings[int(len(timings) * 0.99)] / 1000, 2),
+        "logging_seconds": round(logged, 3),
+        "drained_seconds": round(drained, 3),
+        "lines_written": len(lines),
+        "dropped": stats.get("dropped", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=5000, help="Log calls per thread")
+    parser.add_argument("--sink-latency-us", type=float, default=20.0, help="Extra time per write to the log file")
+    parser.add_argument("--modes", nargs="+", default=["sync", "queued", "sampled"])
+    args = parser.parse_args()
+    # Enough room that the queued modes measure enqueue cost rather than drops
+    os.environ.setdefault("LOG_QUEUE_SIZE", str(args.threads * args.calls))
+
+    results = {"config": vars(args), "runs": {}}
+    for mode in args.modes:
+        results["runs"][mode] = run(mode, args.threads, args.calls, args.sink_latency_us)
+    logging.getLogger().handlers.clear()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
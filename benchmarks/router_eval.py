@@ -0,0 +1,84 @@
+"""
+Offline evaluation of the local intent router against logged LLM routing decisions.
+
+Decisions are logged by the core agent when ROUTER_DECISION_LOG is set. The log
+is split into train/test folds; for each confidence threshold the report shows
+how often the local router answers (coverage), how often it agrees with the LLM
+router when it does, and the routing latency it would have saved.
+
+    python benchmarks/router_eval.py --log .cache/routing_decisions.jsonl --folds 5
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.IntentRouter import IntentRouter, RoutingDecisionLog  # noqa: E402
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+
+def evaluate(records, folds: int, rules_only: bool, seed: int) -> dict:
+    """Cross-validate the router and report per-threshold coverage, accuracy and savings."""
+    records = list(records)
+    random.Random(seed).shuffle(records)
+    folds = max(1, min(folds, len(records)))
+
+    predictions = []  # (label, confidence, true label, llm latency ms, local latency ms)
+    for fold in range(folds):
+        test = records[fold::folds]
+        train = [r for i, r in enumerate(records) if i % folds != fold]
+        if rules_only or folds == 1:
+            router = IntentRouter()
+        else:
+            router = IntentRouter.train((r["text"], r["label"]) for r in train)
+        for record in test:
+            started = time.perf_counter()
+            label, confidence = router.classify(record["text"])
+            local_ms = (time.perf_counter() - started) * 1000
+            predictions.append((label, confidence, record["label"], record.get("latency_ms", 0.0), local_ms))
+
+    report = {
+        "examples": len(predictions),
+        "local_latency_ms_p50": round(statistics.median(p[4] for p in predictions), 4) if predictions else 0.0,
+        "llm_latency_ms_mean": round(statistics.fmean(p[3] for p in predictions), 2) if predictions else 0.0,
+        "thresholds": [],
+    }
+    for threshold in THRESHOLDS:
+        covered = [p for p in predictions if p[0] is not None and p[1] >= threshold]
+        correct = sum(1 for p in covered if p[0] == p[2])
+        report["thresholds"].append({
+            "threshold": threshold,
+            "coverage": round(len(covered) / len(predictions), 4) if predictions else 0.0,
+            "accuracy_when_local": round(correct / len(covered), 4) if covered else None,
+            # Uncovered requests still go to the LLM router, so they count as agreeing
+            "overall_agreement": round((correct + len(predictions) - len(covered)) / len(predictions), 4) if predictions else None,
+            "llm_ms_saved_total": round(sum(p[3] - p[4] for p in covered), 2),
+            "llm_ms_saved_per_request": round(sum(p[3] - p[4] for p in covered) / len(predictions), 2) if predictions else 0.0,
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local intent router against logged LLM decisions")
+    parser.add_argument("--log", default=".cache/routing_decisions.jsonl", help="JSONL decision log")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--rules-only", action="store_true", help="Evaluate the keyword rules without a trained model")
+    parser.add_argument("--seed", type=int, default=0, help="Shuffle seed")
+    parser.add_argument("--output", help="Optional path to write the JSON report")
+    args = parser.parse_args()
+
+    report = evaluate(RoutingDecisionLog.read(args.log), args.folds, args.rules_only, args.seed)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
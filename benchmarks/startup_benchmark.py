@@ -0,0 +1,90 @@
+"""
+Cold start benchmark for the API.
+
+Each run starts a fresh interpreter, imports app.main and runs the FastAPI
+lifespan startup, the same work uvicorn does before it accepts connections.
+No network access is needed: the Azure clients are only constructed, never called.
+
+    python benchmarks/startup_benchmark.py --runs 5 --import-budget 1.0 --startup-budget 4.0
+
+Exits with status 1 when the median exceeds a budget, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs inside the child interpreter and prints the measured timings as JSON
+CHILD_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({"import": imported - start, "startup": ready - start}))
+"""
+
+# Placeholder settings so the benchmark runs without real credentials
+DEFAULT_ENV = {
+    "AZURE_OPENAI_API_KEY": "benchmark",
+    "AZURE_OPENAI_ENDPOINT": "https://benchmark.openai.azure.com/",
+    "AZURE_OPENAI_DEPLOYMENT_NAME": "gpt-4o",
+    "AZURE_OPENAI_API_VERSION": "2024-12-01-preview",
+    "AZURE_STORAGE_CONNECTION_STRING": "UseDevelopmentStorage=true",
+}
+
+
+def measure_once(env: dict) -> dict:
+    """Start a fresh interpreter and return its import/startup timings in seconds."""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold start time")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to start")
+    parser.add_argument("--import-budget", type=float, default=1.0, help="Maximum median seconds to import app.main")
+    parser.add_argument("--startup-budget", type=float, default=4.0, help="Maximum median seconds until the app is ready")
+    args = parser.parse_args()
+
+    env = {**DEFAULT_ENV, **os.environ, "PYTHONPATH": str(ROOT)}
+    runs = [measure_once(env) for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "import_median_s": round(statistics.median(r["import"] for r in runs), 3),
+        "startup_median_s": round(statistics.median(r["startup"] for r in runs), 3),
+        "import_budget_s": args.import_budget,
+        "startup_budget_s": args.startup_budget,
+    }
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if report["import_median_s"] > args.import_budget:
+        failures.append(f"import took {report['import_median_s']}s (budget {args.import_budget}s)")
+    if report["startup_median_s"] > args.startup_budget:
+        failures.append(f"startup took {report['startup_median_s']}s (budget {args.startup_budget}s)")
+    if failures:
+        print("Cold start regression: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
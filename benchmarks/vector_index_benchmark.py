@@ -0,0 +1,105 @@
+"""
+Recall@k versus query latency for the in-process vector index.
+
+Builds a synthetic clustered corpus per size, computes exact top-k with the
+brute-force mode as ground truth and compares the IVF mode at several nprobe
+settings.
+
+    python benchmarks/vector_index_benchmark.py --sizes 10000 100000 --dimensions 384
+    python benchmarks/vector_index_benchmark.py --sizes 1000000 --dimensions 256   # needs ~2 GB RAM
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.VectorIndex import VectorIndex  # noqa: E402
+
+
+def synthetic_corpus(size: int, dimensions: int, clusters: int, seed: int) -> np.ndarray:
+    """Gaussian clusters, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    corpus = np.empty((size, dimensions), dtype=np.float32)
+    for start in range(0, size, 100000):
+        stop = min(size, start + 100000)
+        corpus[start:stop] = centers[rng.integers(0, clusters, stop - start)] + 0.5 * rng.normal(size=(stop - start, dimensions))
+    return corpus
+
+
+def timed_search(index: VectorIndex, queries: np.ndarray, k: int, nprobe=None):
+    """Run every query and return the results with per-query latencies in ms."""
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append([chunk_id for chunk_id, _ in index.search(query, k, nprobe=nprobe)])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return results, latencies
+
+
+def summarize(latencies) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+    }
+
+
+def run(size: int, dimensions: int, k: int, queries: int, nprobes, seed: int) -> dict:
+    corpus = synthetic_corpus(size, dimensions, clusters=max(16, size // 1000), seed=seed)
+    ids = [f"chunk-{i}" for i in range(size)]
+    rng = np.random.default_rng(seed + 1)
+    query_vectors = corpus[rng.integers(0, size, queries)] + 0.25 * rng.normal(size=(queries, dimensions)).astype(np.float32)
+
+    started = time.perf_counter()
+    flat = VectorIndex(dimensions, mode="flat")
+    flat.add(ids, corpus)
+    flat_build = time.perf_counter() - started
+    truth, flat_latencies = timed_search(flat, query_vectors, k)
+    del flat
+
+    started = time.perf_counter()
+    ivf = VectorIndex(dimensions, mode="ivf")
+    ivf.add(ids, corpus)
+    ivf_build = time.perf_counter() - started
+
+    report = {
+        "size": size,
+        "dimensions": dimensions,
+        "k": k,
+        "flat": {"build_s": round(flat_build, 3), "recall": 1.0, **summarize(flat_latencies)},
+        "ivf": {"build_s": round(ivf_build, 3), "nlist": ivf.nlist, "by_nprobe": []},
+    }
+    for nprobe in nprobes:
+        results, latencies = timed_search(ivf, query_vectors, k, nprobe=nprobe)
+        recall = statistics.fmean(len(set(found) & set(expected)) / k for found, expected in zip(results, truth))
+        report["ivf"]["by_nprobe"].append({"nprobe": nprobe, "recall": round(recall, 4), **summarize(latencies)})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall@k against latency for the vector index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Corpus sizes (1000000 is supported but needs several GB)")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding dimensions")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per size")
+    parser.add_argument("--nprobes", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="IVF nprobe values to test")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Optional path to write the JSON report")
+    args = parser.parse_args()
+
+    reports = [run(size, args.dimensions, args.k, args.queries, args.nprobes, args.seed) for size in args.sizes]
+    text = json.dumps(reports, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text)
+
+
+if __name__ == "__main__":
+    main()